@@ -0,0 +1,164 @@
+
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils import file_content_hash
+from ingest import DATA_DIR, DOCUMENT_EXTENSIONS
+from llm_client import get_embeddings, record_embedding_call
+
+# --- Cache configuration ---
+ANSWER_CACHE_SIZE = int(os.getenv("LOGOS_ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.getenv("LOGOS_ANSWER_CACHE_TTL", "3600"))
+# SQL answers are keyed by the database schema, not its rows, so they expire much sooner
+ANSWER_CACHE_SQL_TTL = float(os.getenv("LOGOS_ANSWER_CACHE_SQL_TTL", "60"))
+# Near-duplicate lookup costs one embedding call per cache miss, so it is opt-in
+ANSWER_CACHE_SEMANTIC = os.getenv("LOGOS_ANSWER_CACHE_SEMANTIC", "0") == "1"
+ANSWER_CACHE_SIMILARITY = float(os.getenv("LOGOS_ANSWER_CACHE_SIMILARITY", "0.95"))
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases a query and collapses whitespace and punctuation so trivial variants share a key."""
+    return " ".join(re.findall(r"[a-z0-9$%.]+", query.lower())).strip(" .")
+
+
+def get_file_versions(selected_files: list[str]) -> tuple | None:
+    """Returns (file name, content hash) pairs for the selected files, or None if one is missing."""
+    versions = []
+    for file_name in sorted(set(selected_files)):
+        try:
+            versions.append((file_name, file_content_hash(os.path.join(DATA_DIR, file_name))))
+        except OSError:
+            return None
+    return tuple(versions)
+
+
+def get_corpus_versions() -> tuple | None:
+    """Returns the versions of every document in the data directory, for answers searched from the whole corpus."""
+    names = os.listdir(DATA_DIR) if os.path.isdir(DATA_DIR) else []
+    return get_file_versions([name for name in names if name.endswith(DOCUMENT_EXTENSIONS)])
+
+
+def _is_expired(key: tuple, entry: dict, now: float) -> bool:
+    ttl = ANSWER_CACHE_SQL_TTL if key[1] == "SQL" else ANSWER_CACHE_TTL
+    return now - entry["created"] > ttl
+
+
+def _get_exact(key: tuple, now: float) -> dict | None:
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        if _is_expired(key, entry, now):
+            del _entries[key]
+            _stats["expirations"] += 1
+            return None
+        _entries.move_to_end(key)
+        _stats["hits"] += 1
+        return entry["response"]
+
+
+def _get_similar(embedding: np.ndarray, source: str, file_versions: tuple, now: float) -> dict | None:
+    best_key, best_score = None, ANSWER_CACHE_SIMILARITY
+    with _lock:
+        for key, entry in _entries.items():
+            if entry["embedding"] is None or key[1] != source or key[2] != file_versions or _is_expired(key, entry, now):
+                continue
+            score = float(np.dot(entry["embedding"], embedding))
+            if score >= best_score:
+                best_key, best_score = key, score
+        if best_key is None:
+            return None
+        _entries.move_to_end(best_key)
+        _stats["semantic_hits"] += 1
+        return _entries[best_key]["response"]
+
+
+async def _embed(query: str) -> np.ndarray | None:
+    try:
+        embeddings = get_embeddings()
+        record_embedding_call(embeddings, [query])
+        vector = np.asarray(await embeddings.aembed_query(query), dtype=np.float32)
+    except Exception as e:
+        print(f"--- Could not embed query for the answer cache: {e} ---")
+        return None
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+
+async def lookup_answer(query: str, source: str, file_versions: tuple) -> tuple[dict | None, np.ndarray | None]:
+    """Looks up a cached response. Returns (response or None, query embedding or None).
+
+    The embedding is only computed when semantic lookup is enabled; pass it on to store_answer
+    so a miss does not embed the query twice.
+    """
+    now = time.time()
+    key = (normalize_query(query), source, file_versions)
+    response = _get_exact(key, now)
+    if response is not None:
+        return response, None
+
+    embedding = None
+    if ANSWER_CACHE_SEMANTIC:
+        embedding = await _embed(key[0])
+        if embedding is not None:
+            response = _get_similar(embedding, source, file_versions, now)
+            if response is not None:
+                return response, embedding
+
+    with _lock:
+        _stats["misses"] += 1
+    return None, embedding
+
+
+def store_answer(query: str, source: str, file_versions: tuple, response: dict, embedding: np.ndarray | None = None):
+    """Caches a response, evicting the least recently used entries beyond ANSWER_CACHE_SIZE."""
+    key = (normalize_query(query), source, file_versions)
+    with _lock:
+        _entries[key] = {"response": response, "created": time.time(), "embedding": embedding}
+        _entries.move_to_end(key)
+        _stats["stores"] += 1
+        while len(_entries) > ANSWER_CACHE_SIZE:
+            _entries.popitem(last=False)
+            _stats["evictions"] += 1
+
+
+def invalidate_file(file_name: str):
+    """Drops every cached answer that was computed from the given file."""
+    with _lock:
+        stale = [key for key in _entries if any(name == file_name for name, _ in key[2])]
+        for key in stale:
+            del _entries[key]
+        _stats["invalidations"] += len(stale)
+
+
+def invalidate_source(source: str):
+    """Drops every cached answer from a source, e.g. "SQL" after the database changed."""
+    with _lock:
+        stale = [key for key in _entries if key[1] == source]
+        for key in stale:
+            del _entries[key]
+        _stats["invalidations"] += len(stale)
+
+
+def clear_answers():
+    with _lock:
+        _entries.clear()
+
+
+def get_answer_cache_stats() -> dict:
+    """Returns hit/miss counters and the current size of the answer cache."""
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_entries)
+    hits = stats["hits"] + stats["semantic_hits"]
+    lookups = hits + stats["misses"]
+    stats["hit_ratio"] = hits / lookups if lookups else 0.0
+    stats["semantic"] = ANSWER_CACHE_SEMANTIC
+    return stats
@@ -0,0 +1,284 @@
+import os
+import re
+import math
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from plot_store import PLOT_DIR, has_plot, plot_url, render_figure, store_bytes
+from metrics import span
+from forecasting import FORECAST_HORIZON, FORECAST_WORKERS, forecast_key, run_in_pool
+
+BATCH_MODELS = ("ets", "naive", "prophet")
+BATCH_FORECAST_MODEL = os.getenv("LOGOS_BATCH_FORECAST_MODEL", "ets")
+BATCH_MAX_PANELS = int(os.getenv("LOGOS_BATCH_MAX_PANELS", "16"))
+# Words that ask for one forecast per series rather than one for the whole file
+BATCH_WORDS = {"batch", "each", "every", "separately", "individually"}
+# The baselines forecast thousands of series per second, so only large batches are split across workers
+BASELINE_SERIES_PER_TASK = 2000
+
+# Smoothing parameters of the damped additive Holt-Winters baseline
+ETS_ALPHA, ETS_BETA, ETS_GAMMA, ETS_PHI = 0.3, 0.05, 0.1, 0.98
+
+_results = OrderedDict()
+_results_lock = threading.Lock()
+_MAX_RESULTS = 64
+
+
+def _strip_columns(df: pd.DataFrame) -> pd.DataFrame:
+    return df.rename(columns=lambda column: str(column).strip())
+
+
+def _numeric_columns(df: pd.DataFrame) -> list[str]:
+    return [column for column in df.columns if column != "ds" and pd.api.types.is_numeric_dtype(df[column])
+            and not pd.api.types.is_bool_dtype(df[column])]
+
+
+def _mentions(query: str, column: str) -> bool:
+    return re.search(rf"\b{re.escape(column.lower())}\b", query.lower()) is not None
+
+
+def asks_for_batch(query: str) -> bool:
+    """Returns True if the query asks for one forecast per series."""
+    return bool(BATCH_WORDS & set(re.findall(r"[a-z]+", query.lower())))
+
+
+def _is_series_key(frame: pd.DataFrame, column: str) -> bool:
+    """True if most dates occur in several groups of `column`, so each group is a series of its own.
+
+    A label that only tags the rows of one series (a weekday, a promo flag) splits its dates
+    between the groups instead.
+    """
+    groups_per_date = frame.groupby("ds")[column].nunique()
+    return frame[column].nunique() > 1 and groups_per_date.median() > 1
+
+
+def find_batch_layout(df: pd.DataFrame, query: str = "") -> tuple[bool, str | None]:
+    """Decides whether a frame holds several series. Returns (is_batch, group-by column).
+
+    Long frames have ds, y and a label column whose groups share dates; a label column whose
+    groups do not is only used when the query names it or asks for a batch forecast. Frames
+    with ds and several numeric columns and no y are usually one series with regressors, so
+    they are only read as wide (one column per series) when the query names two or more of
+    the columns or asks for a batch forecast.
+    """
+    frame = _strip_columns(df)
+    if "ds" not in frame.columns:
+        return False, None
+    if "y" in frame.columns:
+        labels = [column for column in frame.columns if column not in ("ds", "y") and column not in _numeric_columns(frame)]
+        mentioned = [column for column in labels if _mentions(query, column) and frame[column].nunique() > 1]
+        for column in labels:
+            if _is_series_key(frame, column) and (column in mentioned or not mentioned):
+                return True, column
+        if mentioned:
+            return True, mentioned[0]
+        if asks_for_batch(query):
+            for column in labels:
+                if frame[column].nunique() > 1:
+                    return True, column
+        return False, None
+    numeric = _numeric_columns(frame)
+    if len(numeric) > 1 and (asks_for_batch(query) or sum(_mentions(query, column) for column in numeric) > 1):
+        return True, None
+    return False, None
+
+
+def model_for_query(query: str) -> str:
+    """Picks the model a query asks for by name, defaulting to BATCH_FORECAST_MODEL."""
+    words = set(re.findall(r"[a-z]+", query.lower()))
+    for model in BATCH_MODELS:
+        if model in words:
+            return model
+    return BATCH_FORECAST_MODEL
+
+
+def split_series(df: pd.DataFrame, group_by: str | None = None) -> pd.DataFrame:
+    """Returns one column per series, indexed by date. Duplicate dates within a series are summed."""
+    frame = _strip_columns(df)
+    ds = pd.to_datetime(frame["ds"])
+    if group_by:
+        wide = frame.assign(ds=ds).groupby(["ds", group_by])["y"].sum(min_count=1).unstack(group_by)
+    else:
+        wide = frame[_numeric_columns(frame)].set_index(ds).groupby(level=0).sum(min_count=1)
+    wide.columns = wide.columns.map(str)
+    return wide.sort_index()
+
+
+def _season_length(step: pd.Timedelta) -> int:
+    days = step / pd.Timedelta(days=1)
+    for low, high, season in ((0.9, 1.1, 7), (6, 8, 52), (28, 31.5, 12), (89, 93, 4)):
+        if low <= days <= high:
+            return season
+    return 1
+
+
+# --- Vectorized baselines: every series is a column of Y (time x series) ---
+
+def seasonal_naive(Y: np.ndarray, steps: int, season: int) -> np.ndarray:
+    """Repeats each series' last season."""
+    m = min(season, Y.shape[0])
+    return Y[Y.shape[0] - m:][np.arange(steps) % m]
+
+
+def holt_winters(Y: np.ndarray, steps: int, season: int) -> np.ndarray:
+    """Damped additive Holt-Winters with fixed smoothing, updating all series at once per time step."""
+    T, n = Y.shape
+    m = season if T >= 2 * season else 1
+    if m > 1:
+        level = Y[:m].mean(axis=0)
+        trend = (Y[m:2 * m].mean(axis=0) - level) / m
+        seasonal = Y[:m] - level
+    else:
+        level = Y[0].astype(float)
+        trend = (Y[-1] - Y[0]) / max(T - 1, 1)
+        seasonal = np.zeros((1, n))
+
+    for t in range(T):
+        s = seasonal[t % m]
+        previous = level
+        level = ETS_ALPHA * (Y[t] - s) + (1 - ETS_ALPHA) * (previous + ETS_PHI * trend)
+        trend = ETS_BETA * (level - previous) + (1 - ETS_BETA) * ETS_PHI * trend
+        seasonal[t % m] = ETS_GAMMA * (Y[t] - level) + (1 - ETS_GAMMA) * s
+
+    damping = np.cumsum(ETS_PHI ** np.arange(1, steps + 1))
+    return level + damping[:, None] * trend + seasonal[(T + np.arange(steps)) % m]
+
+
+def _prophet(index: pd.DatetimeIndex, Y: np.ndarray, steps: int, freq) -> np.ndarray:
+    from prophet import Prophet
+    forecasts = np.empty((steps, Y.shape[1]))
+    for j in range(Y.shape[1]):
+        series = pd.DataFrame({"ds": index, "y": Y[:, j]}).dropna()
+        model = Prophet()
+        model.fit(series)
+        future = model.make_future_dataframe(periods=steps, freq=freq, include_history=False)
+        forecasts[:, j] = model.predict(future)["yhat"].to_numpy()
+    return forecasts
+
+
+def _forecast_chunk(model: str, index: pd.DatetimeIndex, Y: np.ndarray, steps: int, season: int, freq) -> np.ndarray:
+    """Forecasts a block of series; runs in a forecasting worker."""
+    if model == "prophet":
+        return _prophet(index, Y, steps, freq)
+    # Gaps are carried forward, and series that start late are back-filled from their first value
+    filled = pd.DataFrame(Y).ffill().bfill().to_numpy()
+    if model == "naive":
+        return seasonal_naive(filled, steps, season)
+    return holt_winters(filled, steps, season)
+
+
+def _plot_task(history: pd.DataFrame, forecast: pd.DataFrame, title: str, plot_format: str) -> bytes:
+    """Renders one small panel per series; runs in a forecasting worker because pyplot is not thread-safe.
+
+    The image is returned rather than stored, so the plot store is only written by the main process.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    cols = math.ceil(math.sqrt(len(forecast.columns)))
+    rows = math.ceil(len(forecast.columns) / cols)
+    fig, axes = plt.subplots(rows, cols, figsize=(3.2 * cols, 2.2 * rows), squeeze=False)
+    for ax, name in zip(axes.flat, forecast.columns):
+        ax.plot(history.index, history[name], linewidth=0.8)
+        ax.plot(forecast.index, forecast[name], linewidth=0.8, color="tab:orange")
+        ax.set_title(name, fontsize=8)
+        ax.tick_params(labelsize=6)
+    for ax in axes.flat[len(forecast.columns):]:
+        ax.set_visible(False)
+    fig.suptitle(title, fontsize=12, fontweight='bold')
+    fig.tight_layout()
+    try:
+        return render_figure(fig, plot_format)
+    finally:
+        plt.close(fig)
+
+
+def _chunks(n: int, model: str) -> list[slice]:
+    per_task = math.ceil(n / (FORECAST_WORKERS * 4)) if model == "prophet" else BASELINE_SERIES_PER_TASK
+    return [slice(start, min(start + per_task, n)) for start in range(0, n, per_task)]
+
+
+async def batch_forecast(df: pd.DataFrame, file_name: str, group_by: str | None = None,
+                         model: str = BATCH_FORECAST_MODEL, horizon: int = FORECAST_HORIZON, plot: bool = True,
+                         plot_format: str = "png") -> dict:
+    """Forecasts every series in a long (group_by) or wide frame in the forecasting workers.
+
+    Returns a summary, the path of a combined series/ds/yhat CSV and, optionally, a
+    small-multiples plot of the largest series.
+    """
+    if model not in BATCH_MODELS:
+        return {"error": f"Unknown forecast model {model}; use one of {', '.join(BATCH_MODELS)}."}
+    key = forecast_key(df, f"{file_name}|{group_by}|{model}|{plot}", horizon, plot_format)
+    with _results_lock:
+        if key in _results and all(has_plot(path, PLOT_DIR)
+                                   for path in (_results[key]["table_path"], _results[key].get("image_path")) if path):
+            _results.move_to_end(key)
+            return dict(_results[key])
+
+    try:
+        wide = (await asyncio.to_thread(split_series, df, group_by)).dropna(axis=1, how="all")
+    except Exception as e:
+        return {"error": f"Failed to format data for forecasting: {e}"}
+    if wide.shape[1] == 0 or len(wide) < 2:
+        return {"error": "Failed to format data for forecasting: each series needs at least two dates."}
+
+    step = pd.Series(wide.index).diff().median()
+    freq = pd.infer_freq(wide.index) if len(wide) >= 3 else None
+    season = _season_length(step)
+    steps = max(1, round(pd.Timedelta(days=horizon) / step))
+
+    start = time.perf_counter()
+    Y = wide.to_numpy(dtype=float)
+    chunks = _chunks(Y.shape[1], model)
+    try:
+        with span(f"batch_{model}"):
+            if model != "prophet" and len(chunks) == 1:
+                parts = [await asyncio.to_thread(_forecast_chunk, model, wide.index, Y, steps, season, freq or step)]
+            else:
+                parts = await asyncio.gather(*[
+                    asyncio.wrap_future(run_in_pool(_forecast_chunk, model, wide.index, Y[:, chunk], steps, season,
+                                                    freq or step))
+                    for chunk in chunks])
+    except Exception as e:
+        return {"error": f"Failed to generate forecast: {e}"}
+    elapsed = time.perf_counter() - start
+
+    future_index = pd.date_range(wide.index[-1], periods=steps + 1, freq=freq or step)[1:]
+    forecast = pd.DataFrame(np.hstack(parts), index=future_index, columns=wide.columns)
+    table = (forecast.rename_axis("ds").reset_index()
+             .melt(id_vars="ds", var_name="series", value_name="yhat")[["series", "ds", "yhat"]])
+
+    table_csv = await asyncio.to_thread(lambda: table.to_csv(index=False).encode("utf-8"))
+    table_name = await asyncio.to_thread(store_bytes, table_csv, ".csv", PLOT_DIR)
+
+    totals = forecast.sum().sort_values(ascending=False)
+    result = {
+        "answer": (f"Forecast {len(totals)} series for the next {horizon} days ({steps} steps) with the {model} model "
+                   f"in {elapsed:.2f}s ({len(totals) / max(elapsed, 1e-9):.0f} series/s). Highest forecast totals: "
+                   + ", ".join(f"{name} ({total:,.2f})" for name, total in totals.head(5).items()) + "."),
+        "table_path": plot_url(table_name),
+        "series": len(totals),
+        "series_per_second": len(totals) / max(elapsed, 1e-9),
+    }
+
+    if plot:
+        panels = list(totals.index[:BATCH_MAX_PANELS])
+        try:
+            with span("batch_plot"):
+                data = await asyncio.wrap_future(run_in_pool(_plot_task, wide[panels].tail(steps * 3),
+                                                             forecast[panels], f"Forecast for {file_name}",
+                                                             plot_format))
+                plot_name = await asyncio.to_thread(store_bytes, data, f".{plot_format}", PLOT_DIR)
+            result["image_path"] = plot_url(plot_name)
+        except Exception as e:
+            print(f"--- Could not render the small-multiples plot: {e} ---")
+
+    with _results_lock:
+        _results[key] = result
+        while len(_results) > _MAX_RESULTS:
+            _results.popitem(last=False)
+    return dict(result)
@@ -0,0 +1,85 @@
+"""Benchmarks batch forecasting throughput in series per second.
+
+Builds a long CSV-shaped frame of daily SKU sales (weekly and yearly seasonality, trend, noise)
+and forecasts every series with each batch model through the forecasting workers:
+    naive    seasonal naive, vectorized across series
+    ets      damped additive Holt-Winters, vectorized across series
+    prophet  one Prophet fit per series, spread over the worker processes (on --prophet-series only)
+The small-multiples plot is timed separately.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_batch_forecast --series 500 --days 730 --prophet-series 8
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+
+def make_frame(series: int, days: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    t = np.arange(days)
+    base = rng.uniform(10, 200, series)[:, None]
+    values = (base * (1 + 0.0005 * t + 0.2 * np.sin(2 * np.pi * t / 7) + 0.3 * np.sin(2 * np.pi * t / 365.25))
+              + rng.normal(0, 2, (series, days)))
+    return pd.DataFrame({
+        "ds": np.tile(pd.date_range("2023-01-01", periods=days).strftime("%Y-%m-%d"), series),
+        "sku": np.repeat([f"SKU-{i:05d}" for i in range(series)], days),
+        "y": values.ravel(),
+    })
+
+
+async def main_async(args):
+    # Import after LOGOS_FORECAST_WORKERS and LOGOS_PLOT_DIR are set
+    import forecasting
+    from batch_forecast import batch_forecast
+
+    df = make_frame(args.series, args.days)
+    # Start the workers before timing, as a running server would have
+    await asyncio.wrap_future(forecasting.run_in_pool(np.zeros, 1))
+
+    rows = []
+    for model, frame in (("naive", df), ("ets", df), ("prophet", make_frame(args.prophet_series, args.days))):
+        if model == "prophet" and not args.prophet_series:
+            continue
+        series = frame["sku"].nunique()
+        start = time.perf_counter()
+        result = await batch_forecast(frame, f"{model}.csv", "sku", model, plot=False)
+        seconds = time.perf_counter() - start
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        rows.append((model, series, seconds, result["series_per_second"]))
+
+    start = time.perf_counter()
+    await batch_forecast(df, "plot.csv", "sku", "ets", plot=True)
+    plot_seconds = time.perf_counter() - start - rows[1][2]
+    return rows, plot_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, default=500)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--prophet-series", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["LOGOS_FORECAST_WORKERS"] = str(args.workers)
+        os.environ["LOGOS_PLOT_DIR"] = tmp
+        rows, plot_seconds = asyncio.run(main_async(args))
+
+    print(f"\n{args.days} days per series, 365-day horizon, {args.workers} worker(s), {os.cpu_count()} CPU(s)\n")
+    print(f"{'model':<8} {'series':>7} {'seconds':>9} {'series/s':>10} {'fit series/s':>13}")
+    for model, series, seconds, fit_rate in rows:
+        print(f"{model:<8} {series:>7} {seconds:>9.2f} {series / seconds:>10.1f} {fit_rate:>13.1f}")
+    print("series/s includes reshaping and writing the combined table; fit series/s is the models alone")
+    print(f"\nSmall-multiples plot: about {max(plot_seconds, 0):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
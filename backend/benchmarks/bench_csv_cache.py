@@ -0,0 +1,95 @@
+"""Benchmarks CSV loading: cold parse, warm Parquet artifact load and in-memory cache hit.
+
+Writes a synthetic sales CSV (about 45 bytes per row, so --rows 50000000 is roughly 2.3 GB)
+and times
+    legacy     pd.read_csv(engine='python'), as every question used to (skipped above --legacy-max-rows)
+    cold       first load_dataframe: Arrow CSV parse plus writing the Parquet artifact
+    warm       load_dataframe after the in-memory cache is cleared: memory-mapped Parquet read
+    memory     load_dataframe served from the in-memory LRU
+    pushdown   one column of the rows for a single region and a narrow date range
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_csv_cache --rows 5000000
+"""
+
+import os
+import time
+import argparse
+import tempfile
+from datetime import date
+import numpy as np
+import pandas as pd
+import frame_cache
+import ingest
+
+REGIONS = np.array(["north", "south", "east", "west", "central"])
+
+
+def make_csv(path: str, rows: int, block: int = 1_000_000):
+    """Writes the CSV in blocks so multi-GB files do not need to fit in memory."""
+    rng = np.random.default_rng(0)
+    start = np.datetime64("2015-01-01")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("date,region,product,units,price,revenue\n")
+        for offset in range(0, rows, block):
+            n = min(block, rows - offset)
+            units = rng.integers(1, 500, n)
+            price = np.round(rng.uniform(1, 200, n), 2)
+            pd.DataFrame({
+                "date": start + (np.arange(offset, offset + n) * 3650 // rows).astype("timedelta64[D]"),
+                "region": REGIONS[rng.integers(0, len(REGIONS), n)],
+                "product": np.char.add("SKU-", rng.integers(0, 10_000, n).astype(str)),
+                "units": units,
+                "price": price,
+                "revenue": np.round(units * price, 2),
+            }).to_csv(f, header=False, index=False)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--legacy-max-rows", type=int, default=5_000_000,
+                        help="Skip the Python-engine baseline above this many rows")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "sales.csv")
+        print(f"Writing {args.rows:,} rows...")
+        make_csv(csv_path, args.rows)
+        ingest.ARTIFACTS_DIR = os.path.join(tmp, "artifacts")
+        frame_cache.FRAME_CACHE_MAX_BYTES = max(frame_cache.FRAME_CACHE_MAX_BYTES, 64 * 1024 ** 3)
+
+        results = []
+        if args.rows <= args.legacy_max_rows:
+            _, seconds = timed(lambda: pd.read_csv(csv_path, encoding='utf-8-sig', sep=',', engine='python'))
+            results.append(("legacy", seconds))
+
+        df, seconds = timed(lambda: ingest.load_dataframe(csv_path))
+        results.append(("cold", seconds))
+        frame_cache.clear_frames()
+        _, seconds = timed(lambda: ingest.load_dataframe(csv_path))
+        results.append(("warm", seconds))
+        _, seconds = timed(lambda: ingest.load_dataframe(csv_path))
+        results.append(("memory", seconds))
+        subset, seconds = timed(lambda: ingest.load_dataframe(
+            csv_path, columns=["revenue"],
+            filters=[("region", "==", "north"), ("date", ">=", date(2024, 1, 1)), ("date", "<", date(2024, 2, 1))]))
+        results.append(("pushdown", seconds))
+
+        artifact = ingest._artifact_path(csv_path, ".parquet")
+        print(f"CSV {os.path.getsize(csv_path) / 1e9:.2f} GB, Parquet {os.path.getsize(artifact) / 1e9:.2f} GB, "
+              f"in memory {frame_cache.frame_nbytes(df) / 1e9:.2f} GB, pushdown returned {len(subset):,} rows\n")
+        baseline = results[0][1]
+        print(f"{'load':<10} {'seconds':>9} {'speedup':>9}")
+        for name, seconds in results:
+            print(f"{name:<10} {seconds:>9.3f} {baseline / seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
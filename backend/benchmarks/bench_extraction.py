@@ -0,0 +1,134 @@
+"""Benchmarks document text extraction on a synthetic corpus of large PDFs and XLSX files.
+
+Compares the original extraction loop (string `+=`, full-mode openpyxl, one file after another,
+then a single split of the whole text) with the streaming extractors, run serially and in the
+process pool.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_extraction --pdfs 4 --pages 300 --xlsx 2 --rows 50000
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import openpyxl
+from PyPDF2 import PdfReader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+import extractors
+
+LINE = "Revenue for the segment increased 12% driven by cloud services and higher consumption {}"
+
+
+def make_pdf(path: str, pages: int, lines_per_page: int = 50):
+    """Writes a minimal text-only PDF without any third-party PDF writer."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in range(pages):
+        lines = " ".join(f"({LINE.format(page * lines_per_page + i)}) '" for i in range(lines_per_page))
+        stream = f"BT /F1 9 Tf 12 TL 40 800 Td {lines} ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def make_xlsx(path: str, rows: int, cols: int = 8):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sales")
+    sheet.append([f"Column {c}" for c in range(cols)])
+    for r in range(rows):
+        sheet.append([f"Item {r}"] + [r * c for c in range(1, cols)])
+    workbook.save(path)
+
+
+def legacy_extract(file_paths: list[str]) -> list[str]:
+    """The extraction and splitting code as it was inside answer_from_rag."""
+    raw_text = ''
+    for file_path in file_paths:
+        if file_path.endswith('.pdf'):
+            with open(file_path, 'rb') as f:
+                reader = PdfReader(f)
+                for page in reader.pages:
+                    raw_text += page.extract_text() + '\n'
+        elif file_path.endswith('.xlsx'):
+            workbook = openpyxl.load_workbook(file_path)
+            for sheet_name in workbook.sheetnames:
+                sheet = workbook[sheet_name]
+                for row in sheet.iter_rows():
+                    for cell in row:
+                        if cell.value:
+                            raw_text += str(cell.value) + ' '
+                    raw_text += '\n'
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    return splitter.split_text(raw_text)
+
+
+def run(label: str, extract, file_paths: list[str]):
+    start = time.perf_counter()
+    chunks = extract(file_paths)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:>8.2f}s {len(chunks):>10} chunks")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdfs", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--xlsx", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        file_paths = []
+        for i in range(args.pdfs):
+            file_paths.append(os.path.join(corpus_dir, f"filing_{i}.pdf"))
+            make_pdf(file_paths[-1], args.pages)
+        for i in range(args.xlsx):
+            file_paths.append(os.path.join(corpus_dir, f"ledger_{i}.xlsx"))
+            make_xlsx(file_paths[-1], args.rows)
+        total_mb = sum(os.path.getsize(path) for path in file_paths) / 1024 ** 2
+        print(f"Corpus: {args.pdfs} PDFs x {args.pages} pages, {args.xlsx} XLSX x {args.rows} rows ({total_mb:.1f} MB)")
+        print(f"Workers: {extractors.EXTRACT_WORKERS}, pages per task: {extractors.PDF_PAGES_PER_TASK}\n")
+
+        def stream(paths, parallel):
+            workers = extractors.EXTRACT_WORKERS
+            extractors.EXTRACT_WORKERS = workers if parallel else 1
+            try:
+                by_file = {path: [] for path in paths}
+                for path, segment in extractors.iter_files_text(paths):
+                    by_file[path].append(segment)
+                return [chunk for path in paths for chunk in extractors.iter_chunks(by_file[path], 1000, 200)]
+            finally:
+                extractors.EXTRACT_WORKERS = workers
+
+        legacy = run("legacy (+=, full openpyxl)", legacy_extract, file_paths)
+        serial = run("streaming, serial", lambda paths: stream(paths, parallel=False), file_paths)
+        # Start the pool before timing so the comparison excludes one-off worker spawn cost
+        extractors._get_pool().submit(int).result()
+        parallel = run("streaming, process pool", lambda paths: stream(paths, parallel=True), file_paths)
+        print(f"\nSpeed-up: serial {legacy / serial:.1f}x, parallel {legacy / parallel:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
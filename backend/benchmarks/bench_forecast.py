@@ -0,0 +1,87 @@
+"""Benchmarks concurrent forecast requests: inline threads versus the worker pool and its cache.
+
+Fires N concurrent forecasts of distinct synthetic daily series (two years each) and times
+    inline   asyncio.to_thread(generate_forecast_plot), as the handlers used to call it
+    pool     forecasting.forecast: Prophet in worker processes, the event loop stays free
+    cached   the same N forecasts again, answered from the forecast cache
+Event loop lag (the longest delay of a 10ms ticker) shows how responsive the server stays.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_forecast --requests 8 --workers 4
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+
+def make_series(seed: int, days: int = 730) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+    y = 100 + 0.05 * t + 10 * np.sin(2 * np.pi * t / 7) + 20 * np.sin(2 * np.pi * t / 365.25) + rng.normal(0, 3, days)
+    return pd.DataFrame({"ds": pd.date_range("2022-01-01", periods=days), "y": y})
+
+
+async def run(label: str, calls, results: list):
+    lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal lag
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag = max(lag, time.perf_counter() - start - 0.01)
+
+    ticking = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*calls)
+    seconds = time.perf_counter() - start
+    done.set()
+    await ticking
+    errors = sum("error" in outcome for outcome in outcomes)
+    results.append((label, seconds, lag, errors))
+
+
+async def main_async(args):
+    # Import after LOGOS_FORECAST_WORKERS and LOGOS_PLOT_DIR are set
+    import utils
+    import forecasting
+
+    series = [make_series(seed) for seed in range(args.requests)]
+    results = []
+    if not args.skip_inline:
+        await run("inline", [asyncio.to_thread(utils.generate_forecast_plot, df, f"series_{i}.csv")
+                             for i, df in enumerate(series)], results)
+
+    # Start the workers (and their Prophet import) before timing, as a running server would have
+    await forecasting.forecast(make_series(10_000, 60), "warmup.csv")
+    await run("pool", [forecasting.forecast(df, f"series_{i}.csv") for i, df in enumerate(series)], results)
+    await run("cached", [forecasting.forecast(df, f"series_{i}.csv") for i, df in enumerate(series)], results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--skip-inline", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["LOGOS_FORECAST_WORKERS"] = str(args.workers)
+        os.environ["LOGOS_PLOT_DIR"] = tmp
+        results = asyncio.run(main_async(args))
+
+    print(f"\n{args.requests} concurrent forecasts, {args.workers} worker(s), {os.cpu_count()} CPU(s)\n")
+    print(f"{'path':<8} {'total':>9} {'per forecast':>13} {'max loop lag':>13} {'errors':>7}")
+    for label, seconds, lag, errors in results:
+        print(f"{label:<8} {seconds:>8.2f}s {seconds / args.requests * 1000:>11.0f}ms {lag * 1000:>11.0f}ms {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
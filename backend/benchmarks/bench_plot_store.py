@@ -0,0 +1,72 @@
+"""Benchmarks the plot store: rendered size per format and serving from memory versus disk.
+
+Renders a two-year daily forecast-style figure as PNG, SVG and downscaled WebP, stores
+N renders of the same figure (deduplicated to one file) and then serves it repeatedly:
+    disk     a fresh read and hash of the file per request, as the StaticFiles mount did
+    memory   plot_store.read_plot, answered from the in-memory buffer after the first read
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_plot_store --renders 20 --reads 2000
+"""
+
+import os
+import time
+import argparse
+import hashlib
+import tempfile
+import numpy as np
+
+
+def make_figure():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    t = np.arange(730)
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.plot(t, 100 + 10 * np.sin(2 * np.pi * t / 7) + np.random.default_rng(0).normal(0, 3, t.size))
+    ax.fill_between(t[-365:], 80, 120, alpha=0.3)
+    return fig, plt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=20)
+    parser.add_argument("--reads", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Import after LOGOS_PLOT_DIR is set
+        os.environ["LOGOS_PLOT_DIR"] = tmp
+        import plot_store
+
+        fig, plt = make_figure()
+        print(f"\n{'format':<7} {'bytes':>9} {'render ms':>10}")
+        for plot_format in plot_store.PLOT_FORMATS:
+            start = time.perf_counter()
+            data = plot_store.render_figure(fig, plot_format)
+            print(f"{plot_format:<7} {len(data):>9,} {(time.perf_counter() - start) * 1000:>10.0f}")
+
+        for _ in range(args.renders):
+            name = plot_store.save_figure(fig, "png")
+        plt.close(fig)
+        print(f"\n{args.renders} identical renders stored as {len(os.listdir(tmp))} file(s)")
+
+        start = time.perf_counter()
+        for _ in range(args.reads):
+            with open(os.path.join(tmp, name), "rb") as f:
+                hashlib.sha256(f.read()).hexdigest()
+        disk = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.reads):
+            plot_store.read_plot(name)
+        memory = time.perf_counter() - start
+
+    print(f"\n{'path':<7} {'reads':>7} {'per read':>10}")
+    for label, seconds in (("disk", disk), ("memory", memory)):
+        print(f"{label:<7} {args.reads:>7} {seconds / args.reads * 1e6:>8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
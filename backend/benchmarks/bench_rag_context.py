@@ -0,0 +1,195 @@
+"""Benchmarks the retrieval context budget: prompt size, latency and answer hit rate against budget and retrieval mode.
+
+The sample filing (--pdf) is extracted and chunked as uploads are, then indexed in a corpus.
+Questions about figures stated in the filing are answered through answer_from_rag with:
+    previous  the old path: the vector top-k (LOGOS_RAG_TOP_K) chunks joined as they are, with no budget
+    vector    vector candidates only, deduplicated and packed into the budget
+    lexical   BM25 candidates only
+    hybrid    both rankings fused with reciprocal rank fusion (the default)
+The table reports, per mode and budget (--budgets, in tokens):
+    prompt    mean prompt size sent to the analyst model, in estimated tokens
+    latency   mean seconds per question, end to end
+    hit rate  share of questions whose expected figure reached the model (offline) or its answer (--live)
+    passages  mean passages in the context, after overlapping chunks were merged (chunks, for previous)
+
+Offline, a hashing bag-of-words embedding stands in for the embedding model and the analyst model
+answers after --latency seconds plus --prefill seconds per 1,000 prompt tokens, so prompt size shows
+in latency as it does with a real model. --live uses the configured models instead.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_rag_context --budgets 500,1000,2000,4000 --latency 0.5 --prefill 0.25
+"""
+
+import os
+import time
+import zlib
+import asyncio
+import argparse
+from typing import Any, List, Optional
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+DEFAULT_PDF = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                           "data", "NASDAQ_MSFT_2024.pdf")
+# Questions about the sample filing and the figure each answer must contain
+QUESTIONS = [
+    ("What was Microsoft's total revenue in fiscal year 2024?", "245,122"),
+    ("What was net income for fiscal year 2024?", "88,136"),
+    ("What were diluted earnings per share in 2024?", "11.80"),
+    ("What was operating income in fiscal year 2024?", "109,433"),
+    ("How much did Microsoft spend on research and development?", "29,510"),
+    ("How many people did Microsoft employ full-time as of June 30, 2024?", "228,000"),
+    ("What was the total purchase price of the Activision Blizzard acquisition?", "75.4 billion"),
+    ("How much revenue did the Microsoft Cloud generate?", "137.4 billion"),
+    ("How much remained of the share repurchase program?", "10.3 billion"),
+    ("What is Microsoft's custom in-house CPU for Azure called?", "Cobalt"),
+    ("By what percentage did Gaming revenue increase?", "39%"),
+    ("By how much did LinkedIn revenue increase?", "9%"),
+]
+
+
+class HashingEmbeddings(Embeddings):
+    """Embeds text as a normalized bag of hashed terms: a deterministic, offline stand-in for an embedding model."""
+
+    def __init__(self, size: int = 512):
+        self.size = size
+
+    def _embed(self, text: str) -> list[float]:
+        from corpus_index import tokenize
+        vector = np.zeros(self.size, dtype="float32")
+        for term in tokenize(text):
+            vector[zlib.crc32(term.encode()) % self.size] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+class PrefillChatModel(BaseChatModel):
+    """Answers after `latency` seconds plus `prefill` seconds per 1,000 prompt tokens, and keeps the last prompt."""
+
+    latency: float = 0.5
+    prefill: float = 0.25
+    last_prompt: str = ""
+
+    @property
+    def _llm_type(self) -> str:
+        return "prefill"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        raise NotImplementedError("The benchmark calls the model asynchronously")
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        from csv_analysis import estimate_tokens
+        self.last_prompt = "\n".join(str(message.content) for message in messages)
+        await asyncio.sleep(self.latency + self.prefill * estimate_tokens(self.last_prompt) / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="See the context."))])
+
+
+def build_corpus(pdf: str, embeddings):
+    import corpus_index
+    from extractors import iter_chunks, iter_text
+    from index_cache import CHUNK_SIZE, CHUNK_OVERLAP
+    name = os.path.basename(pdf)
+    chunks = list(iter_chunks(iter_text(pdf), CHUNK_SIZE, CHUNK_OVERLAP))
+    docs = [Document(page_content=chunk, metadata={"source": name}) for chunk in chunks]
+    corpus = corpus_index.CorpusIndex("flat")
+    corpus.add_document(name, "v1", np.array(embeddings.embed_documents(chunks), dtype="float32"), docs)
+    return corpus, name
+
+
+def previous_retrieve(corpus, query, query_vector, files=None, budget=None, mode=None):
+    """The old path: the vector top-k (LOGOS_RAG_TOP_K) chunks as they are, overlaps included."""
+    from corpus_index import RAG_TOP_K
+    docs = [doc for doc, _ in corpus.search(query_vector, RAG_TOP_K, files)]
+    return [{"source": None, "text": doc.page_content} for doc in docs], {"candidates": len(docs), "tokens": 0}
+
+
+def previous_context(passages: list[dict]) -> str:
+    """The old prompt context: the chunks' text joined with spaces, with no labels or deduplication."""
+    return " ".join(passage["text"] for passage in passages)
+
+
+async def run(mode: str, budget: int | None, name: str, model, live: bool) -> dict:
+    import retrieval
+    import rag_handler
+    from csv_analysis import estimate_tokens
+
+    prompts, hits, passages = [], 0, 0
+    packed = (rag_handler.retrieve, rag_handler.format_context)
+    if mode == "previous":
+        def counted_retrieve(*args, **kwargs):
+            nonlocal passages
+            chunks, info = previous_retrieve(*args, **kwargs)
+            passages += len(chunks)
+            return chunks, info
+
+        retrieval.RAG_RETRIEVAL = "vector"
+        rag_handler.retrieve, rag_handler.format_context = counted_retrieve, previous_context
+    else:
+        retrieval.RAG_RETRIEVAL, retrieval.RAG_CONTEXT_TOKENS = mode, budget
+    start = time.perf_counter()
+    try:
+        for question, expected in QUESTIONS:
+            before = retrieval.get_retrieval_stats()["passages"]
+            answer = await rag_handler.answer_from_rag(question, [name])
+            assert "error" not in answer, answer
+            passages += retrieval.get_retrieval_stats()["passages"] - before
+            if live:
+                hits += expected in answer["answer"]
+            else:
+                prompts.append(estimate_tokens(model.last_prompt))
+                hits += expected in retrieval.compress(model.last_prompt)
+    finally:
+        rag_handler.retrieve, rag_handler.format_context = packed
+    n = len(QUESTIONS)
+    return {"prompt": sum(prompts) / n if prompts else float("nan"), "latency": (time.perf_counter() - start) / n,
+            "hits": hits / n, "passages": passages / n}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default=DEFAULT_PDF, help="filing to index")
+    parser.add_argument("--budgets", default="500,1000,2000,4000", help="context budgets to compare, in tokens")
+    parser.add_argument("--modes", default="vector,lexical,hybrid")
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per LLM call, offline")
+    parser.add_argument("--prefill", type=float, default=0.25, help="seconds per 1,000 prompt tokens, offline")
+    parser.add_argument("--live", action="store_true", help="use the configured embedding and analyst models")
+    args = parser.parse_args()
+
+    import llm_client
+    import rag_handler
+
+    model = None
+    if not args.live:
+        model = PrefillChatModel(latency=args.latency, prefill=args.prefill)
+        llm_client.set_client("embeddings", HashingEmbeddings())
+        llm_client.set_client("analyst", model)
+    start = time.perf_counter()
+    corpus, name = build_corpus(args.pdf, llm_client.get_embeddings())
+    print(f"\nIndexed {name}: {corpus.get_stats()['chunks']} chunks, {corpus.get_stats()['terms']} terms "
+          f"in {time.perf_counter() - start:.1f}s; {len(QUESTIONS)} questions\n")
+    # The benchmark's corpus stands in for the one synced from the data directory
+    rag_handler.sync_corpus = lambda file_paths, embeddings: corpus
+
+    print(f"{'mode':<9} {'budget':>7} {'prompt':>8} {'latency':>8} {'hit rate':>9} {'passages':>9}")
+    configurations = [("previous", None)] + [(mode, int(budget)) for mode in args.modes.split(",")
+                                              for budget in args.budgets.split(",")]
+    for mode, budget in configurations:
+        result = asyncio.run(run(mode, budget, name, model, args.live))
+        print(f"{mode:<9} {budget or '-':>7} {result['prompt']:>8.0f} {result['latency']:>8.2f} "
+              f"{result['hits']:>9.0%} {result['passages']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
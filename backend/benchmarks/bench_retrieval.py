@@ -0,0 +1,94 @@
+"""Benchmarks corpus retrieval: recall@k and queries per second against corpus size and index type.
+
+Builds a synthetic corpus of clustered embedding vectors (documents of --chunks chunks each,
+added one document at a time as uploads would) and measures, for each index type:
+    build     time to add every document incrementally
+    qps       single-query searches per second over the whole corpus
+    recall    recall@k against exact search
+    filtered  qps and recall@k for searches restricted to --selected documents
+The last column is the time the old per-request path needed to merge the selected documents'
+indexes before a single search.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_retrieval --sizes 5000,20000,50000 --dim 256 --k 4
+"""
+
+import time
+import argparse
+import numpy as np
+import faiss
+
+
+def make_corpus(size: int, dim: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(size // 200, 8), dim)).astype("float32")
+    return (centers[rng.integers(len(centers), size=size)] + 0.3 * rng.normal(size=(size, dim))).astype("float32")
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+
+def run(index_type: str, vectors: np.ndarray, queries: np.ndarray, args) -> dict:
+    import corpus_index
+
+    corpus = corpus_index.CorpusIndex(index_type)
+    names = [f"doc_{i}.pdf" for i in range(0, len(vectors), args.chunks)]
+    start = time.perf_counter()
+    for name, first in zip(names, range(0, len(vectors), args.chunks)):
+        block = vectors[first:first + args.chunks]
+        corpus.add_document(name, "v1", block, [(name, first + i) for i in range(len(block))])
+    build = time.perf_counter() - start
+
+    truth = faiss.knn(queries, vectors, args.k)[1]
+    start = time.perf_counter()
+    found = [[chunk[1] for chunk, _ in corpus.search(query, args.k)] for query in queries]
+    qps = len(queries) / (time.perf_counter() - start)
+
+    selected = names[:: max(1, len(names) // args.selected)][:args.selected]
+    rows = np.concatenate([np.arange(names.index(name) * args.chunks, (names.index(name) + 1) * args.chunks)
+                           for name in selected])
+    filtered_truth = rows[faiss.knn(queries, vectors[rows], args.k)[1]]
+    start = time.perf_counter()
+    filtered = [[chunk[1] for chunk, _ in corpus.search(query, args.k, selected)] for query in queries]
+    filtered_qps = len(queries) / (time.perf_counter() - start)
+
+    # The previous path copied the selected documents' vectors into a fresh flat index per question
+    start = time.perf_counter()
+    merged = faiss.IndexFlatL2(vectors.shape[1])
+    merged.add(vectors[rows])
+    merged.search(queries[:1], args.k)
+    merge_ms = (time.perf_counter() - start) * 1000
+
+    return {"type": index_type, "built_as": corpus.built_as, "build": build, "qps": qps,
+            "recall": recall(found, truth), "filtered_qps": filtered_qps,
+            "filtered_recall": recall(filtered, filtered_truth), "merge_ms": merge_ms}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="5000,20000,50000")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--chunks", type=int, default=100, help="chunks per document")
+    parser.add_argument("--selected", type=int, default=3, help="documents in filtered searches")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    import corpus_index
+    faiss.omp_set_num_threads(1)
+    print(f"\ndim {args.dim}, {args.chunks} chunks per document, k={args.k}, {args.queries} queries, "
+          f"HNSW efSearch={corpus_index.CORPUS_HNSW_EF_SEARCH}, IVF nprobe={corpus_index.CORPUS_IVF_NPROBE}\n")
+    print(f"{'chunks':>7} {'index':<6} {'built as':<9} {'build s':>8} {'qps':>8} {'recall':>7} "
+          f"{'filt qps':>9} {'filt rec':>9} {'merge ms':>9}")
+    for size in map(int, args.sizes.split(",")):
+        vectors = make_corpus(size, args.dim)
+        queries = vectors[np.random.default_rng(1).choice(size, args.queries, replace=False)] + 0.05
+        for index_type in corpus_index.INDEX_TYPES:
+            r = run(index_type, vectors, queries.astype("float32"), args)
+            print(f"{size:>7} {r['type']:<6} {r['built_as']:<9} {r['build']:>8.2f} {r['qps']:>8.0f} {r['recall']:>7.3f} "
+                  f"{r['filtered_qps']:>9.0f} {r['filtered_recall']:>9.3f} {r['merge_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
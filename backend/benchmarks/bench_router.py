@@ -0,0 +1,104 @@
+"""Offline accuracy and latency benchmark for the tiered query router.
+
+Evaluates held-out questions (none of them are in router.ROUTER_EXAMPLES) under three file
+selections: the intended file only, both a CSV and a PDF (where the classifier has to decide),
+and no file at all for database and document questions (where it chooses between the database
+and the whole document corpus). Compares
+
+    rules       file-type rules, falling back to the classifier when they are not decisive
+    classifier  keyword nearest-centroid classifier on the query text alone
+    tiered      the production path: rules, classifier, LLM below the confidence threshold
+
+The LLM tier is only called with --with-llm (needs GEMINI_API_KEY). Otherwise questions that
+would escalate are counted and scored as misses.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_router [--with-llm]
+"""
+
+import time
+import asyncio
+import argparse
+import router
+
+HELD_OUT = [
+    ("SQL", "What were the total sales for Q1 2024?"),
+    ("SQL", "How many customers signed up this year?"),
+    ("SQL", "Which salesperson closed the most deals?"),
+    ("SQL", "What is the total revenue by territory?"),
+    ("SQL", "Show the number of orders per month."),
+    ("RAG", "What does the filing say about AI investments?"),
+    ("RAG", "Summarize the risk factors section."),
+    ("RAG", "What were the operating expenses according to the report?"),
+    ("RAG", "Who is the chief executive named in the document?"),
+    ("RAG", "Explain the dividend policy described in the report."),
+    ("CSV", "What is the maximum value in the y column?"),
+    ("CSV", "Forecast the next 30 days from this csv file."),
+    ("CSV", "How many rows does the csv have?"),
+    ("CSV", "Plot sales over time from the file."),
+    ("CSV", "What is the average price in the spreadsheet?"),
+]
+
+FILES = {"SQL": [], "RAG": ["NASDAQ_MSFT_2024.pdf"], "CSV": ["sales_data.csv"]}
+MIXED = ["sales_data.csv", "NASDAQ_MSFT_2024.pdf"]
+
+
+def cases():
+    for expected, query in HELD_OUT:
+        yield expected, query, FILES[expected]
+        if expected != "SQL":
+            yield expected, query, MIXED
+        if expected == "RAG":
+            yield expected, query, []
+
+
+def timed(fn, repeat: int = 200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+async def tiered(query: str, files: list[str], with_llm: bool) -> tuple[str, str, float]:
+    start = time.perf_counter()
+    source, confidence, tier = router.route_locally(query, files)
+    if confidence < router.ROUTER_CONFIDENCE_THRESHOLD:
+        tier = "llm"
+        source = await router._route_with_llm(query, files) if with_llm else "ESCALATED"
+    return source, tier, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--with-llm", action="store_true", help="Call the Gemini router for escalated questions")
+    args = parser.parse_args()
+
+    results = {"rules": [], "classifier": [], "tiered": []}
+    tiers = {}
+    llm_seconds = []
+    for expected, query, files in cases():
+        (source, _, _), seconds = timed(lambda: router.route_locally(query, files))
+        results["rules"].append((source == expected, seconds))
+        (source, _), seconds = timed(lambda: router.classify(query))
+        results["classifier"].append((source == expected, seconds))
+
+        source, tier, seconds = asyncio.run(tiered(query, files, args.with_llm))
+        if tier == "llm":
+            llm_seconds.append(seconds)
+        tiers[tier] = tiers.get(tier, 0) + 1
+        results["tiered"].append((source == expected, seconds))
+
+    total = len(results["tiered"])
+    print(f"{total} held-out cases, confidence threshold {router.ROUTER_CONFIDENCE_THRESHOLD}\n")
+    print(f"{'tier':<12} {'accuracy':>9} {'mean latency':>14}")
+    for name, rows in results.items():
+        accuracy = sum(ok for ok, _ in rows) / len(rows)
+        latency = sum(seconds for _, seconds in rows) / len(rows)
+        print(f"{name:<12} {accuracy:>8.0%} {latency * 1e6:>11.1f} us")
+    print(f"\nTiered decisions: {tiers}")
+    if llm_seconds and args.with_llm:
+        print(f"Mean LLM tier latency: {sum(llm_seconds) / len(llm_seconds):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
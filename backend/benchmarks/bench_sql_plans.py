@@ -0,0 +1,117 @@
+"""Benchmarks how SQL questions are answered: the ReAct agent, single-shot SQL and cached SQL plans.
+
+A scripted chat model with a fixed --latency per call stands in for Gemini. Given the agent's
+prompt it lists the tables, reads a schema, runs a query and gives a final answer, one LLM
+round trip per step, as the agent does with a real model. Given the single-shot prompt it
+returns the SQL. Questions run against a SQLite sales table of --rows rows.
+
+    agent   LOGOS_SQL_MODE=agent: the multi-step agent on every question
+    single  the SQL is generated in one call and run directly with a server-side cursor
+    cached  the same questions again: the validated SQL is reused and no LLM call is made
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_sql_plans --latency 0.5 --questions 10 --rows 200000
+"""
+
+import os
+import time
+import asyncio
+import sqlite3
+import argparse
+import tempfile
+from typing import Any, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+SQL = "SELECT region, SUM(amount) AS total FROM sales WHERE product = '{product}' GROUP BY region ORDER BY total DESC"
+AGENT_STEPS = [
+    "Action: sql_db_list_tables\nAction Input: ",
+    "Action: sql_db_schema\nAction Input: sales",
+    "Action: sql_db_query\nAction Input: " + SQL,
+]
+
+
+class ScriptedSQLModel(BaseChatModel):
+    """Answers the agent's prompts step by step and the single-shot prompt with SQL, after `latency` seconds."""
+
+    latency: float = 0.5
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-sql"
+
+    def _reply(self, prompt: str) -> str:
+        self.calls += 1
+        product = prompt.split("product ")[-1].split("?")[0].split()[0]
+        if prompt.rstrip().endswith("SQL:"):
+            return SQL.format(product=product)
+        # The agent's format instructions mention "Observation:" once; each completed step adds one
+        step = prompt.count("Observation:") - 1
+        if step < len(AGENT_STEPS):
+            return AGENT_STEPS[step].format(product=product)
+        return "Final Answer: [('north', 1.0), ('south', 2.0)]"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        text = self._reply("\n".join(str(message.content) for message in messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        text = self._reply("\n".join(str(message.content) for message in messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+def make_sqlite(path: str, rows: int):
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE sales (id INTEGER PRIMARY KEY, product TEXT, region TEXT, amount REAL, "
+                     "customer_email TEXT)")
+        conn.executemany("INSERT INTO sales VALUES (?, ?, ?, ?, ?)",
+                         [(i, f"p{i % 50}", ["north", "south", "east", "west"][i % 4], (i * 37) % 500 / 10,
+                           f"customer{i % 997}@example.com") for i in range(rows)])
+
+
+async def run(questions: list[str], mode: str, model: ScriptedSQLModel) -> tuple[float, int]:
+    import sql_handler
+    sql_handler.SQL_MODE = "agent" if mode == "agent" else "single"
+    calls = model.calls
+    start = time.perf_counter()
+    for question in questions:
+        answer = await sql_handler.answer_from_sql(question)
+        assert answer and "error" not in answer[0], answer
+    return (time.perf_counter() - start) / len(questions), model.calls - calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per LLM call")
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sales.db")
+        make_sqlite(path, args.rows)
+        os.environ["LOGOS_SQL_URL"] = f"sqlite:///{path}"
+        import llm_client
+        import sql_handler
+
+        model = ScriptedSQLModel(latency=args.latency)
+        llm_client.set_client("analyst", model)
+        questions = [f"What are total sales by region for product p{i} ?" for i in range(args.questions)]
+
+        print(f"\n{args.questions} questions, {args.latency}s per LLM call, {args.rows} rows\n")
+        print(f"{'mode':<8} {'s/question':>11} {'LLM calls':>10}")
+        for mode in ("agent", "single", "cached"):
+            seconds, calls = asyncio.run(run(questions, mode, model))
+            print(f"{mode:<8} {seconds:>11.3f} {calls:>10}")
+        print(f"\nSQL stats: {sql_handler.get_sql_stats()}")
+        sql_handler.dispose_engine()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmarks cold start: the time to import the app, to warm it up, and to answer its first requests.
+
+Each warm-up setting (LOGOS_WARMUP) runs in a fresh Python process against offline fixtures and
+the fake LLM server of run_eval, with a blocking warm-up (LOGOS_WARMUP_BLOCKING=1). The process
+reports:
+    import     seconds to import main, and which heavy dependencies that import loaded
+    warm-up    seconds spent in the startup hook
+    first/next seconds for the first and second request of each kind: a CSV, a RAG (document
+               extraction and embedding) and a SQL question, and a forecast job
+A heavy module in the "loaded at import" line is a regression in lazy loading.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_startup --modes none,clients,all --repeat 3
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+HEAVY_MODULES = ["prophet", "matplotlib", "faiss", "sqlalchemy", "google.generativeai", "langchain_google_genai",
+                 "PyPDF2", "docx", "openpyxl", "langchain_text_splitters"]
+REQUESTS = {
+    "csv": {"query": "What is the average price of all products?", "selected_files": ["pricing.csv"]},
+    "rag": {"query": "Who is eligible for the remote work program?", "selected_files": ["remote_work_policy.docx"]},
+    "sql": {"query": "What is the total number of customers?", "selected_files": []},
+}
+
+
+def child(port: int):
+    """Runs in the measured process: LOGOS_* settings and fixtures are prepared by the parent."""
+    start = time.perf_counter()
+    import main as app_main
+    import_seconds = time.perf_counter() - start
+    loaded = [module for module in HEAVY_MODULES if module in sys.modules]
+
+    from fastapi.testclient import TestClient
+    from benchmarks.run_eval import install_offline_models
+    install_offline_models(0.0, port)
+
+    result = {"import": import_seconds, "loaded": loaded}
+    start = time.perf_counter()
+    with TestClient(app_main.app) as client:
+        result["warmup"] = time.perf_counter() - start
+        for kind, body in REQUESTS.items():
+            for attempt in ("first", "next"):
+                start = time.perf_counter()
+                client.post("/api/ask", json={**body, "query": f"{body['query']} ({attempt})"}).raise_for_status()
+                result[f"{kind}_{attempt}"] = time.perf_counter() - start
+        for attempt, horizon in (("first", 30), ("next", 31)):
+            start = time.perf_counter()
+            job = client.post("/api/forecast/jobs", json={"file_name": "history.csv", "horizon": horizon}).json()
+            while job["status"] not in ("done", "failed"):
+                time.sleep(0.02)
+                job = client.get(f"/api/forecast/jobs/{job['job_id']}").json()
+            result[f"forecast_{attempt}"] = time.perf_counter() - start
+    print("RESULT " + json.dumps(result))
+
+
+def measure(mode: str, port: int) -> dict:
+    from benchmarks.run_eval import make_fixtures
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "LOGOS_WARMUP": mode, "LOGOS_WARMUP_BLOCKING": "1",
+               "LOGOS_SQL_URL": make_fixtures(tmp), "LOGOS_DATA_DIR": os.path.join(tmp, "data")}
+        for name in ("ARTIFACTS_DIR", "INDEX_CACHE_DIR", "CORPUS_DIR", "PLOT_DIR", "PROFILE_DIR"):
+            env[f"LOGOS_{name}"] = os.path.join(tmp, name.lower())
+        with open(os.path.join(tmp, "data", "history.csv"), "w") as f:
+            f.write("ds,y\n" + "".join(f"2023-{1 + i // 28:02d}-{1 + i % 28:02d},{100 + i % 7 * 3 + i * 0.1:.1f}\n"
+                                       for i in range(300)))
+        output = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child", "--port", str(port)],
+                                env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(next(line for line in output.splitlines() if line.startswith("RESULT "))[len("RESULT "):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="none,clients,all", help="LOGOS_WARMUP settings to compare")
+    parser.add_argument("--repeat", type=int, default=1, help="processes per setting; medians are reported")
+    parser.add_argument("--port", type=int, default=8777)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.port)
+        return
+
+    columns = ["import", "warmup"] + [f"{kind}_{attempt}" for kind in [*REQUESTS, "forecast"] for attempt in ("first", "next")]
+    print(f"\nSeconds, median of {args.repeat} process(es)\n")
+    print(f"{'mode':<10}" + "".join(f"{column:>15}" for column in columns))
+    for mode in args.modes.split(","):
+        runs = [measure(mode, args.port) for _ in range(args.repeat)]
+        print(f"{mode:<10}" + "".join(f"{statistics.median(run[column] for run in runs):>15.2f}" for column in columns))
+    print(f"\nLoaded at import: {', '.join(runs[0]['loaded']) or 'no heavy dependencies'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Benchmarks large uploads: throughput and server memory of the multipart and chunked upload APIs.
+
+Runs the app with uvicorn in this process, writes a file of --size-mb megabytes, and uploads it:
+    multipart   POST /api/upload, streamed from disk by the client
+    chunked     POST /api/uploads, PUT chunks of --chunk-mb, then complete
+    re-upload   the chunked upload again; the server finds the bytes unchanged
+For each it reports the wall time, MB/s and the peak growth of the process's resident memory
+(client and server share the process; the client streams from disk so its share is small).
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_upload --size-mb 4096 --chunk-mb 64
+"""
+
+import os
+import time
+import hashlib
+import argparse
+import tempfile
+import threading
+import httpx
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class PeakMemory:
+    """Samples resident memory in a thread and records the peak above the starting value."""
+
+    def __enter__(self):
+        self.start = self.peak = rss_bytes()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._done.wait(0.02):
+            self.peak = max(self.peak, rss_bytes())
+
+    def __exit__(self, *exc_info):
+        self._done.set()
+        self._thread.join()
+        self.growth = self.peak - self.start
+
+
+def make_file(path: str, size_mb: int) -> str:
+    digest = hashlib.sha256()
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for i in range(size_mb):
+            data = i.to_bytes(8, "little") + block[8:]
+            f.write(data)
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def upload_multipart(client: httpx.Client, path: str) -> dict:
+    with open(path, "rb") as f:
+        response = client.post("/api/upload", files={"file": ("bench.bin", f)})
+    response.raise_for_status()
+    return response.json()
+
+
+def upload_chunked(client: httpx.Client, path: str, chunk_mb: int, sha256: str) -> dict:
+    size = os.path.getsize(path)
+    upload_id = client.post("/api/uploads", json={"filename": "bench.bin", "size": size, "sha256": sha256}).json()["upload_id"]
+    chunk = chunk_mb * 1024 * 1024
+    with open(path, "rb") as f:
+        for offset in range(0, size, chunk):
+            def body(remaining=min(chunk, size - offset)):
+                while remaining:
+                    block = f.read(min(remaining, 1024 * 1024))
+                    remaining -= len(block)
+                    yield block
+            client.put(f"/api/uploads/{upload_id}", params={"offset": offset}, content=body()).raise_for_status()
+    response = client.post(f"/api/uploads/{upload_id}/complete")
+    response.raise_for_status()
+    return response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--chunk-mb", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8776)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, "data")
+        os.environ["LOGOS_DATA_DIR"] = data_dir
+        os.makedirs(data_dir)
+        from benchmarks.fake_llm import start_server
+        import main as app_main
+
+        source = os.path.join(tmp, "source.bin")
+        sha256 = make_file(source, args.size_mb)
+        start_server(app_main.app, args.port)
+        client = httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=None)
+
+        print(f"\n{args.size_mb} MB file, {args.chunk_mb} MB chunks\n")
+        print(f"{'mode':<10} {'seconds':>8} {'MB/s':>8} {'peak RSS +MB':>13} {'deduplicated':>13}")
+        runs = [("multipart", lambda: upload_multipart(client, source)),
+                ("chunked", lambda: upload_chunked(client, source, args.chunk_mb, sha256)),
+                ("re-upload", lambda: upload_chunked(client, source, args.chunk_mb, sha256))]
+        for mode, run in runs:
+            if mode != "re-upload" and os.path.exists(os.path.join(data_dir, "bench.bin")):
+                os.remove(os.path.join(data_dir, "bench.bin"))
+            with PeakMemory() as memory:
+                start = time.perf_counter()
+                result = run()
+                seconds = time.perf_counter() - start
+            assert result["content_hash"] == sha256
+            print(f"{mode:<10} {seconds:>8.2f} {args.size_mb / seconds:>8.0f} {memory.growth / 1024 ** 2:>13.0f} "
+                  f"{str(result['deduplicated']):>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""A local stand-in for the Gemini API, used by the load-test and benchmark scripts.
+
+The fake server answers every prompt after a fixed delay, and FakeHTTPChatModel is a LangChain
+chat model that calls it over HTTP, so benchmarks exercise real network I/O without API quota.
+"""
+
+import time
+import asyncio
+import threading
+import weakref
+import itertools
+from typing import Any, List, Optional
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from pydantic import BaseModel
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+ROUTER_REPLY = "CSV"
+ANSWER_REPLY = "Total sales were 1,234 units, up 12% on the previous quarter."
+
+# Shared HTTP clients so the benchmark measures the app, not client setup. httpx's pool
+# bookkeeping grows with its number of connections, so async calls are spread over several.
+_sync_client = httpx.Client(timeout=60)
+_async_clients = weakref.WeakKeyDictionary()
+_ASYNC_CLIENTS_PER_LOOP = 16
+
+
+def _async_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        _async_clients[loop] = itertools.cycle([httpx.AsyncClient(timeout=60) for _ in range(_ASYNC_CLIENTS_PER_LOOP)])
+    return next(_async_clients[loop])
+
+
+class GenerateRequest(BaseModel):
+    prompt: str
+
+
+def create_fake_llm_app(latency: float) -> FastAPI:
+    app = FastAPI()
+    # Prompts answered, so benchmarks can report LLM calls per request
+    app.state.calls = 0
+
+    @app.post("/generate")
+    async def generate(request: GenerateRequest):
+        app.state.calls += 1
+        await asyncio.sleep(latency)
+        if "Respond with only one word" in request.prompt:
+            return {"text": ROUTER_REPLY}
+        if "Final Answer:" in request.prompt:
+            # ReAct agents (the SQL agent) stop at the first final answer
+            return {"text": f"Thought: I now know the final answer\nFinal Answer: {ANSWER_REPLY}"}
+        return {"text": ANSWER_REPLY}
+
+    return app
+
+
+def start_server(app: FastAPI, port: int) -> uvicorn.Server:
+    """Runs an ASGI app with uvicorn in a daemon thread and waits until it accepts requests."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+class FakeHTTPChatModel(BaseChatModel):
+    """Chat model backed by the fake LLM server."""
+
+    base_url: str
+    model: str = "fake-gemini"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-http"
+
+    def _prompt(self, messages: List[BaseMessage]) -> str:
+        return "\n".join(str(message.content) for message in messages)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        response = _sync_client.post(f"{self.base_url}/generate", json={"prompt": self._prompt(messages)})
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response.json()["text"]))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        response = await _async_client().post(f"{self.base_url}/generate", json={"prompt": self._prompt(messages)})
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response.json()["text"]))])
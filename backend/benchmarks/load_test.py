@@ -0,0 +1,107 @@
+"""Load test for /api/ask against a local fake LLM server.
+
+Runs the real FastAPI app under uvicorn with every registered Gemini client replaced by a fake
+model that answers after --latency seconds. Each question is a CSV question with sales.csv selected,
+which the router decides by file type, so both paths make the same single LLM call (the analyst);
+the router LLM is only called when the local tiers are unsure. Two paths are measured:
+
+    blocking  the previous synchronous handler: `def` endpoint, blocking `llm.invoke` calls,
+              limited by FastAPI's worker threadpool, routing as the current /api/ask does
+    async     the current /api/ask: `ainvoke` calls bounded per model by LOGOS_LLM_CONCURRENCY
+
+The "calls" column is the number of LLM calls per request the fake server received, so a run
+that is not like-for-like shows up in the table.
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test --requests 400 --concurrency 100 --latency 0.5
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import statistics
+import httpx
+import pandas as pd
+from benchmarks.fake_llm import FakeHTTPChatModel, create_fake_llm_app, start_server
+import main
+import csv_handler
+import llm_client
+import router
+
+
+def install_fakes(llm_url: str):
+    def fake_client(model: str = "gemini-2.5-pro"):
+        return FakeHTTPChatModel(base_url=llm_url, model=model)
+
+    for role, model in llm_client.ROLE_MODELS.items():
+        llm_client.set_client(role, fake_client(model))
+    sales = pd.DataFrame({"ds": pd.date_range("2024-01-01", periods=90), "y": range(90)})
+    csv_handler.load_dataframe = lambda file_path: sales.copy()
+
+    @main.app.post("/bench/ask-blocking")
+    def ask_blocking(query: main.Query):
+        """The pre-async request path on a threadpool worker, making the LLM calls /api/ask makes, but blocking."""
+        llm = fake_client()
+        source, confidence, _ = router.route_locally(query.query, query.selected_files)
+        if confidence < router.ROUTER_CONFIDENCE_THRESHOLD:
+            source = llm.invoke(f"Query: {query.query}\nRespond with only one word: SQL, RAG, or CSV.").content.strip()
+        answer = llm.invoke(f"CSV Data:\n{sales.to_string()}\nQuery: {query.query}").content.strip()
+        return {"source": source, "query": query.query, "answer": answer, "image_path": None}
+
+
+async def run_load(url: str, requests: int, concurrency: int) -> tuple[float, list[float], int]:
+    """Sends `requests` questions from `concurrency` workers, each with its own connection."""
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        async with httpx.AsyncClient(timeout=300) as client:
+            for _ in remaining:
+                start = time.perf_counter()
+                response = await client.post(url, json={"query": "What were total sales?", "selected_files": ["sales.csv"]})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def percentile(values: list[float], pct: float) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[int(pct) - 1]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake LLM response time in seconds")
+    parser.add_argument("--mode", choices=["blocking", "async", "both"], default="both")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    fake_llm = create_fake_llm_app(args.latency)
+    start_server(fake_llm, args.port + 1)
+    install_fakes(f"http://127.0.0.1:{args.port + 1}")
+    start_server(main.app, args.port)
+
+    modes = ["blocking", "async"] if args.mode == "both" else [args.mode]
+    paths = {"blocking": "/bench/ask-blocking", "async": "/api/ask"}
+    print(f"{args.requests} requests, concurrency {args.concurrency}, fake LLM latency {args.latency}s, "
+          f"LOGOS_LLM_CONCURRENCY={os.getenv('LOGOS_LLM_CONCURRENCY', 'default')}\n")
+    print(f"{'mode':<10} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'calls':>6} {'errors':>7}")
+    for mode in modes:
+        url = f"http://127.0.0.1:{args.port}{paths[mode]}"
+        calls = fake_llm.state.calls
+        elapsed, latencies, errors = asyncio.run(run_load(url, args.requests, args.concurrency))
+        calls = (fake_llm.state.calls - calls) / args.requests
+        print(f"{mode:<10} {args.requests / elapsed:>8.1f} {percentile(latencies, 50):>7.2f}s "
+              f"{percentile(latencies, 95):>7.2f}s {percentile(latencies, 99):>7.2f}s {calls:>6.1f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,170 @@
+"""Runs the evaluation suite of docs/evaluation.md through /api/ask/batch and prints its result tables.
+
+Each suite (SQL, RAG, CSV questions with their file selection) is sent as one batch. The report
+lists the routed source of every question against the expected one, each question's latency,
+and the wall time of each batch.
+
+Offline (the default) is reproducible and needs no API key:
+    - the app runs in-process against a local fake LLM server (benchmarks.fake_llm);
+    - embeddings are deterministic fakes;
+    - fixtures are generated in a temporary directory: a pricing CSV, a remote-work policy
+      .docx and a SQLite sales database.
+Answers then come from the fake model, so only routing accuracy and the pipeline's own latency
+are meaningful. --live uses the configured Gemini models, data directory and database. --compare
+also asks every question through /api/ask one at a time, as the nightly job used to.
+
+Usage (from the backend directory):
+    python -m benchmarks.run_eval --latency 0.2 --compare
+    python -m benchmarks.run_eval --live --output eval_results.md
+"""
+
+import os
+import json
+import time
+import sqlite3
+import argparse
+import tempfile
+import statistics
+
+QUESTIONS_PATH = os.path.join(os.path.dirname(__file__), "eval_questions.json")
+LATENCY_TARGET = 5.0
+
+
+def make_fixtures(root: str) -> str:
+    """Writes the offline data directory and SQLite database, and returns the database URL."""
+    import docx
+    import pandas as pd
+
+    data_dir = os.path.join(root, "data")
+    os.makedirs(data_dir)
+    categories = ["Bikes", "Accessories", "Clothing", "Components"]
+    pd.DataFrame({
+        "sku": ["ABC-123"] + [f"SKU-{i:03d}" for i in range(1, 40)],
+        "product": ["X"] + [f"Product {i}" for i in range(1, 40)],
+        "category": [categories[i % 4] for i in range(40)],
+        "price": [round(9.99 + 7.5 * i, 2) for i in range(40)],
+    }).to_csv(os.path.join(data_dir, "pricing.csv"), index=False)
+
+    policy = docx.Document()
+    policy.add_heading("Remote Work Policy", 0)
+    for heading, text in [
+        ("Eligibility", "Full-time employees who have completed their probation period are eligible for the remote work program."),
+        ("Working abroad", "Employees may work from a different country for up to 30 days a year with manager approval."),
+        ("Home office", "A home office needs a dedicated desk, a stable internet connection of at least 50 Mbps and a company laptop."),
+        ("Communication expectations", "Remote employees are reachable during core hours, 10:00 to 15:00, and answer messages within four hours."),
+    ]:
+        policy.add_heading(heading, 1)
+        policy.add_paragraph(text)
+    policy.save(os.path.join(data_dir, "remote_work_policy.docx"))
+
+    db_path = os.path.join(root, "sales.db")
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("CREATE TABLE sales (order_id INTEGER, customer TEXT, product TEXT, territory TEXT, "
+                           "order_date TEXT, amount REAL)")
+        connection.executemany("INSERT INTO sales VALUES (?, ?, ?, ?, ?, ?)", [
+            (i, f"Customer {i % 25}", f"Product {i % 12}", ["North", "South", "East", "West"][i % 4],
+             f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}", 20.0 + (i * 37) % 400) for i in range(500)])
+    return f"sqlite:///{db_path}"
+
+
+def install_offline_models(latency: float, port: int):
+    from langchain_community.embeddings import DeterministicFakeEmbedding
+    from benchmarks.fake_llm import FakeHTTPChatModel, create_fake_llm_app, start_server
+    import llm_client
+
+    start_server(create_fake_llm_app(latency), port)
+    for role, model in llm_client.ROLE_MODELS.items():
+        llm_client.set_client(role, FakeHTTPChatModel(base_url=f"http://127.0.0.1:{port}", model=model))
+    llm_client.set_client("embeddings", DeterministicFakeEmbedding(size=64))
+
+
+def run_batches(client, suites: list[dict]) -> tuple[list[dict], dict]:
+    rows, walls = [], {}
+    for suite in suites:
+        start = time.perf_counter()
+        response = client.post("/api/ask/batch", json={"queries": suite["questions"],
+                                                       "selected_files": suite["selected_files"]})
+        walls[suite["source"]] = time.perf_counter() - start
+        response.raise_for_status()
+        for i, result in enumerate(response.json()["results"], 1):
+            rows.append({"id": f"{suite['source']}-{i}", "query": result["query"], "expected": suite["source"],
+                         "actual": result["source"], "seconds": result["seconds"],
+                         "error": isinstance(result["answer"], dict) and "error" in result["answer"]})
+    return rows, walls
+
+
+def run_one_by_one(client, suites: list[dict]) -> float:
+    start = time.perf_counter()
+    for suite in suites:
+        for question in suite["questions"]:
+            client.post("/api/ask", json={"query": question, "selected_files": suite["selected_files"]})
+    return time.perf_counter() - start
+
+
+def report(rows: list[dict], walls: dict, sequential: float | None) -> str:
+    passed = sum(row["expected"] == row["actual"] for row in rows)
+    latencies = [row["seconds"] for row in rows]
+    lines = ["### Accuracy", "", "| Query ID | Query | Expected Source | Actual Source | Pass/Fail |",
+             "| :--- | :--- | :--- | :--- | :--- |"]
+    lines += [f"| {row['id']} | {row['query']} | {row['expected']} | {row['actual']} | "
+              f"{'Pass' if row['expected'] == row['actual'] else 'Fail'} |" for row in rows]
+    lines += ["", f"**Overall Routing Accuracy:** {passed} / {len(rows)} ({passed / len(rows):.0%})",
+              f"**Answered without errors:** {sum(not row['error'] for row in rows)} / {len(rows)}", "",
+              "### Latency", "", "| Query ID | Latency (seconds) |", "| :--- | :--- |"]
+    lines += [f"| {row['id']} | {row['seconds']:.2f} |" for row in rows]
+    lines += ["", f"**Average Latency:** {statistics.mean(latencies):.2f} seconds",
+              f"**Over the {LATENCY_TARGET:.0f}-second target:** {sum(s > LATENCY_TARGET for s in latencies)}", "",
+              "| Batch | Wall time (seconds) |", "| :--- | :--- |"]
+    lines += [f"| {source} | {seconds:.2f} |" for source, seconds in walls.items()]
+    lines.append(f"| all | {sum(walls.values()):.2f} |")
+    if sequential is not None:
+        lines += ["", f"The same questions one at a time through /api/ask took {sequential:.2f} seconds "
+                      f"({sequential / sum(walls.values()):.1f}x the batches)."]
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="use the configured models, data and database")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM response time in seconds (offline)")
+    parser.add_argument("--compare", action="store_true", help="also ask each question through /api/ask")
+    parser.add_argument("--output", help="write the report to this Markdown file")
+    parser.add_argument("--port", type=int, default=8775)
+    args = parser.parse_args()
+
+    with open(QUESTIONS_PATH) as f:
+        suites = json.load(f)["suites"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.live:
+            # Point every store at the temporary directory before the app's modules read their settings
+            os.environ["LOGOS_SQL_URL"] = make_fixtures(tmp)
+            os.environ["LOGOS_DATA_DIR"] = os.path.join(tmp, "data")
+            for name in ("ARTIFACTS_DIR", "INDEX_CACHE_DIR", "CORPUS_DIR", "PLOT_DIR", "PROFILE_DIR"):
+                os.environ[f"LOGOS_{name}"] = os.path.join(tmp, name.lower())
+            install_offline_models(args.latency, args.port)
+
+        from fastapi.testclient import TestClient
+        import main as app_main
+        import answer_cache
+        import router
+
+        with TestClient(app_main.app) as client:
+            rows, walls = run_batches(client, suites)
+            sequential = None
+            if args.compare:
+                # Answers and routing decisions are computed again; files and indexes stay loaded
+                answer_cache.clear_answers()
+                router._decisions.clear()
+                sequential = run_one_by_one(client, suites)
+
+    text = report(rows, walls, sequential)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print("\nLive run\n" if args.live else f"\nOffline run (fake LLM, {args.latency}s per call)\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+import os
+import re
+import math
+import pickle
+import shutil
+import threading
+import numpy as np
+from index_cache import index_key
+from utils import file_content_hash
+
+# --- Corpus index configuration ---
+CORPUS_DIR = os.getenv("LOGOS_CORPUS_DIR", os.path.join("/Users/dheeraj/Desktop/finalmp", "corpus_index"))
+# "flat" searches exactly; "hnsw" and "ivf" are approximate and scale to large corpora
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+CORPUS_INDEX_TYPE = os.getenv("LOGOS_CORPUS_INDEX_TYPE", "flat")
+CORPUS_HNSW_M = int(os.getenv("LOGOS_CORPUS_HNSW_M", "32"))
+# Candidates kept while searching HNSW / inverted lists probed in IVF: higher means better recall, slower searches
+CORPUS_HNSW_EF_SEARCH = int(os.getenv("LOGOS_CORPUS_HNSW_EF_SEARCH", "64"))
+CORPUS_IVF_NPROBE = int(os.getenv("LOGOS_CORPUS_IVF_NPROBE", "16"))
+# IVF needs training data, so smaller corpora stay in a flat index
+CORPUS_IVF_MIN_TRAIN = int(os.getenv("LOGOS_CORPUS_IVF_MIN_TRAIN", "20000"))
+# Searches restricted to at most this many chunks compare against them exactly; approximate indexes
+# lose recall when a filter discards most of the candidates they visit
+CORPUS_EXACT_FILTER_MAX = int(os.getenv("LOGOS_CORPUS_EXACT_FILTER_MAX", "20000"))
+# Removed chunks are hidden from searches and dropped from the index once they make up this share of it
+CORPUS_COMPACT_RATIO = 0.25
+RAG_TOP_K = int(os.getenv("LOGOS_RAG_TOP_K", "4"))
+# BM25 parameters of the lexical index: term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Words, numbers with separators ("245,122", "11.80") and tickers; case is ignored
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,'&-][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from had has have how in is it its of on or that the this to "
+    "was were what when where which who why will with".split())
+
+
+def tokenize(text: str) -> list[str]:
+    """Splits text into the lowercase terms of the lexical index, without stopwords."""
+    return [term for term in TOKEN_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+
+class CorpusIndex:
+    """One long-lived index over the chunks of every document.
+
+    Documents are added, replaced and removed in place, and searches can be restricted to a
+    set of documents instead of building an index for them. Chunks are also kept in a BM25
+    inverted index, for lexical matches (tickers, line items, figures) that embeddings miss.
+    """
+
+    def __init__(self, index_type: str = CORPUS_INDEX_TYPE):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown corpus index type: {index_type}; use one of {', '.join(INDEX_TYPES)}.")
+        self.index_type = index_type
+        self.index = None
+        # The structure actually built: an "ivf" corpus is "flat" until it is large enough to train
+        self.built_as = None
+        self.built_size = 0
+        self.documents = {}
+        self.chunks = {}
+        self.deleted = set()
+        self.next_id = 0
+        # Lexical index: term -> {chunk id: term frequency}, and each chunk's length in terms
+        self.postings = {}
+        self.lengths = {}
+        self.total_length = 0
+        self.dirty = False
+        self.lock = threading.RLock()
+        self.stats = {"added": 0, "replaced": 0, "removed": 0, "rebuilds": 0, "searches": 0, "exact_searches": 0,
+                      "lexical_searches": 0}
+
+    def _build(self, vectors: np.ndarray, ids: np.ndarray):
+        # faiss is imported by the methods that use it, when the first document or question arrives
+        import faiss
+        d = vectors.shape[1]
+        if self.index_type == "hnsw":
+            base, built_as = faiss.IndexHNSWFlat(d, CORPUS_HNSW_M), "hnsw"
+        elif self.index_type == "ivf" and len(ids) >= CORPUS_IVF_MIN_TRAIN:
+            # About 4 * sqrt(n) lists, with the 39 training points per list that k-means asks for
+            nlist = max(1, min(int(4 * math.sqrt(len(ids))), len(ids) // 39))
+            base, built_as = faiss.IndexIVFFlat(faiss.IndexFlatL2(d), d, nlist), "ivf"
+            base.train(vectors)
+            # Lets the ID map reconstruct vectors when the index is rebuilt
+            base.make_direct_map()
+        else:
+            base, built_as = faiss.IndexFlatL2(d), "flat"
+        index = faiss.IndexIDMap2(base)
+        if len(ids):
+            index.add_with_ids(vectors, ids)
+        self.index, self.built_as, self.built_size = index, built_as, len(ids)
+        self.deleted = set()
+
+    def _rebuild(self):
+        ids = np.fromiter(self.chunks, dtype="int64", count=len(self.chunks))
+        vectors = self.index.reconstruct_batch(ids) if len(ids) else np.empty((0, self.index.d), dtype="float32")
+        self._build(vectors, ids)
+        self.stats["rebuilds"] += 1
+
+    def _maybe_rebuild(self):
+        if self.index is None:
+            # Only documents without text so far: there is nothing to compact or train
+            return
+        live = len(self.chunks)
+        if len(self.deleted) > CORPUS_COMPACT_RATIO * self.index.ntotal:
+            self._rebuild()
+        elif self.index_type == "ivf" and ((self.built_as == "flat" and live >= CORPUS_IVF_MIN_TRAIN)
+                                           or (self.built_as == "ivf" and live > 4 * self.built_size)):
+            # Train the inverted lists once there is enough data, and again when the corpus has outgrown them
+            self._rebuild()
+
+    def _index_terms(self, chunks):
+        for chunk_id, doc in chunks:
+            terms = tokenize(getattr(doc, "page_content", ""))
+            for term in terms:
+                postings = self.postings.setdefault(term, {})
+                postings[chunk_id] = postings.get(chunk_id, 0) + 1
+            self.lengths[chunk_id] = len(terms)
+            self.total_length += len(terms)
+
+    def _unindex_terms(self, chunk_id: int, doc):
+        for term in set(tokenize(getattr(doc, "page_content", ""))):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.lengths.pop(chunk_id, 0)
+
+    def _remove(self, file_name: str):
+        document = self.documents.pop(file_name)
+        for chunk_id in document["ids"].tolist():
+            self._unindex_terms(chunk_id, self.chunks.pop(chunk_id))
+        self.deleted.update(document["ids"].tolist())
+
+    def add_document(self, file_name: str, version: str, vectors: np.ndarray, docs: list) -> bool:
+        """Adds a document's chunk vectors and Documents, replacing an older version. Returns False if already current."""
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        with self.lock:
+            current = self.documents.get(file_name)
+            if current is not None and current["version"] == version:
+                return False
+            if current is not None:
+                self._remove(file_name)
+                self.stats["replaced"] += 1
+            ids = np.arange(self.next_id, self.next_id + len(docs), dtype="int64")
+            self.next_id += len(docs)
+            if len(ids) and self.index is not None and self.index.d != vectors.shape[1]:
+                # The embedding model changed, so the other documents must be added again too
+                self.documents.clear()
+                self.chunks.clear()
+                self.postings, self.lengths, self.total_length = {}, {}, 0
+                self.index = None
+            if len(ids):
+                if self.index is None:
+                    self._build(vectors, ids)
+                else:
+                    self.index.add_with_ids(vectors, ids)
+            self.documents[file_name] = {"version": version, "ids": ids}
+            self.chunks.update(zip(ids.tolist(), docs))
+            self._index_terms(zip(ids.tolist(), docs))
+            self.stats["added"] += 1
+            self.dirty = True
+            self._maybe_rebuild()
+            return True
+
+    def remove_document(self, file_name: str) -> bool:
+        with self.lock:
+            if file_name not in self.documents:
+                return False
+            self._remove(file_name)
+            self.stats["removed"] += 1
+            self.dirty = True
+            self._maybe_rebuild()
+            return True
+
+    def document_names(self) -> list[str]:
+        with self.lock:
+            return list(self.documents)
+
+    def version(self, file_name: str) -> str | None:
+        with self.lock:
+            document = self.documents.get(file_name)
+            return document["version"] if document else None
+
+    def _params(self, selector=None):
+        import faiss
+        if self.built_as == "hnsw":
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=max(CORPUS_HNSW_EF_SEARCH, 1))
+        if self.built_as == "ivf":
+            return faiss.SearchParametersIVF(sel=selector, nprobe=CORPUS_IVF_NPROBE)
+        return faiss.SearchParameters(sel=selector) if selector is not None else None
+
+    def search(self, vector, k: int = RAG_TOP_K, files: list[str] | None = None) -> list[tuple]:
+        """Returns the k nearest chunks as (Document, squared L2 distance), optionally only from the given files."""
+        import faiss
+        query = np.asarray(vector, dtype="float32").reshape(1, -1)
+        with self.lock:
+            self.stats["searches"] += 1
+            if self.index is None or not self.chunks:
+                return []
+            selector = None
+            if files is not None:
+                ids = [self.documents[name]["ids"] for name in dict.fromkeys(files) if name in self.documents]
+                ids = np.concatenate(ids) if ids else np.empty(0, dtype="int64")
+                if not len(ids):
+                    return []
+                if self.built_as == "flat" or len(ids) > CORPUS_EXACT_FILTER_MAX:
+                    selector = faiss.IDSelectorBatch(ids)
+                else:
+                    self.stats["exact_searches"] += 1
+                    distances, positions = faiss.knn(query, self.index.reconstruct_batch(ids), min(k, len(ids)))
+                    found = [(ids[p], distance) for p, distance in zip(positions[0], distances[0]) if p >= 0]
+                    return [(self.chunks[int(i)], float(distance)) for i, distance in found]
+            elif self.deleted:
+                hidden = faiss.IDSelectorBatch(np.fromiter(self.deleted, dtype="int64", count=len(self.deleted)))
+                selector = faiss.IDSelectorNot(hidden)
+            distances, ids = self.index.search(query, k, params=self._params(selector))
+            return [(self.chunks[int(i)], float(distance)) for i, distance in zip(ids[0], distances[0])
+                    if i >= 0 and int(i) in self.chunks]
+
+    def lexical_search(self, query: str, k: int = RAG_TOP_K, files: list[str] | None = None) -> list[tuple]:
+        """Returns the k chunks that best match the query's terms as (Document, BM25 score), optionally only from the given files."""
+        terms = dict.fromkeys(tokenize(query))
+        with self.lock:
+            self.stats["lexical_searches"] += 1
+            if not terms or not self.lengths:
+                return []
+            allowed = None
+            if files is not None:
+                allowed = {chunk_id for name in dict.fromkeys(files) if name in self.documents
+                           for chunk_id in self.documents[name]["ids"].tolist()}
+                if not allowed:
+                    return []
+            n = len(self.lengths)
+            average_length = max(self.total_length / n, 1.0)
+            scores = {}
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings.items():
+                    if allowed is not None and chunk_id not in allowed:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[chunk_id] / average_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [(self.chunks[chunk_id], score) for chunk_id, score in best]
+
+    def save(self, path: str):
+        """Writes the index and its chunk metadata, replacing a previous copy atomically."""
+        with self.lock:
+            tmp_dir = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            os.makedirs(tmp_dir, exist_ok=True)
+            if self.index is not None:
+                import faiss
+                faiss.write_index(self.index, os.path.join(tmp_dir, "index.faiss"))
+            state = {key: getattr(self, key) for key in ("index_type", "built_as", "built_size", "documents", "chunks",
+                                                         "deleted", "next_id", "postings", "lengths", "total_length")}
+            with open(os.path.join(tmp_dir, "corpus.pkl"), "wb") as f:
+                pickle.dump(state, f)
+            old_dir = f"{path}.{os.getpid()}.old"
+            if os.path.isdir(path):
+                os.rename(path, old_dir)
+            os.rename(tmp_dir, path)
+            shutil.rmtree(old_dir, ignore_errors=True)
+            self.dirty = False
+
+    @classmethod
+    def load(cls, path: str) -> "CorpusIndex":
+        with open(os.path.join(path, "corpus.pkl"), "rb") as f:
+            state = pickle.load(f)
+        corpus = cls(state.pop("index_type"))
+        corpus.__dict__.update(state)
+        if "postings" not in state:
+            # Saved before the lexical index existed
+            corpus._index_terms(corpus.chunks.items())
+        index_path = os.path.join(path, "index.faiss")
+        if os.path.exists(index_path):
+            import faiss
+            corpus.index = faiss.read_index(index_path)
+        return corpus
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {**self.stats, "index_type": self.index_type, "built_as": self.built_as,
+                    "documents": len(self.documents), "chunks": len(self.chunks), "deleted": len(self.deleted),
+                    "terms": len(self.postings)}
+
+
+def document_vectors(vectorstore) -> tuple[np.ndarray, list]:
+    """Returns a per-file LangChain FAISS store's vectors and Documents, in index order."""
+    n = vectorstore.index.ntotal
+    vectors = vectorstore.index.reconstruct_n(0, n) if n else np.empty((0, vectorstore.index.d), dtype="float32")
+    docs = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]) for i in range(n)]
+    return vectors, docs
+
+
+_corpus = None
+_corpus_lock = threading.Lock()
+
+
+def _corpus_path() -> str:
+    return os.path.join(CORPUS_DIR, CORPUS_INDEX_TYPE)
+
+
+def get_corpus() -> CorpusIndex:
+    """Returns the process-wide corpus index, loading the saved copy on first use."""
+    global _corpus
+    with _corpus_lock:
+        if _corpus is None:
+            path = _corpus_path()
+            try:
+                _corpus = CorpusIndex.load(path) if os.path.isdir(path) else CorpusIndex()
+            except Exception as e:
+                print(f"--- Could not load the corpus index, starting empty: {e} ---")
+                _corpus = CorpusIndex()
+        return _corpus
+
+
+def update_corpus(indexes: dict) -> CorpusIndex:
+    """Adds new or changed documents to the corpus from their per-file indexes (keyed by file path).
+
+    Documents already in the corpus at their current content are skipped without reading their vectors.
+    """
+    corpus = get_corpus()
+    for file_path, vectorstore in indexes.items():
+        file_name = os.path.basename(file_path)
+        version = index_key(file_content_hash(file_path))
+        if corpus.version(file_name) == version:
+            continue
+        if vectorstore is None:
+            corpus.add_document(file_name, version, np.empty((0, 0), dtype="float32"), [])
+        else:
+            corpus.add_document(file_name, version, *document_vectors(vectorstore))
+    return corpus
+
+
+def save_corpus():
+    """Persists the corpus index if it changed since it was loaded or last saved."""
+    with _corpus_lock:
+        corpus = _corpus
+    if corpus is not None and corpus.dirty:
+        corpus.save(_corpus_path())
+
+
+def get_corpus_stats() -> dict:
+    return get_corpus().get_stats()
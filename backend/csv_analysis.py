@@ -0,0 +1,236 @@
+import os
+import re
+import json
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+# Approximate prompt budget for CSV data, in tokens (estimated at 4 characters per token)
+CSV_TOKEN_BUDGET = int(os.getenv("LOGOS_CSV_TOKEN_BUDGET", "8000"))
+# Number of operations the model may request per question
+MAX_OPERATIONS = 5
+TOP_VALUES = 5
+
+AGGREGATIONS = {"sum", "mean", "median", "min", "max", "count", "nunique", "std"}
+FILTER_OPS = {"==", "!=", ">", ">=", "<", "<=", "contains", "in"}
+
+_profiles = OrderedDict()
+_profiles_lock = threading.Lock()
+_MAX_PROFILES = 32
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+# --- Profiling ---
+
+def profile_dataframe(df: pd.DataFrame) -> dict:
+    """Summarizes a DataFrame's schema and per-column statistics."""
+    columns = []
+    for name in df.columns:
+        series = df[name]
+        column = {
+            "name": str(name),
+            "dtype": str(series.dtype),
+            "non_null": int(series.notna().sum()),
+            "unique": int(series.nunique()),
+        }
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            stats = series.describe()
+            column.update({key: _scalar(stats[key]) for key in ("min", "max", "mean", "std") if key in stats})
+            column["sum"] = _scalar(series.sum())
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            column.update({"min": str(series.min()), "max": str(series.max())})
+        else:
+            column["top_values"] = {str(k): int(v) for k, v in series.value_counts().head(TOP_VALUES).items()}
+        columns.append(column)
+    return {"rows": len(df), "columns": columns}
+
+
+def get_profile(version: str, df: pd.DataFrame) -> dict:
+    """Returns the profile for a file version, computing it only the first time."""
+    with _profiles_lock:
+        if version in _profiles:
+            _profiles.move_to_end(version)
+            return _profiles[version]
+    profile = profile_dataframe(df)
+    with _profiles_lock:
+        _profiles[version] = profile
+        while len(_profiles) > _MAX_PROFILES:
+            _profiles.popitem(last=False)
+    return profile
+
+
+def format_profile(profile: dict) -> str:
+    lines = [f"Rows: {profile['rows']}", "Columns:"]
+    for column in profile["columns"]:
+        details = ", ".join(f"{key}={value}" for key, value in column.items() if key not in ("name", "dtype"))
+        lines.append(f"- {column['name']} ({column['dtype']}): {details}")
+    return "\n".join(lines)
+
+
+def _scalar(value):
+    if pd.isna(value):
+        return None
+    return round(float(value), 4) if isinstance(value, float) else value.item() if hasattr(value, "item") else value
+
+
+# --- Planning ---
+
+PLAN_INSTRUCTIONS = """
+Request the computations you need as JSON, using only the columns listed above:
+{"operations": [ ... up to 5 operations ... ]}
+
+Each operation has a "type" and optional "filters", "sort_by", "ascending" and "limit" fields.
+- {"type": "aggregate", "group_by": ["col", ...], "metrics": {"col": ["sum", "mean", "median", "min", "max", "count", "nunique", "std"]}}
+  Omit group_by for totals over the whole table. Aggregated columns are named like "col_sum".
+- {"type": "rows", "columns": ["col", ...]} returns matching rows.
+- {"type": "value_counts", "column": "col"}
+- {"type": "describe", "columns": ["col", ...]}
+Filters look like {"column": "col", "op": "==", "value": 10}; op is one of ==, !=, >, >=, <, <=, contains, in.
+
+Respond with only the JSON object.
+"""
+
+
+def parse_plan(text: str) -> list[dict]:
+    """Extracts the operation list from the model's reply, tolerating code fences around it."""
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        return []
+    try:
+        plan = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return []
+    operations = plan.get("operations", []) if isinstance(plan, dict) else []
+    return [op for op in operations if isinstance(op, dict)][:MAX_OPERATIONS]
+
+
+# --- Execution ---
+
+def _check_columns(df: pd.DataFrame, columns) -> list:
+    columns = [columns] if isinstance(columns, str) else list(columns or [])
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        raise ValueError(f"Unknown column(s): {', '.join(map(str, missing))}")
+    return columns
+
+
+def _apply_filters(df: pd.DataFrame, filters: list) -> pd.DataFrame:
+    mask = pd.Series(True, index=df.index)
+    for condition in filters or []:
+        column = _check_columns(df, condition.get("column"))[0]
+        op, value = condition.get("op"), condition.get("value")
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        series = df[column]
+        if op == "contains":
+            mask &= series.astype(str).str.contains(str(value), case=False, na=False, regex=False)
+        elif op == "in":
+            mask &= series.isin(value if isinstance(value, list) else [value])
+        else:
+            if pd.api.types.is_datetime64_any_dtype(series):
+                value = pd.Timestamp(value)
+            mask &= {"==": series.eq, "!=": series.ne, ">": series.gt, ">=": series.ge,
+                     "<": series.lt, "<=": series.le}[op](value)
+    return df[mask]
+
+
+def run_operation(df: pd.DataFrame, operation: dict) -> pd.DataFrame:
+    """Runs one planned operation with vectorized pandas calls."""
+    frame = _apply_filters(df, operation.get("filters"))
+    kind = operation.get("type")
+
+    if kind == "aggregate":
+        # Models often write a single function as a string rather than a one-item list
+        metrics = {column: [functions] if isinstance(functions, str) else list(functions)
+                   for column, functions in (operation.get("metrics") or {}).items()}
+        _check_columns(frame, metrics)
+        for functions in metrics.values():
+            unsupported = set(functions) - AGGREGATIONS
+            if unsupported:
+                raise ValueError(f"Unsupported aggregation(s): {', '.join(sorted(unsupported))}")
+        group_by = _check_columns(frame, operation.get("group_by"))
+        if not metrics:
+            result = frame.groupby(group_by).size().rename("count").reset_index() if group_by \
+                else pd.DataFrame({"count": [len(frame)]})
+        elif group_by:
+            result = frame.groupby(group_by).agg(metrics)
+            result.columns = [f"{column}_{function}" for column, function in result.columns]
+            result = result.reset_index()
+        else:
+            result = pd.DataFrame({f"{column}_{function}": [frame[column].agg(function)]
+                                   for column, functions in metrics.items() for function in functions})
+    elif kind == "rows":
+        columns = _check_columns(frame, operation.get("columns")) or list(frame.columns)
+        result = frame[columns]
+    elif kind == "value_counts":
+        column = _check_columns(frame, operation.get("column"))[0]
+        result = frame[column].value_counts().rename("count").reset_index()
+    elif kind == "describe":
+        columns = _check_columns(frame, operation.get("columns")) or list(frame.columns)
+        result = frame[columns].describe(include="all").reset_index()
+    else:
+        raise ValueError(f"Unsupported operation type: {kind}")
+
+    sort_by = operation.get("sort_by")
+    if sort_by in result.columns:
+        result = result.sort_values(sort_by, ascending=bool(operation.get("ascending", False)))
+    limit = operation.get("limit")
+    if isinstance(limit, int) and limit > 0:
+        result = result.head(limit)
+    return result
+
+
+def run_operations(df: pd.DataFrame, operations: list[dict]) -> list[tuple[dict, pd.DataFrame | str]]:
+    """Runs each operation, returning its result table or an error message."""
+    results = []
+    for operation in operations:
+        try:
+            results.append((operation, run_operation(df, operation)))
+        except Exception as e:
+            results.append((operation, f"Error: {e}"))
+    return results
+
+
+# --- Rendering ---
+
+def render_table(table: pd.DataFrame, token_budget: int) -> str:
+    """Renders a table as CSV, keeping as many rows as fit in the token budget."""
+    text = table.to_csv(index=False)
+    if estimate_tokens(text) <= token_budget:
+        return text
+    # Halve the row count until the rendering fits; a table is never dropped entirely
+    rows = len(table)
+    while rows > 1:
+        rows //= 2
+        text = table.head(rows).to_csv(index=False)
+        if estimate_tokens(text) <= token_budget:
+            break
+    return text + f"... ({len(table) - rows} more rows omitted)\n"
+
+
+def render_results(results: list[tuple[dict, pd.DataFrame | str]], token_budget: int) -> str:
+    """Renders operation results, sharing the token budget equally between them."""
+    if not results:
+        return "No computations were run."
+    share = max(token_budget // len(results), 1)
+    sections = []
+    for operation, result in results:
+        header = json.dumps(operation, default=str)
+        body = result if isinstance(result, str) else render_table(result, share)
+        sections.append(f"Operation: {header}\n{body}")
+    return "\n\n".join(sections)
+
+
+def render_if_fits(df: pd.DataFrame, token_budget: int) -> str | None:
+    """Renders the whole frame as CSV if it fits in the token budget, else returns None.
+
+    The size is first estimated from a sample so large files are never rendered in full.
+    """
+    sample = df.head(100).to_csv(index=False)
+    if estimate_tokens(sample) * max(len(df), 1) / max(min(len(df), 100), 1) > token_budget * 1.5:
+        return None
+    text = df.to_csv(index=False)
+    return text if estimate_tokens(text) <= token_budget else None
@@ -1,12 +1,20 @@
 
 import os
-import pandas as pd
-from langchain_google_genai import ChatGoogleGenerativeAI
-from utils import generate_forecast_plot
+import asyncio
+from utils import file_content_hash
+from forecasting import forecast
+from batch_forecast import batch_forecast, find_batch_layout, model_for_query
+from csv_analysis import (CSV_TOKEN_BUDGET, PLAN_INSTRUCTIONS, estimate_tokens, format_profile, get_profile,
+                          parse_plan, render_if_fits, render_results, render_table, run_operations)
+from ingest import DATA_DIR, load_dataframe
+from llm_client import ainvoke, get_llm
+from events import emit
+from metrics import span
 
-def answer_from_csv(query: str, selected_files: list[str] = [], plotting_intent: bool = False) -> dict:
+async def answer_from_csv(query: str, selected_files: list[str] = [], plotting_intent: bool = False,
+                         plot_format: str = "png") -> dict:
     """Answers a question from a CSV file, with an option to generate a forecast plot."""
-    data_dir = "/Users/dheeraj/Desktop/finalmp/data"
+    data_dir = DATA_DIR
     
     if not selected_files:
         return {"error": "Please select a CSV file to query."}
@@ -24,19 +32,34 @@ def answer_from_csv(query: str, selected_files: list[str] = [], plotting_intent:
     file_path = os.path.join(data_dir, csv_file_name)
 
     try:
-        df = pd.read_csv(file_path, encoding='utf-8-sig', sep=',', engine='python')
+        with span("load_csv"):
+            df = await asyncio.to_thread(load_dataframe, file_path)
     except Exception as e:
         return {"error": f"Error reading CSV file: {e}"}
 
     # --- Forecasting Logic ---
     if plotting_intent:
         print(f"--- Plotting intent detected for CSV. Attempting to generate forecast... ---")
-        return generate_forecast_plot(df, csv_file_name)
+        is_batch, group_by = find_batch_layout(df, query)
+        if is_batch:
+            model = model_for_query(query)
+            print(f"--- Several series found (group by: {group_by or 'columns'}), batch forecasting with {model}... ---")
+            result = await batch_forecast(df, csv_file_name, group_by, model, plot_format=plot_format)
+            if "error" not in result:
+                emit("forecast_ready", image_path=result.get("image_path"), table_path=result["table_path"])
+            return result
+        return await forecast(df, csv_file_name, plot_format=plot_format)
 
     # --- Standard CSV Analysis Logic ---
     else:
-        csv_content = df.to_string()
-        llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", google_api_key=os.getenv("GEMINI_API_KEY"))
+        llm = get_llm("analyst")
+        csv_content = await asyncio.to_thread(render_if_fits, df, CSV_TOKEN_BUDGET)
+        if csv_content is None:
+            # Too large to send whole: let the model plan computations over a profile of the file
+            try:
+                csv_content = await _compute_context(llm, query, df, file_path)
+            except Exception as e:
+                return {"error": f"Error during LLM analysis of CSV: {e}"}
         prompt = f"""
         You are an expert business analyst. Your task is to answer the user's query based on the provided CSV data.
 
@@ -48,8 +71,36 @@ def answer_from_csv(query: str, selected_files: list[str] = [], plotting_intent:
         Based on the CSV data, provide a concise and insightful answer to the query.
         """
         try:
-            response = llm.invoke(prompt)
+            response = await ainvoke(llm, prompt, stream=True)
             return {"answer": response.content.strip()}
         except Exception as e:
             return {"error": f"Error during LLM analysis of CSV: {e}"}
 
+
+async def _compute_context(llm, query: str, df, file_path: str) -> str:
+    """Profiles the frame, asks the model which aggregations it needs and runs them locally."""
+    version = await asyncio.to_thread(file_content_hash, file_path)
+    profile = format_profile(await asyncio.to_thread(get_profile, version, df))
+    prompt = f"""
+        You are an expert business analyst. The user's CSV file is too large to show in full, so you get its profile instead.
+
+        Profile:
+        {profile}
+
+        Query: "{query}"
+        {PLAN_INSTRUCTIONS}
+        """
+    print("--- CSV exceeds the token budget, planning computations... ---")
+    response = await ainvoke(llm, prompt)
+    operations = parse_plan(response.content)
+    budget = max(CSV_TOKEN_BUDGET - estimate_tokens(profile), CSV_TOKEN_BUDGET // 4)
+    if not operations:
+        print("--- No usable computation plan, falling back to a sample of rows ---")
+        sample = await asyncio.to_thread(render_table, df.head(1000), budget)
+        return f"Profile:\n{profile}\n\nFirst rows:\n{sample}"
+
+    print(f"--- Running {len(operations)} planned computation(s) ---")
+    with span("compute"):
+        results = await asyncio.to_thread(run_operations, df, operations)
+    emit("computed", operations=len(operations))
+    return f"Profile:\n{profile}\n\nComputed results:\n{render_results(results, budget)}"
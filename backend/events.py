@@ -0,0 +1,27 @@
+import asyncio
+import contextvars
+
+# Progress events of the request being answered. Handlers report stages with emit(); when the
+# request is not streamed there is no sink and the events are dropped.
+_sink = contextvars.ContextVar("logos_event_sink", default=None)
+
+
+def run_streamed(coro) -> tuple[asyncio.Task, asyncio.Queue]:
+    """Runs a coroutine in a task whose events go to the returned queue, followed by None when it finishes."""
+    queue = asyncio.Queue()
+    context = contextvars.copy_context()
+    context.run(_sink.set, queue)
+    task = asyncio.get_running_loop().create_task(coro, context=context)
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    return task, queue
+
+
+def is_streaming() -> bool:
+    return _sink.get() is not None
+
+
+def emit(event: str, **data):
+    """Reports a stage of the current request, e.g. emit("retrieved", chunks=4). Call from the event loop."""
+    queue = _sink.get()
+    if queue is not None:
+        queue.put_nowait((event, data))
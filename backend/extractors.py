@@ -0,0 +1,164 @@
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+EXTRACT_WORKERS = int(os.getenv("LOGOS_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+PDF_PAGES_PER_TASK = int(os.getenv("LOGOS_PDF_PAGES_PER_TASK", "25"))
+
+# Text is split in windows of this many chunks so the splitter never sees the whole document
+SPLIT_WINDOW_CHUNKS = 50
+
+_pool = None
+
+
+# --- Extractors ---
+# Each extractor is a generator that yields the text of a file in order, one page/paragraph/row
+# at a time. `start` and `stop` select a page range and are only meaningful for paginated formats.
+# Parsers are imported by the extractor that needs them, so importing this module stays cheap.
+
+def iter_pdf_text(file_path: str, start: int = 0, stop: int | None = None):
+    """Yields the text of each PDF page in [start, stop)."""
+    from PyPDF2 import PdfReader
+    with open(file_path, 'rb') as f:
+        reader = PdfReader(f)
+        stop = len(reader.pages) if stop is None else min(stop, len(reader.pages))
+        for i in range(start, stop):
+            yield (reader.pages[i].extract_text() or '') + '\n'
+
+
+def iter_docx_text(file_path: str, start: int = 0, stop: int | None = None):
+    """Yields the text of each paragraph in a Word document."""
+    import docx
+    doc = docx.Document(file_path)
+    for para in doc.paragraphs:
+        yield para.text + '\n'
+
+
+def iter_xlsx_text(file_path: str, start: int = 0, stop: int | None = None):
+    """Yields one line of text per worksheet row, streaming the workbook in read-only mode."""
+    import openpyxl
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            for row in sheet.iter_rows(values_only=True):
+                yield ''.join(str(value) + ' ' for value in row if value) + '\n'
+    finally:
+        workbook.close()
+
+
+EXTRACTORS = {
+    '.pdf': iter_pdf_text,
+    '.docx': iter_docx_text,
+    '.xlsx': iter_xlsx_text,
+}
+
+
+def register_extractor(extension: str, extractor):
+    """Registers a text extractor generator for a file extension (e.g. '.pptx')."""
+    EXTRACTORS[extension.lower()] = extractor
+
+
+def get_extractor(file_path: str):
+    """Returns the extractor for a file, or None if the file type is not supported."""
+    return EXTRACTORS.get(os.path.splitext(file_path)[1].lower())
+
+
+def iter_text(file_path: str):
+    """Yields the text of a file in order, or nothing if its type is not supported."""
+    extractor = get_extractor(file_path)
+    if extractor is None:
+        return
+    yield from extractor(file_path)
+
+
+# --- Parallel extraction ---
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawn rather than fork: the server process is multi-threaded
+        _pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _extract_task(file_path: str, start: int, stop: int | None) -> str:
+    extractor = get_extractor(file_path)
+    return ''.join(extractor(file_path, start, stop))
+
+
+def _plan_tasks(file_path: str) -> list[tuple[str, int, int | None]]:
+    """Splits a file into independently extractable (file_path, start, stop) tasks."""
+    if get_extractor(file_path) is None:
+        return []
+    if file_path.lower().endswith('.pdf'):
+        from PyPDF2 import PdfReader
+        with open(file_path, 'rb') as f:
+            page_count = len(PdfReader(f).pages)
+        return [(file_path, start, min(start + PDF_PAGES_PER_TASK, page_count))
+                for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+    return [(file_path, 0, None)]
+
+
+def iter_files_text(file_paths: list[str], progress=None):
+    """Extracts several files, yielding (file_path, text segment) pairs in file and page order.
+
+    PDFs are split into page ranges and all ranges of all files are extracted in a process
+    pool. A single small file is streamed inline, since a pool would only add overhead.
+    `progress`, if given, is called with (file_path, fraction of that file done).
+    """
+    tasks = [task for file_path in file_paths for task in _plan_tasks(file_path)]
+    if not tasks:
+        return
+
+    if len(tasks) == 1 or EXTRACT_WORKERS <= 1:
+        for file_path, start, stop in tasks:
+            for segment in get_extractor(file_path)(file_path, start, stop):
+                yield file_path, segment
+            if progress:
+                progress(file_path, 1.0)
+        return
+
+    totals = {}
+    for file_path, _, _ in tasks:
+        totals[file_path] = totals.get(file_path, 0) + 1
+    done = dict.fromkeys(totals, 0)
+
+    pool = _get_pool()
+    futures = [pool.submit(_extract_task, *task) for task in tasks]
+    for (file_path, _, _), future in zip(tasks, futures):
+        yield file_path, future.result()
+        done[file_path] += 1
+        if progress:
+            progress(file_path, done[file_path] / totals[file_path])
+
+
+# --- Streaming splitter ---
+
+def iter_chunks(segments, chunk_size: int, chunk_overlap: int):
+    """Splits a stream of text segments into chunks without joining the whole document.
+
+    Segments are buffered until they fill a window of SPLIT_WINDOW_CHUNKS chunks. The window is
+    split, every chunk but the last is emitted, and the last one is carried into the next window
+    so that chunk boundaries are not forced at window edges.
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    window = chunk_size * SPLIT_WINDOW_CHUNKS
+    buffer = []
+    buffered = 0
+    for segment in segments:
+        buffer.append(segment)
+        buffered += len(segment)
+        if buffered < window:
+            continue
+        text = ''.join(buffer)
+        chunks = splitter.split_text(text)
+        yield from chunks[:-1]
+        # Carry the raw tail rather than the (whitespace-stripped) last chunk so that words
+        # are not glued to the next segment
+        carry = text[text.rfind(chunks[-1]):] if chunks else ''
+        buffer = [carry]
+        buffered = len(carry)
+    if buffer:
+        yield from splitter.split_text(''.join(buffer))
@@ -0,0 +1,232 @@
+import os
+import time
+import uuid
+import asyncio
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+import pandas as pd
+from events import emit
+from metrics import current_source, observe, span
+from plot_store import PLOT_DIR, PLOT_FORMATS, has_plot, plot_url, store_bytes
+
+# Prophet fits are CPU-bound and pyplot is not thread-safe, so forecasts run in worker processes
+FORECAST_WORKERS = int(os.getenv("LOGOS_FORECAST_WORKERS", str(os.cpu_count() or 1)))
+FORECAST_HORIZON = 365
+FORECAST_CACHE_SIZE = int(os.getenv("LOGOS_FORECAST_CACHE_SIZE", "256"))
+# Finished jobs can be polled for this long
+FORECAST_JOB_TTL = float(os.getenv("LOGOS_FORECAST_JOB_TTL", "3600"))
+
+_pool = None
+_jobs = {}
+_futures = {}
+_inflight = {}
+_results = OrderedDict()
+# Reentrant: a done-callback runs in the submitting thread when the future is already finished
+_lock = threading.RLock()
+_stats = {"submitted": 0, "cache_hits": 0, "joined": 0, "completed": 0, "failed": 0}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawn rather than fork: the server process is multi-threaded
+        _pool = ProcessPoolExecutor(max_workers=FORECAST_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def run_in_pool(fn, *args):
+    """Submits a CPU-bound task (a module-level function) to the forecasting workers and returns its future."""
+    return _get_pool().submit(fn, *args)
+
+
+def _forecast_task(df: pd.DataFrame, file_name: str, horizon: int, plot_format: str) -> dict:
+    # The worker only renders; the image is stored by the parent in _finish
+    from utils import generate_forecast_plot
+    return generate_forecast_plot(df, file_name, horizon, plot_format, store=False)
+
+
+def _warm_worker() -> int:
+    import prophet
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot
+    return os.getpid()
+
+
+def warm_pool() -> int:
+    """Starts the forecasting workers and imports Prophet and pyplot in them; returns how many workers answered."""
+    futures = [run_in_pool(_warm_worker) for _ in range(FORECAST_WORKERS)]
+    return len({future.result() for future in futures})
+
+
+def forecast_key(df: pd.DataFrame, file_name: str, horizon: int, plot_format: str = "png") -> str:
+    """Hashes the input series, the horizon, the plot title and format, which determine the forecast and its image."""
+    digest = hashlib.sha256()
+    digest.update(repr((list(map(str, df.columns)), horizon, file_name, plot_format)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _cached_result(key: str) -> dict | None:
+    result = _results.get(key)
+    if result is None:
+        return None
+    # The plot store may have evicted the image since the forecast was cached
+    image_path = result.get("image_path")
+    if image_path and not has_plot(image_path, PLOT_DIR):
+        del _results[key]
+        return None
+    _results.move_to_end(key)
+    return result
+
+
+def _expire_jobs(now: float):
+    expired = [job_id for job_id, job in _jobs.items()
+               if job["finished_at"] is not None and now - job["finished_at"] > FORECAST_JOB_TTL]
+    for job_id in expired:
+        del _jobs[job_id]
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """Shuts down a broken pool without waiting and, if it is still the current one, lets the next job start a fresh one."""
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _finish(job_id: str, key: str, pool: ProcessPoolExecutor, future):
+    try:
+        result, error = future.result(), None
+        if "error" in result:
+            error = result["error"]
+        timings = result.pop("timings", {})
+        if "plot" in result:
+            data, extension = result.pop("plot")
+            result["image_path"] = plot_url(store_bytes(data, extension, PLOT_DIR))
+        source = _jobs.get(job_id, {}).get("source", "none")
+        for stage, seconds in timings.items():
+            observe("logos_stage_seconds", seconds, source=source, stage=stage)
+    except BrokenProcessPool as e:
+        # A worker died (e.g. out of memory); start a fresh pool for the next job
+        result, error = None, f"Forecast worker crashed: {e}"
+        _discard_pool(pool)
+    except Exception as e:
+        result, error = None, f"Failed to generate forecast: {e}"
+
+    with _lock:
+        _futures.pop(job_id, None)
+        _inflight.pop(key, None)
+        job = _jobs.get(job_id)
+        if job is not None:
+            job.update(status="failed" if error else "done", result=result, error=error, finished_at=time.time())
+        if error:
+            _stats["failed"] += 1
+            return
+        _stats["completed"] += 1
+        _results[key] = result
+        _results.move_to_end(key)
+        while len(_results) > FORECAST_CACHE_SIZE:
+            _results.popitem(last=False)
+
+
+def submit_forecast(df: pd.DataFrame, file_name: str, horizon: int = FORECAST_HORIZON, plot_format: str = "png") -> str:
+    """Queues a forecast and returns its job id.
+
+    A forecast already cached for the same series and horizon completes immediately, and one
+    already running is joined instead of being fitted twice.
+    """
+    if plot_format not in PLOT_FORMATS:
+        raise ValueError(f"Unsupported plot format: {plot_format}")
+    key = forecast_key(df, file_name, horizon, plot_format)
+    now = time.time()
+    with _lock:
+        _expire_jobs(now)
+        if key in _inflight and _inflight[key] in _jobs:
+            _stats["joined"] += 1
+            return _inflight[key]
+
+        job_id = uuid.uuid4().hex
+        job = {"job_id": job_id, "file_name": file_name, "horizon": horizon, "plot_format": plot_format,
+               "status": "queued", "cached": False, "source": current_source(),
+               "result": None, "error": None, "submitted_at": now, "finished_at": None}
+        _jobs[job_id] = job
+        cached = _cached_result(key)
+        if cached is not None:
+            _stats["cache_hits"] += 1
+            job.update(status="done", cached=True, result=cached, finished_at=now)
+            return job_id
+
+        _stats["submitted"] += 1
+        pool = _get_pool()
+        try:
+            future = pool.submit(_forecast_task, df, file_name, horizon, plot_format)
+        except BrokenProcessPool:
+            # The workers died while the pool was idle
+            _discard_pool(pool)
+            pool = _get_pool()
+            future = pool.submit(_forecast_task, df, file_name, horizon, plot_format)
+        _inflight[key] = job_id
+        _futures[job_id] = future
+        future.add_done_callback(partial(_finish, job_id, key, pool))
+        return job_id
+
+
+def get_forecast_job(job_id: str) -> dict | None:
+    """Returns a job's status ("queued", "running", "done" or "failed") and, once finished, its result."""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        job = dict(job)
+        future = _futures.get(job_id)
+    if future is not None and future.running():
+        job["status"] = "running"
+    if job["result"] is not None:
+        job["result"] = dict(job["result"])
+    return job
+
+
+async def wait_for_forecast(job_id: str) -> dict:
+    """Waits for a job without blocking the event loop and returns its result or an error dict.
+
+    Cancelling the caller does not cancel the job, which other requests may be waiting on.
+    """
+    with _lock:
+        future = _futures.get(job_id)
+    if future is not None:
+        try:
+            await asyncio.shield(asyncio.wrap_future(future))
+        except Exception:
+            pass  # Recorded on the job by _finish
+    job = get_forecast_job(job_id)
+    if job is None:
+        return {"error": "Forecast job expired before it could be read."}
+    if job["result"] is not None:
+        return job["result"]
+    return {"error": job["error"]}
+
+
+async def forecast(df: pd.DataFrame, file_name: str, horizon: int = FORECAST_HORIZON, plot_format: str = "png") -> dict:
+    """Runs a forecast in the worker pool, or returns the cached one, and returns the plot and summary."""
+    with span("forecast"):
+        result = await wait_for_forecast(submit_forecast(df, file_name, horizon, plot_format))
+    if "error" not in result:
+        emit("forecast_ready", image_path=result.get("image_path"))
+    return result
+
+
+def get_forecast_stats() -> dict:
+    """Returns job counters and the number of cached forecasts."""
+    with _lock:
+        stats = dict(_stats)
+        stats["cached_forecasts"] = len(_results)
+        stats["pending_jobs"] = len(_futures)
+    stats["workers"] = FORECAST_WORKERS
+    return stats
@@ -0,0 +1,86 @@
+import os
+import threading
+from collections import OrderedDict
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# --- Cache configuration ---
+# Parsed CSVs are kept in memory up to this many bytes (as reported by DataFrame.memory_usage)
+FRAME_CACHE_MAX_BYTES = int(os.getenv("LOGOS_FRAME_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+# Smaller row groups let filtered reads skip more of the file, at some cost to full scans
+ROW_GROUP_SIZE = int(os.getenv("LOGOS_PARQUET_ROW_GROUP_SIZE", str(128 * 1024)))
+
+_frames = OrderedDict()
+_lock = threading.Lock()
+_stats = {"memory_hits": 0, "disk_reads": 0, "conversions": 0, "evictions": 0, "bytes": 0}
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def get_frame(key: str) -> pd.DataFrame | None:
+    """Returns a cached DataFrame, or None.
+
+    Callers get a shallow copy: with copy-on-write, changes they make never reach the cached frame.
+    """
+    with _lock:
+        entry = _frames.get(key)
+        if entry is None:
+            return None
+        _frames.move_to_end(key)
+        _stats["memory_hits"] += 1
+        return entry[0].copy(deep=False)
+
+
+def remember_frame(key: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Adds a DataFrame to the in-memory LRU and returns a shallow copy of it for the caller."""
+    nbytes = frame_nbytes(df)
+    if nbytes > FRAME_CACHE_MAX_BYTES:
+        return df
+    with _lock:
+        if key in _frames:
+            _stats["bytes"] -= _frames.pop(key)[1]
+        _frames[key] = (df, nbytes)
+        _stats["bytes"] += nbytes
+        while _stats["bytes"] > FRAME_CACHE_MAX_BYTES:
+            _, (_, evicted) = _frames.popitem(last=False)
+            _stats["bytes"] -= evicted
+            _stats["evictions"] += 1
+    return df.copy(deep=False)
+
+
+def write_columnar(df: pd.DataFrame, path: str):
+    """Writes a DataFrame as Parquet, with row group statistics for predicate pushdown."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(table, path, row_group_size=ROW_GROUP_SIZE)
+    with _lock:
+        _stats["conversions"] += 1
+
+
+def read_columnar(path: str, columns: list[str] | None = None, filters: list | None = None) -> pd.DataFrame:
+    """Reads a Parquet artifact through a memory map.
+
+    Only the requested columns are decoded, and row groups whose statistics rule out the
+    filters (pyarrow DNF, e.g. [("region", "==", "north"), ("units", ">", 5)]) are skipped.
+    """
+    table = pq.read_table(path, columns=columns, filters=filters, memory_map=True)
+    with _lock:
+        _stats["disk_reads"] += 1
+    return table.to_pandas(date_as_object=False)
+
+
+def clear_frames():
+    with _lock:
+        _frames.clear()
+        _stats["bytes"] = 0
+
+
+def get_frame_cache_stats() -> dict:
+    """Returns hit counters and the size of the in-memory DataFrame cache."""
+    with _lock:
+        stats = dict(_stats)
+        stats["frames"] = len(_frames)
+    stats["max_bytes"] = FRAME_CACHE_MAX_BYTES
+    return stats
@@ -0,0 +1,175 @@
+
+import os
+import json
+import shutil
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+from extractors import iter_chunks
+from utils import file_content_hash
+from llm_client import EMBEDDING_MODEL, record_embedding_call
+from metrics import span
+
+# faiss and the LangChain vector store are imported where indexes are built or loaded
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+# --- Cache configuration ---
+INDEX_CACHE_DIR = os.getenv("LOGOS_INDEX_CACHE_DIR", os.path.join("/Users/dheeraj/Desktop/finalmp", "index_cache"))
+INDEX_CACHE_MAX_BYTES = int(os.getenv("LOGOS_INDEX_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+INDEX_CACHE_MAX_LOADED = int(os.getenv("LOGOS_INDEX_CACHE_MAX_LOADED", "32"))
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+SPLITTER = "streaming-recursive-v1"
+
+_loaded = OrderedDict()
+_lock = threading.Lock()
+_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+
+def index_key(content_hash: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP,
+              embedding_model: str = EMBEDDING_MODEL) -> str:
+    """Builds the cache key for a file's index from its content hash and the indexing settings."""
+    settings = {
+        "content_hash": content_hash,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "embedding_model": embedding_model,
+        "splitter": SPLITTER,
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _load_from_disk(index_dir: str, embeddings) -> "FAISS":
+    """Loads a saved index, memory-mapping the FAISS vectors instead of reading them into RAM."""
+    import faiss
+    from langchain_community.vectorstores import FAISS
+    # Flat indexes can be memory-mapped directly with IO_FLAG_MMAP_IFC on newer faiss builds.
+    mmap_flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+    index = faiss.read_index(os.path.join(index_dir, "index.faiss"), mmap_flags)
+    with open(os.path.join(index_dir, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def _remember(key: str, vectorstore: "FAISS"):
+    """Adds a loaded index to the in-memory LRU, dropping the least recently used ones."""
+    with _lock:
+        _loaded[key] = vectorstore
+        _loaded.move_to_end(key)
+        while len(_loaded) > INDEX_CACHE_MAX_LOADED:
+            _loaded.popitem(last=False)
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for entry in os.scandir(path):
+        if entry.is_file():
+            total += entry.stat().st_size
+    return total
+
+
+def _enforce_disk_budget(keep: str | None = None):
+    """Evicts the least recently used indexes until the cache fits in INDEX_CACHE_MAX_BYTES."""
+    if not os.path.isdir(INDEX_CACHE_DIR):
+        return
+
+    entries = []
+    for entry in os.scandir(INDEX_CACHE_DIR):
+        if entry.is_dir() and not entry.name.startswith("."):
+            entries.append((entry.stat().st_mtime, entry.name, _dir_size(entry.path)))
+
+    total = sum(size for _, _, size in entries)
+    for _, name, size in sorted(entries):
+        if total <= INDEX_CACHE_MAX_BYTES:
+            break
+        if name == keep:
+            continue
+        shutil.rmtree(os.path.join(INDEX_CACHE_DIR, name), ignore_errors=True)
+        with _lock:
+            _loaded.pop(name, None)
+            _stats["evictions"] += 1
+        total -= size
+
+
+def has_file_index(file_path: str) -> bool:
+    """Returns True if an index for the file's current content is cached in memory or on disk."""
+    key = index_key(file_content_hash(file_path))
+    with _lock:
+        if key in _loaded:
+            return True
+    return os.path.isdir(os.path.join(INDEX_CACHE_DIR, key))
+
+
+def get_file_index(file_path: str, embeddings, iter_segments) -> "FAISS | None":
+    """Returns the FAISS index for one file, building and persisting it only on a cache miss.
+
+    `iter_segments` is called with the file path and must return an iterable of the file's
+    text segments in order. It is only invoked when no index exists for the file's current
+    content and settings. Returns None if the file contains no text.
+    """
+    key = index_key(file_content_hash(file_path))
+    index_dir = os.path.join(INDEX_CACHE_DIR, key)
+
+    with _lock:
+        if key in _loaded:
+            _loaded.move_to_end(key)
+            _stats["memory_hits"] += 1
+            return _loaded[key]
+
+    if os.path.isdir(index_dir):
+        vectorstore = _load_from_disk(index_dir, embeddings)
+        os.utime(index_dir)  # Record the access for LRU eviction
+        with _lock:
+            _stats["disk_hits"] += 1
+        _remember(key, vectorstore)
+        return vectorstore
+
+    with _lock:
+        _stats["misses"] += 1
+
+    texts = list(iter_chunks(iter_segments(file_path), CHUNK_SIZE, CHUNK_OVERLAP))
+    if not texts:
+        return None
+
+    from langchain_community.vectorstores import FAISS
+    file_name = os.path.basename(file_path)
+    with span("embed"):
+        record_embedding_call(embeddings, texts)
+        vectorstore = FAISS.from_texts(texts, embeddings, metadatas=[{"source": file_name} for _ in texts])
+
+    # Save under a temporary name and rename so readers never see a half-written index
+    os.makedirs(INDEX_CACHE_DIR, exist_ok=True)
+    tmp_dir = os.path.join(INDEX_CACHE_DIR, f".{key}.{os.getpid()}.{threading.get_ident()}")
+    vectorstore.save_local(tmp_dir)
+    try:
+        os.rename(tmp_dir, index_dir)
+    except OSError:
+        # Another worker finished the same index first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    _remember(key, vectorstore)
+    _enforce_disk_budget(keep=key)
+    return vectorstore
+
+
+def get_index_cache_stats() -> dict:
+    """Returns hit/miss counters and the current size of the index cache."""
+    with _lock:
+        stats = dict(_stats)
+        stats["loaded"] = len(_loaded)
+    hits = stats["memory_hits"] + stats["disk_hits"]
+    lookups = hits + stats["misses"]
+    stats["hit_ratio"] = hits / lookups if lookups else 0.0
+    stats["disk_bytes"] = 0
+    stats["disk_entries"] = 0
+    if os.path.isdir(INDEX_CACHE_DIR):
+        for entry in os.scandir(INDEX_CACHE_DIR):
+            if entry.is_dir() and not entry.name.startswith("."):
+                stats["disk_bytes"] += _dir_size(entry.path)
+                stats["disk_entries"] += 1
+    stats["max_bytes"] = INDEX_CACHE_MAX_BYTES
+    return stats
@@ -0,0 +1,230 @@
+
+import os
+import time
+import threading
+from contextlib import ExitStack, suppress
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from frame_cache import get_frame, remember_frame, read_columnar, write_columnar
+from index_cache import get_file_index, has_file_index, index_key
+from corpus_index import CorpusIndex, get_corpus, save_corpus, update_corpus
+from llm_client import get_embeddings
+from utils import file_content_hash
+from extractors import iter_files_text
+from metrics import span
+
+DATA_DIR = os.getenv("LOGOS_DATA_DIR", "/Users/dheeraj/Desktop/finalmp/data")
+ARTIFACTS_DIR = os.getenv("LOGOS_ARTIFACTS_DIR", os.path.join("/Users/dheeraj/Desktop/finalmp", "artifacts"))
+
+DOCUMENT_EXTENSIONS = ('.pdf', '.docx', '.xlsx')
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_file_locks = {}
+
+
+def _file_lock(file_path: str) -> threading.Lock:
+    """Returns the lock that serializes ingestion and artifact reads for one file."""
+    with _jobs_lock:
+        return _file_locks.setdefault(os.path.abspath(file_path), threading.Lock())
+
+
+def _update_job(file_name: str, **fields):
+    with _jobs_lock:
+        _jobs.setdefault(file_name, {"file_name": file_name}).update(fields)
+
+
+def read_csv_file(file_path: str) -> pd.DataFrame:
+    """Parses a CSV file with the settings used by the CSV handler."""
+    try:
+        # Multithreaded Arrow parser; date columns come back as datetime64 rather than strings
+        return pa_csv.read_csv(file_path).to_pandas(date_as_object=False)
+    except (pa.ArrowException, ValueError) as e:
+        # Keep the original parser as a fallback for input the Arrow parser rejects
+        print(f"--- Arrow CSV parser failed ({e}), falling back to the Python parser ---")
+        return pd.read_csv(file_path, encoding='utf-8-sig', sep=',', engine='python')
+
+
+def _artifact_path(file_path: str, extension: str) -> str:
+    return os.path.join(ARTIFACTS_DIR, f"{file_content_hash(file_path)}{extension}")
+
+
+def _write_atomic(path: str, write):
+    """Writes an artifact through a temporary file so readers never see a partial one."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _prepare_texts(file_paths: list[str], progress=None) -> list[str]:
+    """Ensures each document has a text artifact, extracting the missing ones in parallel.
+
+    Extracted text is streamed straight into the artifact files. Returns the artifact paths.
+    """
+    text_paths = [_artifact_path(file_path, ".txt") for file_path in file_paths]
+    missing = {file_path: text_path for file_path, text_path in zip(file_paths, text_paths)
+               if not os.path.exists(text_path)}
+    if not missing:
+        return text_paths
+
+    os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+    suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    tmp_paths = {file_path: text_path + suffix for file_path, text_path in missing.items()}
+    try:
+        with ExitStack() as stack:
+            writers = {file_path: stack.enter_context(open(tmp_path, 'w', encoding='utf-8'))
+                       for file_path, tmp_path in tmp_paths.items()}
+            with span("extract"):
+                for file_path, segment in iter_files_text(list(missing), progress):
+                    writers[file_path].write(segment)
+    except BaseException:
+        # The writers opened so far are closed; remove their partial artifacts
+        for tmp_path in tmp_paths.values():
+            with suppress(FileNotFoundError):
+                os.remove(tmp_path)
+        raise
+
+    for file_path, tmp_path in tmp_paths.items():
+        os.replace(tmp_path, missing[file_path])
+    return text_paths
+
+
+def _iter_artifact_text(text_path: str):
+    with open(text_path, 'r', encoding='utf-8') as f:
+        for block in iter(lambda: f.read(64 * 1024), ''):
+            yield block
+
+
+def _iter_prepared_text(file_path: str):
+    """Yields a document's text from its artifact, extracting it first if needed."""
+    yield from _iter_artifact_text(_prepare_texts([file_path])[0])
+
+
+def _prepare_dataframe(file_path: str, columns: list[str] | None = None, filters: list | None = None) -> pd.DataFrame:
+    """Returns a CSV's DataFrame from memory, its Parquet artifact, or by parsing it (in that order).
+
+    Projected or filtered reads go to the artifact so only the needed columns and row groups
+    are decoded; only whole frames are kept in memory.
+    """
+    frame_path = _artifact_path(file_path, ".parquet")
+    subset = columns is not None or filters is not None
+    if not subset:
+        df = get_frame(frame_path)
+        if df is not None:
+            return df
+
+    if not os.path.exists(frame_path):
+        df = read_csv_file(file_path)
+        _write_atomic(frame_path, lambda path: write_columnar(df, path))
+        if not subset:
+            return remember_frame(frame_path, df)
+
+    df = read_columnar(frame_path, columns, filters)
+    return df if subset else remember_frame(frame_path, df)
+
+
+class _FileLocks:
+    """Holds the locks of several files, acquired in a fixed order to avoid deadlocks."""
+
+    def __init__(self, file_paths: list[str]):
+        self.locks = [_file_lock(file_path) for file_path in sorted(set(file_paths))]
+
+    def __enter__(self):
+        for lock in self.locks:
+            lock.acquire()
+
+    def __exit__(self, *exc_info):
+        for lock in reversed(self.locks):
+            lock.release()
+
+
+def load_texts(file_paths: list[str]) -> list[str]:
+    """Returns each document's extracted text, preparing missing artifacts now if ingestion has not run."""
+    with _FileLocks(file_paths):
+        text_paths = _prepare_texts(file_paths)
+
+    texts = []
+    for text_path in text_paths:
+        with open(text_path, 'r', encoding='utf-8') as f:
+            texts.append(f.read())
+    return texts
+
+
+def load_dataframe(file_path: str, columns: list[str] | None = None, filters: list | None = None) -> pd.DataFrame:
+    """Returns a CSV file's parsed DataFrame, preparing the artifact now if ingestion has not run.
+
+    columns and filters (pyarrow DNF tuples) are pushed down to the columnar artifact.
+    """
+    with _file_lock(file_path):
+        return _prepare_dataframe(file_path, columns, filters)
+
+
+def load_indexes(file_paths: list[str], embeddings) -> dict:
+    """Returns each document's FAISS index (None for files without text), keyed by file path.
+
+    Waits for in-flight ingestion rather than redoing it. Documents that were never ingested
+    are extracted together in parallel and indexed now.
+    """
+    with _FileLocks(file_paths):
+        unindexed = [file_path for file_path in file_paths if not has_file_index(file_path)]
+        if unindexed:
+            _prepare_texts(unindexed)
+        return {file_path: get_file_index(file_path, embeddings, _iter_prepared_text) for file_path in file_paths}
+
+
+def sync_corpus(file_paths: list[str] | None, embeddings) -> CorpusIndex:
+    """Brings the corpus index up to date for the given documents, or for the whole data directory (None).
+
+    Documents already in the corpus at their current content are not read. Given documents that were
+    never ingested are indexed now; for the whole directory only ingested documents are added, and
+    documents whose files were deleted are removed.
+    """
+    corpus = get_corpus()
+    if file_paths is None:
+        names = set(os.listdir(DATA_DIR)) if os.path.isdir(DATA_DIR) else set()
+        for name in set(corpus.document_names()) - names:
+            corpus.remove_document(name)
+        file_paths = [os.path.join(DATA_DIR, name) for name in sorted(names) if name.endswith(DOCUMENT_EXTENSIONS)]
+        file_paths = [file_path for file_path in file_paths if has_file_index(file_path)]
+    stale = [file_path for file_path in file_paths
+             if corpus.version(os.path.basename(file_path)) != index_key(file_content_hash(file_path))]
+    if stale:
+        update_corpus(load_indexes(stale, embeddings))
+    return corpus
+
+
+def ingest_file(file_name: str):
+    """Extracts, chunks, embeds and persists an uploaded file so questions only read artifacts."""
+    file_path = os.path.join(DATA_DIR, file_name)
+    _update_job(file_name, status="extracting", progress=0.0, error=None, started_at=time.time(), finished_at=None)
+    print(f"--- Ingesting {file_name}... ---")
+
+    try:
+        with _file_lock(file_path):
+            if file_name.endswith('.csv'):
+                _prepare_dataframe(file_path)
+            elif file_name.endswith(DOCUMENT_EXTENSIONS):
+                _prepare_texts([file_path], lambda path, fraction: _update_job(file_name, progress=0.5 * fraction))
+                _update_job(file_name, status="indexing", progress=0.5)
+                embeddings = get_embeddings()
+                update_corpus({file_path: get_file_index(file_path, embeddings, _iter_prepared_text)})
+                save_corpus()
+        _update_job(file_name, status="done", progress=1.0, content_hash=file_content_hash(file_path), finished_at=time.time())
+        print(f"--- Finished ingesting {file_name} ---")
+    except Exception as e:
+        _update_job(file_name, status="failed", error=str(e), finished_at=time.time())
+        print(f"--- Error ingesting {file_name}: {e} ---")
+
+
+def mark_queued(file_name: str):
+    """Records that an ingestion job has been scheduled for a file."""
+    _update_job(file_name, status="queued", progress=0.0, error=None, started_at=None, finished_at=None)
+
+
+def get_ingestion_status(file_name: str) -> dict | None:
+    """Returns the ingestion job status for a file, or None if it was never ingested."""
+    with _jobs_lock:
+        job = _jobs.get(file_name)
+        return dict(job) if job else None
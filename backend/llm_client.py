@@ -0,0 +1,221 @@
+
+import os
+import time
+import asyncio
+import weakref
+import sys
+import threading
+from collections import OrderedDict
+from events import emit, is_streaming
+from csv_analysis import estimate_tokens
+from metrics import inc, observe
+
+# Maximum number of in-flight calls per upstream model, and the time allowed for each call
+LLM_CONCURRENCY = int(os.getenv("LOGOS_LLM_CONCURRENCY", "32"))
+LLM_TIMEOUT = float(os.getenv("LOGOS_LLM_TIMEOUT", "120"))
+
+# --- Client registry ---
+# One client per role, created once and shared by every request. Constructing a Gemini client
+# calls genai.configure(), which throws away the SDK's cached transport (and its open
+# connections), so clients must not be built per call.
+ROLE_MODELS = {
+    "router": os.getenv("LOGOS_ROUTER_MODEL", "gemini-2.5-pro"),
+    "analyst": os.getenv("LOGOS_ANALYST_MODEL", "gemini-2.5-pro"),
+    "extractor": os.getenv("LOGOS_EXTRACTOR_MODEL", "gemini-2.5-pro"),
+}
+EMBEDDING_MODEL = os.getenv("LOGOS_EMBEDDING_MODEL", "models/embedding-001")
+# "grpc" (default) multiplexes calls over one channel; "rest" uses a keep-alive HTTP session
+LLM_TRANSPORT = os.getenv("LOGOS_LLM_TRANSPORT") or None
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("LOGOS_QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+
+_clients = {}
+_clients_lock = threading.Lock()
+_client_stats = {"created": 0, "reused": 0, "by_role": {}}
+
+_query_vectors = OrderedDict()
+_query_vectors_lock = threading.Lock()
+
+# asyncio primitives belong to one event loop, so the semaphores are kept per loop
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def _create_client(role: str):
+    # The Gemini SDK takes over a second to import, so it is loaded with the first client
+    from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+    if role == "embeddings":
+        return GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL, google_api_key=os.getenv("GEMINI_API_KEY"),
+                                            transport=LLM_TRANSPORT)
+    if role not in ROLE_MODELS:
+        raise ValueError(f"Unknown LLM role: {role}")
+    return ChatGoogleGenerativeAI(model=ROLE_MODELS[role], google_api_key=os.getenv("GEMINI_API_KEY"),
+                                  transport=LLM_TRANSPORT)
+
+
+def _get_client(role: str):
+    with _clients_lock:
+        role_stats = _client_stats["by_role"].setdefault(role, {"created": 0, "reused": 0})
+        if role in _clients:
+            _client_stats["reused"] += 1
+            role_stats["reused"] += 1
+            return _clients[role]
+        client = _create_client(role)
+        _clients[role] = client
+        _client_stats["created"] += 1
+        role_stats["created"] += 1
+        return client
+
+
+def get_llm(role: str):
+    """Returns the shared chat model for a role: "router", "analyst" or "extractor"."""
+    return _get_client(role)
+
+
+def get_embeddings():
+    """Returns the shared embeddings client."""
+    return _get_client("embeddings")
+
+
+def set_client(role: str, client):
+    """Replaces the client for a role (or "embeddings"), e.g. with a local stub in tests."""
+    with _clients_lock:
+        _clients[role] = client
+    if role == "embeddings":
+        with _query_vectors_lock:
+            _query_vectors.clear()
+
+
+def reset_clients():
+    """Drops all clients so the next call creates fresh ones."""
+    with _clients_lock:
+        _clients.clear()
+    with _query_vectors_lock:
+        _query_vectors.clear()
+
+
+def record_llm_call(client, text: str, kind: str):
+    """Counts one model call and its prompt size in the LLM metrics.
+
+    `kind` tells the callers apart: "chat" for ainvoke, "agent" for calls the SQL agent makes
+    itself, "embedding" for embedding requests.
+    """
+    model = _model_name(client)
+    inc("logos_llm_calls_total", model=model, kind=kind)
+    inc("logos_llm_prompt_chars_total", len(text), model=model, kind=kind)
+    inc("logos_llm_prompt_tokens_total", estimate_tokens(text), model=model, kind=kind)
+
+
+def record_embedding_call(embeddings, texts: list[str]):
+    """Counts one embedding request for a batch of texts."""
+    record_llm_call(embeddings, "".join(texts), "embedding")
+
+
+def usage_callback(llm, kind: str = "agent"):
+    """Returns a LangChain callback handler that counts the calls a chain or agent makes to `llm` on its own."""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class UsageCallback(BaseCallbackHandler):
+        def on_llm_start(self, serialized, prompts, **kwargs):
+            for prompt in prompts:
+                record_llm_call(llm, prompt, kind)
+
+        def on_chat_model_start(self, serialized, messages, **kwargs):
+            for batch in messages:
+                record_llm_call(llm, "\n".join(str(message.content) for message in batch), kind)
+
+        def on_llm_end(self, response, **kwargs):
+            chars = sum(len(generation.text) for generations in response.generations for generation in generations)
+            inc("logos_llm_response_chars_total", chars, model=_model_name(llm), kind=kind)
+
+    return UsageCallback()
+
+
+def embed_queries(queries: list[str]) -> list[list[float]]:
+    """Embeds search queries with one batched call, reusing the vectors of recently embedded queries."""
+    with _query_vectors_lock:
+        vectors = {query: _query_vectors[query] for query in queries if query in _query_vectors}
+        for query in vectors:
+            _query_vectors.move_to_end(query)
+    missing = list(dict.fromkeys(query for query in queries if query not in vectors))
+    if missing:
+        # The Gemini embeddings client embeds queries and documents with the same task type, so a
+        # batch of queries is one embed_documents call
+        embeddings = get_embeddings()
+        record_embedding_call(embeddings, missing)
+        embedded = embeddings.embed_documents(missing) if len(missing) > 1 else [embeddings.embed_query(missing[0])]
+        vectors.update(zip(missing, embedded))
+        with _query_vectors_lock:
+            _query_vectors.update(zip(missing, embedded))
+            while len(_query_vectors) > QUERY_EMBEDDING_CACHE_SIZE:
+                _query_vectors.popitem(last=False)
+    return [vectors[query] for query in queries]
+
+
+def init_clients():
+    """Creates every client up front so the first requests do not pay for client setup."""
+    for role in [*ROLE_MODELS, "embeddings"]:
+        try:
+            _get_client(role)
+        except Exception as e:
+            print(f"--- Could not create {role} client: {e} ---")
+
+
+def get_client_stats() -> dict:
+    """Returns client creation/reuse counters and the identity of the SDK's transport clients.
+
+    The transport ids stay the same across requests while connections are being reused.
+    """
+    with _clients_lock:
+        stats = {
+            "created": _client_stats["created"],
+            "reused": _client_stats["reused"],
+            "by_role": {role: dict(counts) for role, counts in _client_stats["by_role"].items()},
+            "roles": {role: type(client).__name__ for role, client in _clients.items()},
+        }
+    total = stats["created"] + stats["reused"]
+    stats["reuse_ratio"] = stats["reused"] / total if total else 0.0
+    # Only look at the SDK's transports if a Gemini client has loaded it
+    transports = getattr(sys.modules.get("google.generativeai.client"), "_client_manager", None)
+    stats["transport_clients"] = {name: id(client) for name, client in getattr(transports, "clients", {}).items()}
+    return stats
+
+
+def _model_name(llm) -> str:
+    return getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+
+
+def _semaphore(model: str) -> asyncio.Semaphore:
+    loop_semaphores = _semaphores.setdefault(asyncio.get_running_loop(), {})
+    if model not in loop_semaphores:
+        loop_semaphores[model] = asyncio.Semaphore(LLM_CONCURRENCY)
+    return loop_semaphores[model]
+
+
+async def _stream_tokens(llm, prompt):
+    message = None
+    async for chunk in llm.astream(prompt):
+        if chunk.content:
+            emit("token", text=chunk.content)
+        message = chunk if message is None else message + chunk
+    return message
+
+
+async def ainvoke(llm, prompt, stream: bool = False):
+    """Calls a chat model without blocking the event loop.
+
+    At most LLM_CONCURRENCY calls to the same model run at once; the rest wait their turn.
+    Raises asyncio.TimeoutError if the model does not answer within LLM_TIMEOUT seconds.
+    With stream=True and a streamed request, the reply is also emitted token by token.
+    """
+    model = _model_name(llm)
+    record_llm_call(llm, prompt if isinstance(prompt, str) else str(prompt), "chat")
+    async with _semaphore(model):
+        start = time.perf_counter()
+        try:
+            if stream and is_streaming():
+                response = await asyncio.wait_for(_stream_tokens(llm, prompt), LLM_TIMEOUT)
+            else:
+                response = await asyncio.wait_for(llm.ainvoke(prompt), LLM_TIMEOUT)
+        finally:
+            observe("logos_llm_seconds", time.perf_counter() - start, model=model)
+    inc("logos_llm_response_chars_total", len(str(getattr(response, "content", response))), model=model, kind="chat")
+    return response
@@ -1,20 +1,56 @@
 import os
-import shutil
-from typing import List, Dict, Any, Union
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from collections import Counter
+from typing import List, Dict, Any, Literal, Union
 from dotenv import load_dotenv
-from fastapi import FastAPI, File, UploadFile
+from fastapi import FastAPI, File, UploadFile, BackgroundTasks, HTTPException, Request, Response
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from router import route_query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from router import route_query, get_router_stats
 from csv_handler import answer_from_csv
 from rag_handler import answer_from_rag
-from sql_handler import answer_from_sql
+from sql_handler import answer_from_sql, get_database, get_database_version, invalidate_schema, dispose_engine, get_sql_stats
 from utils import detect_plotting_intent
-from fastapi.staticfiles import StaticFiles
+from plot_store import read_plot, has_plot, get_plot_store_stats
+from index_cache import get_index_cache_stats
+from corpus_index import save_corpus, get_corpus_stats
+from retrieval import get_retrieval_stats
+from frame_cache import get_frame_cache_stats
+from ingest import DATA_DIR, ingest_file, mark_queued, get_ingestion_status, load_dataframe, sync_corpus
+from uploads import UploadError, create_upload, get_upload, append_chunk, complete_upload, abort_upload, save_stream, get_upload_stats
+from forecasting import FORECAST_HORIZON, submit_forecast, get_forecast_job, get_forecast_stats
+from llm_client import get_client_stats, embed_queries, get_embeddings
+from warmup import WARMUP_BLOCKING, run_warmup, start_warmup, get_warmup_status
+from events import emit, run_streamed
+from metrics import in_flight, maybe_profile, observe, render_metrics, set_source, span
+from answer_cache import get_file_versions, get_corpus_versions, lookup_answer, store_answer, invalidate_file, invalidate_source, get_answer_cache_stats
 
 load_dotenv()
 
+# How often an in-flight /api/ask request checks whether its client has gone away
+DISCONNECT_POLL_INTERVAL = float(os.getenv("LOGOS_DISCONNECT_POLL_INTERVAL", "0.5"))
+# Largest /api/ask/batch request, and how many of its questions are answered at once
+BATCH_MAX_QUERIES = int(os.getenv("LOGOS_BATCH_MAX_QUERIES", "500"))
+BATCH_CONCURRENCY = int(os.getenv("LOGOS_BATCH_CONCURRENCY", "8"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the subsystems named in LOGOS_WARMUP (by default the shared LLM and embedding clients)
+    # so the first requests do not pay for imports, client setup or worker start-up
+    if WARMUP_BLOCKING:
+        await asyncio.to_thread(run_warmup)
+    else:
+        start_warmup()
+    yield
+    dispose_engine()
+    save_corpus()
+
 app = FastAPI(
+    lifespan=lifespan,
     title="LOGOS - A Business Intelligence Framework",
     description="A conversational business intelligence agent that can query and analyze data from multiple sources.",
     version="1.0.0",
@@ -33,16 +69,49 @@ app.add_middleware(
 class Query(BaseModel):
     query: str
     selected_files: list[str] = []
+    plot_format: Literal["png", "svg", "webp"] = "png"
 
 class UploadResponse(BaseModel):
     filename: str
     path: str
+    ingestion_status: str | None = None
+    content_hash: str | None = None
+    size: int | None = None
+    # "unchanged" when the file already had these bytes, "linked" when another data file did
+    deduplicated: str | None = None
+
+class UploadStart(BaseModel):
+    filename: str
+    size: int | None = None
+    sha256: str | None = None
+
+class ForecastRequest(BaseModel):
+    file_name: str
+    horizon: int = FORECAST_HORIZON
+    plot_format: Literal["png", "svg", "webp"] = "png"
 
 class AskResponse(BaseModel):
     source: str
     answer: Union[str, List[Dict[str, Any]], Dict[str, Any], None] = None
     query: str | None = None
     image_path: str | None = None
+    table_path: str | None = None
+
+class BatchQuery(BaseModel):
+    queries: list[str]
+    selected_files: list[str] = []
+    plot_format: Literal["png", "svg", "webp"] = "png"
+    # Stream each answer as a line of JSON as soon as it is ready, instead of one response in order
+    stream: bool = False
+
+class BatchAnswer(AskResponse):
+    index: int
+    seconds: float
+
+class BatchResponse(BaseModel):
+    results: list[BatchAnswer]
+    sources: dict[str, int]
+    seconds: float
 
 # --- API Endpoints ---
 @app.get("/", tags=["General"], summary="Root endpoint")
@@ -50,16 +119,24 @@ def read_root():
     """Returns a simple hello world message."""
     return {"Hello": "World"}
 
-# Mount static files directory for plots
-PLOTS_DIR = os.path.join("/Users/dheeraj/Desktop/finalmp", "temp_plots")
-os.makedirs(PLOTS_DIR, exist_ok=True)
-app.mount("/api/plots", StaticFiles(directory=PLOTS_DIR), name="plots")
+@app.get("/api/plots/{name}", tags=["Data"], summary="Get a plot or forecast table")
+def get_plot(name: str, request: Request):
+    """Serves a stored plot, from memory when it was served recently. Content-hashed files never change."""
+    plot = read_plot(name)
+    if plot is None:
+        raise HTTPException(status_code=404, detail=f"Plot {name} not found.")
+    data, etag, media_type = plot
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=media_type, headers=headers)
 
 @app.get("/api/files", tags=["Data"], summary="List files in the data directory")
 def list_files():
     """Lists all files in the data directory."""
-    data_dir = "/Users/dheeraj/Desktop/finalmp/data"
-    files = [f for f in os.listdir(data_dir) if os.path.isfile(os.path.join(data_dir, f))]
+    data_dir = DATA_DIR
+    # Unfinished uploads are hidden .part files
+    files = [f for f in os.listdir(data_dir) if os.path.isfile(os.path.join(data_dir, f)) and not f.startswith(".")]
     return {"files": files}
 
 @app.get("/api/key", tags=["Debugging"], summary="Get Gemini API Key")
@@ -67,42 +144,365 @@ def get_key():
     """Returns the configured Gemini API key (for debugging purposes)."""
     return {"api_key": os.getenv("GEMINI_API_KEY")}
 
+@app.get("/api/cache/stats", tags=["Debugging"], summary="Get cache statistics")
+def cache_stats():
+    """Returns hit/miss counters for the document index, DataFrame, answer, routing, SQL schema, forecast and plot caches,
+    the size of the corpus index, retrieval packing counters and upload counters."""
+    return {"index": get_index_cache_stats(), "corpus": get_corpus_stats(), "frames": get_frame_cache_stats(), "answers": get_answer_cache_stats(),
+            "router": get_router_stats(), "sql": get_sql_stats(), "forecasts": get_forecast_stats(),
+            "plots": get_plot_store_stats(), "retrieval": get_retrieval_stats(), "uploads": get_upload_stats()}
+
+def _cache_counts() -> dict:
+    """Returns (hits, misses) for each cache, from the counters behind /api/cache/stats."""
+    index, frames, answers = get_index_cache_stats(), get_frame_cache_stats(), get_answer_cache_stats()
+    router, sql, forecasts, plots = get_router_stats(), get_sql_stats(), get_forecast_stats(), get_plot_store_stats()
+    routed = sum(router["decisions_by_tier"].values())
+    return {
+        "index": (index["memory_hits"] + index["disk_hits"], index["misses"]),
+        "frames": (frames["memory_hits"], frames["disk_reads"] + frames["conversions"]),
+        "answers": (answers["hits"] + answers["semantic_hits"], answers["misses"]),
+        "router": (router["decisions_by_tier"]["cache"], routed - router["decisions_by_tier"]["cache"]),
+        "sql_schema": (sql["table_info_hits"], sql["table_info_misses"]),
+        "sql_plans": (sql["plan_hits"], sql["plans_generated"] + sql["plans_failed"]),
+        "forecasts": (forecasts["cache_hits"] + forecasts["joined"], forecasts["submitted"]),
+        "plots": (plots["memory_hits"], plots["disk_reads"]),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Debugging"], summary="Prometheus metrics")
+def metrics():
+    """Returns request and stage latency histograms, LLM prompt sizes, in-flight requests and cache hit ratios
+    in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(_cache_counts()), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/warmup", tags=["Debugging"], summary="Get warm-up status")
+def warmup_status(response: Response):
+    """Returns the start-up warm-up of each subsystem; answers 503 until it has finished, for readiness probes."""
+    status = get_warmup_status()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
+@app.get("/api/clients/stats", tags=["Debugging"], summary="Get LLM client statistics")
+def client_stats():
+    """Returns how often the shared LLM and embedding clients were created versus reused."""
+    return get_client_stats()
+
+@app.post("/api/sql/schema/refresh", tags=["Data"], summary="Refresh the database schema cache")
+def refresh_sql_schema():
+    """Drops the cached database schema and SQL answers so the next SQL question reads them again."""
+    invalidate_schema()
+    invalidate_source("SQL")
+    return {"message": "SQL schema cache cleared."}
+
+def _finish_upload(background_tasks: BackgroundTasks, result: dict) -> dict:
+    """Schedules ingestion of a completed upload, unless the file already had the same bytes."""
+    file_name = result["filename"]
+    if result["deduplicated"] == "unchanged":
+        status = get_ingestion_status(file_name)
+        return {**result, "ingestion_status": status["status"] if status else "unchanged"}
+    invalidate_file(file_name)
+    mark_queued(file_name)
+    background_tasks.add_task(ingest_file, file_name)
+    return {**result, "ingestion_status": "queued"}
+
+def _upload_error(e: UploadError) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=e.detail)
+
 @app.post("/api/upload", response_model=UploadResponse, tags=["Data"], summary="Upload a file")
-async def upload_file(file: UploadFile = File(...)):
-    """Uploads a file to the data directory."""
-    file_path = os.path.join("/Users/dheeraj/Desktop/finalmp/data", file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    return {"filename": file.filename, "path": file_path}
+async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    """Uploads a file to the data directory and schedules its ingestion."""
+    async def chunks():
+        while block := await file.read(1024 * 1024):
+            yield block
 
-@app.post("/api/ask", response_model=AskResponse, tags=["AI"], summary="Ask a question")
-def ask(query: Query):
-    """Routes a natural language query to the appropriate data source and returns an answer."""
+    try:
+        result = await save_stream(file.filename, chunks())
+    except UploadError as e:
+        raise _upload_error(e)
+    return _finish_upload(background_tasks, result)
+
+@app.post("/api/uploads", tags=["Data"], summary="Start a chunked upload")
+def start_upload(request: UploadStart):
+    """Starts a resumable upload. Send the file's bytes with PUT /api/uploads/{upload_id}?offset=N in one or more
+    chunks, then complete it. Declaring the size and sha256 lets the server reject oversized or corrupted uploads."""
+    try:
+        return create_upload(request.filename, request.size, request.sha256)
+    except UploadError as e:
+        raise _upload_error(e)
+
+@app.get("/api/uploads/{upload_id}", tags=["Data"], summary="Get a chunked upload's state")
+def upload_state(upload_id: str):
+    """Returns an unfinished upload's state; a client resumes from its offset."""
+    session = get_upload(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"No upload found with id {upload_id}.")
+    return session
+
+@app.put("/api/uploads/{upload_id}", tags=["Data"], summary="Send a chunk of an upload")
+async def upload_chunk(upload_id: str, offset: int, request: Request):
+    """Appends the request body to an upload at the given offset, writing it to disk as it arrives."""
+    try:
+        return await append_chunk(upload_id, offset, request.stream())
+    except UploadError as e:
+        raise _upload_error(e)
+
+@app.post("/api/uploads/{upload_id}/complete", response_model=UploadResponse, tags=["Data"], summary="Complete an upload")
+async def finish_upload(upload_id: str, background_tasks: BackgroundTasks):
+    """Moves a fully received upload into the data directory and schedules its ingestion."""
+    try:
+        result = await asyncio.to_thread(complete_upload, upload_id)
+    except UploadError as e:
+        raise _upload_error(e)
+    return _finish_upload(background_tasks, result)
+
+@app.delete("/api/uploads/{upload_id}", tags=["Data"], summary="Abort an upload")
+def cancel_upload(upload_id: str):
+    """Drops an unfinished upload and the bytes received so far."""
+    try:
+        abort_upload(upload_id)
+    except UploadError as e:
+        raise _upload_error(e)
+    return {"message": f"Upload {upload_id} aborted."}
+
+@app.get("/api/ingest/{filename}", tags=["Data"], summary="Get ingestion status")
+def ingestion_status(filename: str):
+    """Returns the progress of the background ingestion job for an uploaded file."""
+    status = get_ingestion_status(filename)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"No ingestion job found for {filename}.")
+    return status
+
+@app.post("/api/forecast/jobs", tags=["AI"], summary="Submit a forecast job")
+async def submit_forecast_job(request: ForecastRequest):
+    """Queues a forecast of a CSV file's ds/y series and returns the job id to poll."""
+    if not request.file_name.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Forecast jobs take a CSV file with ds and y columns.")
+    if request.horizon < 1:
+        raise HTTPException(status_code=400, detail="The horizon must be at least one day.")
+    file_path = os.path.join(DATA_DIR, request.file_name)
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail=f"File {request.file_name} not found.")
+    df = await asyncio.to_thread(load_dataframe, file_path)
+    job_id = submit_forecast(df, request.file_name, request.horizon, request.plot_format)
+    return get_forecast_job(job_id)
+
+@app.get("/api/forecast/jobs/{job_id}", tags=["AI"], summary="Get forecast job status")
+def forecast_job_status(job_id: str):
+    """Returns a forecast job's status, and its result once it has finished."""
+    job = get_forecast_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No forecast job found with id {job_id}.")
+    return job
+
+@app.get("/api/forecast/jobs/{job_id}/result", tags=["AI"], summary="Get forecast job result")
+def forecast_job_result(job_id: str):
+    """Returns a finished forecast's summary and plot path, or 409 while it is still running."""
+    job = forecast_job_status(job_id)
+    if job["status"] == "failed":
+        raise HTTPException(status_code=422, detail=job["error"])
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Forecast job {job_id} is still {job['status']}.")
+    return job["result"]
+
+async def _cancel_on_disconnect(request: Request, coro):
+    """Runs a coroutine, cancelling it (and its pending LLM calls) if the client disconnects."""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                print("--- Client disconnected, cancelling query ---")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client closed the request.")
+    finally:
+        if not task.done():
+            task.cancel()
+
+def _is_cacheable(response: dict) -> bool:
+    answer = response["answer"]
+    if response["source"] not in ("CSV", "RAG", "SQL") or answer is None:
+        return False
+    # The SQL handler reports errors inside its list of rows
+    if isinstance(answer, list) and any(isinstance(row, dict) and "error" in row for row in answer):
+        return False
+    return True
+
+async def _answer_query(query: Query, endpoint: str = "ask", source: str | None = None) -> dict:
+    start = time.perf_counter()
+    with in_flight(endpoint), maybe_profile(endpoint):
+        response = await _route_and_answer(query, source)
+    observe("logos_request_seconds", time.perf_counter() - start, source=response["source"])
+    return response
+
+async def _route_and_answer(query: Query, source: str | None = None) -> dict:
     print(f"--- Received query: {query.query} ---")
     print(f"--- Selected files: {query.selected_files} ---")
     
     plotting_intent = detect_plotting_intent(query.query)
-    source = route_query(query.query)
+    if source is None:
+        with span("route"):
+            source = await route_query(query.query, query.selected_files)
+    set_source(source)
     
     print(f"--- Routed to: {source} ---")
     print(f"--- Plotting intent detected: {plotting_intent} ---")
+    emit("routed", source=source, plotting_intent=plotting_intent)
+
+    # Repeated questions against unchanged files are answered from the cache; SQL answers are keyed
+    # by the database schema instead and expire after LOGOS_ANSWER_CACHE_SQL_TTL
+    if source == "SQL":
+        file_versions = await asyncio.to_thread(get_database_version)
+    elif source == "RAG" and not query.selected_files:
+        # Answers searched from the whole corpus depend on every document
+        file_versions = await asyncio.to_thread(get_corpus_versions)
+    else:
+        file_versions = await asyncio.to_thread(get_file_versions, query.selected_files)
+    if file_versions is not None and query.plot_format != "png":
+        file_versions = tuple(file_versions) + (("plot_format", query.plot_format),)
+    query_embedding = None
+    if file_versions is not None and source in ("CSV", "RAG", "SQL"):
+        with span("answer_cache"):
+            cached, query_embedding = await lookup_answer(query.query, source, file_versions)
+        # A cached answer whose plot was evicted from the plot store is recomputed
+        if cached is not None and all(has_plot(path) for path in (cached.get("image_path"), cached.get("table_path")) if path):
+            print("--- Answer served from cache ---")
+            emit("cached")
+            return {**cached, "query": query.query}
 
     result = {}
     if source == "CSV":
-        result = answer_from_csv(query.query, query.selected_files, plotting_intent)
+        result = await answer_from_csv(query.query, query.selected_files, plotting_intent, query.plot_format)
     elif source == "RAG":
-        result = answer_from_rag(query.query, query.selected_files, plotting_intent)
+        result = await answer_from_rag(query.query, query.selected_files, plotting_intent, query.plot_format)
     elif source == "SQL":
-        result = {"answer": answer_from_sql(query.query)} # SQL handler has a different return format
+        result = {"answer": await answer_from_sql(query.query)} # SQL handler has a different return format
     else:
         result = {"answer": "Could not determine the data source for this query."}
 
     # Final response assembly
-    response = {"source": source, "query": query.query, "answer": None, "image_path": None}
+    response = {"source": source, "query": query.query, "answer": None, "image_path": None, "table_path": None}
     if "error" in result:
         response["answer"] = {"error": result["error"]}
     else:
         response["answer"] = result.get("answer")
         response["image_path"] = result.get("image_path")
+        response["table_path"] = result.get("table_path")
+        if file_versions is not None and _is_cacheable(response):
+            store_answer(query.query, source, file_versions, response, query_embedding)
         
-    return response
\ No newline at end of file
+    return response
+
+@app.post("/api/ask", response_model=AskResponse, tags=["AI"], summary="Ask a question")
+async def ask(query: Query, request: Request):
+    """Routes a natural language query to the appropriate data source and returns an answer."""
+    return await _cancel_on_disconnect(request, _answer_query(query))
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def _event_stream(query: Query):
+    """Yields stage and token events while the query is answered, then the full response as an answer event."""
+    task, queue = run_streamed(_answer_query(query, "ask_stream"))
+    try:
+        while (item := await queue.get()) is not None:
+            yield _sse(*item)
+        try:
+            response = task.result()
+        except Exception as e:
+            print(f"--- Streamed query failed: {e} ---")
+            yield _sse("error", {"detail": str(e)})
+            return
+        yield _sse("answer", AskResponse(**response).model_dump())
+        yield _sse("done", {})
+    finally:
+        # The client went away before the answer was ready
+        if not task.done():
+            print("--- Client disconnected, cancelling streamed query ---")
+            task.cancel()
+
+@app.post("/api/ask/stream", tags=["AI"], summary="Ask a question and stream the answer")
+async def ask_stream(query: Query):
+    """Answers like /api/ask, as server-sent events: routed, retrieved, computed, sql_rows, sql_executed and
+    forecast_ready stages, token events as the answer is generated, then answer (an AskResponse) and done."""
+    return StreamingResponse(_event_stream(query), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def _prepare_batch(batch: BatchQuery, sources: list[str]):
+    """Loads the selected CSV, brings the corpus index up to date, embeds the document questions and
+    opens the database once, so the batch's questions find everything cached."""
+    steps = []
+    csv_file = next((file for file in batch.selected_files if file.endswith('.csv')), None)
+    if "CSV" in sources and csv_file:
+        steps.append(asyncio.to_thread(load_dataframe, os.path.join(DATA_DIR, csv_file)))
+    rag_queries = [text for text, source in zip(batch.queries, sources)
+                   if source == "RAG" and not detect_plotting_intent(text)]
+    if rag_queries:
+        async def prepare_documents():
+            file_paths = [os.path.join(DATA_DIR, file) for file in batch.selected_files] or None
+            await asyncio.to_thread(sync_corpus, file_paths, get_embeddings())
+            await asyncio.to_thread(embed_queries, rag_queries)
+        steps.append(prepare_documents())
+    if "SQL" in sources:
+        steps.append(asyncio.to_thread(get_database))
+    # A failed step is not fatal here: each question reports its own error when it runs again
+    for outcome in await asyncio.gather(*steps, return_exceptions=True):
+        if isinstance(outcome, Exception):
+            print(f"--- Could not prepare batch: {outcome} ---")
+
+async def _iter_batch(batch: BatchQuery):
+    """Routes every question, prepares each source once, then yields answers as they finish.
+
+    Questions run BATCH_CONCURRENCY at a time, grouped by source so each source's caches stay warm.
+    """
+    sources = await asyncio.gather(*(route_query(text, batch.selected_files) for text in batch.queries))
+    print(f"--- Batch of {len(batch.queries)} questions routed: {dict(Counter(sources))} ---")
+    await _prepare_batch(batch, sources)
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def answer(index: int) -> dict:
+        async with semaphore:
+            start = time.perf_counter()
+            query = Query(query=batch.queries[index], selected_files=batch.selected_files, plot_format=batch.plot_format)
+            try:
+                response = await _answer_query(query, "ask_batch", sources[index])
+            except Exception as e:
+                response = {"source": sources[index], "query": query.query, "answer": {"error": str(e)},
+                            "image_path": None, "table_path": None}
+            return {**response, "index": index, "seconds": time.perf_counter() - start}
+
+    order = sorted(range(len(batch.queries)), key=lambda index: (sources[index], index))
+    tasks = [asyncio.ensure_future(answer(index)) for index in order]
+    try:
+        for next_answer in asyncio.as_completed(tasks):
+            yield await next_answer
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def _answer_batch(batch: BatchQuery) -> dict:
+    start = time.perf_counter()
+    results = sorted([result async for result in _iter_batch(batch)], key=lambda result: result["index"])
+    return {"results": results, "sources": dict(Counter(result["source"] for result in results)),
+            "seconds": time.perf_counter() - start}
+
+async def _batch_lines(batch: BatchQuery):
+    async for result in _iter_batch(batch):
+        yield json.dumps(BatchAnswer(**result).model_dump(), default=str) + "\n"
+
+@app.post("/api/ask/batch", response_model=BatchResponse, tags=["AI"], summary="Ask many questions about the same files")
+async def ask_batch(batch: BatchQuery, request: Request):
+    """Answers many questions against one file selection, e.g. for scheduled reports and evaluation runs.
+
+    Files, indexes and the database are loaded once for the whole batch. Returns the answers in
+    question order, or with stream=true, one JSON line per answer as soon as it is ready.
+    """
+    if not batch.queries:
+        raise HTTPException(status_code=400, detail="The batch has no questions.")
+    if len(batch.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"A batch can hold at most {BATCH_MAX_QUERIES} questions.")
+    if batch.stream:
+        return StreamingResponse(_batch_lines(batch), media_type="application/x-ndjson")
+    return await _cancel_on_disconnect(request, _answer_batch(batch))
@@ -0,0 +1,169 @@
+import os
+import time
+import random
+import cProfile
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Latency histogram buckets, in seconds: from cache hits up to slow agent runs and Prophet fits
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Fraction of questions answered under cProfile; each profile is written to PROFILE_DIR
+PROFILE_SAMPLE_RATE = float(os.getenv("LOGOS_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("LOGOS_PROFILE_DIR", os.path.join("/Users/dheeraj/Desktop/finalmp", "profiles"))
+
+METRICS = {
+    "logos_request_seconds": ("histogram", "Time to answer a question, by source."),
+    "logos_stage_seconds": ("histogram", "Time spent in each stage of answering a question, by source and stage."),
+    "logos_llm_seconds": ("histogram", "Duration of LLM calls, by model."),
+    "logos_llm_calls_total": ("counter", "LLM calls, by model and kind (chat, agent or embedding)."),
+    "logos_llm_prompt_chars_total": ("counter", "Characters sent to LLMs, by model and kind."),
+    "logos_llm_prompt_tokens_total": ("counter", "Estimated tokens sent to LLMs (4 characters per token), by model and kind."),
+    "logos_llm_response_chars_total": ("counter", "Characters received from LLMs, by model and kind."),
+    "logos_requests_in_flight": ("gauge", "Requests being handled, by endpoint."),
+    "logos_cache_hits_total": ("counter", "Cache hits, by cache."),
+    "logos_cache_misses_total": ("counter", "Cache misses, by cache."),
+    "logos_cache_hit_ratio": ("gauge", "Share of lookups answered from the cache, by cache."),
+    "logos_profiles_total": ("counter", "Requests profiled with cProfile."),
+}
+
+_histograms = {}
+_counters = {}
+_gauges = {}
+_lock = threading.Lock()
+_profile_lock = threading.Lock()
+
+# The data source of the question being answered, used to label stage timings
+_source = contextvars.ContextVar("logos_metrics_source", default="none")
+
+
+def set_source(source: str):
+    _source.set(source)
+
+
+def current_source() -> str:
+    return _source.get()
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name: str, seconds: float, **labels):
+    """Records a duration in a latency histogram."""
+    with _lock:
+        counts = _histograms.setdefault(_key(name, labels), [0] * len(LATENCY_BUCKETS) + [0.0, 0])
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                counts[i] += 1
+        counts[-2] += seconds
+        counts[-1] += 1
+
+
+def inc(name: str, amount: float = 1, **labels):
+    with _lock:
+        key = _key(name, labels)
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def add_gauge(name: str, delta: float, **labels):
+    with _lock:
+        key = _key(name, labels)
+        _gauges[key] = _gauges.get(key, 0) + delta
+
+
+@contextmanager
+def span(stage: str, source: str | None = None):
+    """Times a stage of the current question, e.g. `with span("retrieve"):`. Failed stages are timed too."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("logos_stage_seconds", time.perf_counter() - start, source=source or _source.get(), stage=stage)
+
+
+@contextmanager
+def in_flight(endpoint: str):
+    add_gauge("logos_requests_in_flight", 1, endpoint=endpoint)
+    try:
+        yield
+    finally:
+        add_gauge("logos_requests_in_flight", -1, endpoint=endpoint)
+
+
+@contextmanager
+def maybe_profile(label: str):
+    """Profiles a sampled fraction (PROFILE_SAMPLE_RATE) of the wrapped calls and writes a .prof file.
+
+    cProfile sees everything the event loop runs meanwhile, so only one request is profiled at a time.
+    """
+    if PROFILE_SAMPLE_RATE <= 0 or random.random() >= PROFILE_SAMPLE_RATE or not _profile_lock.acquire(blocking=False):
+        yield
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{os.getpid()}-{random.randrange(16 ** 6):06x}.prof"
+        path = os.path.join(PROFILE_DIR, name)
+        profiler.dump_stats(path)
+        inc("logos_profiles_total")
+        print(f"--- Request profile written to {path} ---")
+    finally:
+        _profile_lock.release()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = [*labels, *extra]
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics(caches: dict | None = None) -> str:
+    """Returns every metric in the Prometheus text format.
+
+    `caches` maps a cache name to its (hits, misses) counts, which are exported as counters and a hit ratio.
+    """
+    with _lock:
+        histograms = {key: list(counts) for key, counts in _histograms.items()}
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+    for cache, (hits, misses) in (caches or {}).items():
+        counters[_key("logos_cache_hits_total", {"cache": cache})] = hits
+        counters[_key("logos_cache_misses_total", {"cache": cache})] = misses
+        gauges[_key("logos_cache_hit_ratio", {"cache": cache})] = hits / (hits + misses) if hits + misses else 0.0
+
+    samples = {}
+    for (name, labels), counts in histograms.items():
+        lines = samples.setdefault(name, [])
+        for bound, count in zip(LATENCY_BUCKETS, counts):
+            lines.append(f"{name}_bucket{_labels(labels, (('le', bound),))} {count}")
+        lines.append(f"{name}_bucket{_labels(labels, (('le', '+Inf'),))} {counts[-1]}")
+        lines.append(f"{name}_sum{_labels(labels)} {_number(counts[-2])}")
+        lines.append(f"{name}_count{_labels(labels)} {counts[-1]}")
+    for (name, labels), value in [*counters.items(), *gauges.items()]:
+        samples.setdefault(name, []).append(f"{name}{_labels(labels)} {_number(value)}")
+
+    output = []
+    for name in sorted(samples):
+        kind, description = METRICS.get(name, ("untyped", name))
+        output += [f"# HELP {name} {description}", f"# TYPE {name} {kind}", *samples[name]]
+    return "\n".join(output) + "\n"
+
+
+def reset_metrics():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
@@ -0,0 +1,192 @@
+import os
+import io
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Rendered plots and forecast tables, named by the hash of their bytes so identical renders are stored once
+PLOT_DIR = os.getenv("LOGOS_PLOT_DIR", os.path.join("/Users/dheeraj/Desktop/finalmp", "temp_plots"))
+PLOT_STORE_MAX_BYTES = int(os.getenv("LOGOS_PLOT_STORE_MAX_BYTES", str(512 * 1024 ** 2)))
+# Files not read or written for this long are deleted
+PLOT_STORE_TTL = float(os.getenv("LOGOS_PLOT_STORE_TTL", str(7 * 24 * 3600)))
+# Recently served files are kept in memory, up to this many bytes
+PLOT_MEMORY_MAX_BYTES = int(os.getenv("LOGOS_PLOT_MEMORY_MAX_BYTES", str(64 * 1024 ** 2)))
+
+PLOT_FORMATS = ("png", "svg", "webp")
+WEBP_MAX_WIDTH = 800
+MEDIA_TYPES = {".png": "image/png", ".svg": "image/svg+xml", ".webp": "image/webp", ".csv": "text/csv"}
+# Reads refresh a file's mtime (its LRU position) at most this often
+_TOUCH_INTERVAL = 60
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+_stats = {"stored": 0, "deduplicated": 0, "evicted": 0, "expired": 0, "memory_hits": 0, "disk_reads": 0,
+          "memory_bytes": 0}
+
+
+def plot_url(name: str) -> str:
+    return f"/api/plots/{name}"
+
+
+def _is_valid_name(name: str) -> bool:
+    return bool(name) and os.path.basename(name) == name and not name.startswith(".") and not name.endswith(".tmp")
+
+
+def has_plot(url_or_name: str, plot_dir: str | None = None) -> bool:
+    """Returns whether a stored file (by name or /api/plots URL) still exists."""
+    name = os.path.basename(url_or_name)
+    return _is_valid_name(name) and os.path.exists(os.path.join(plot_dir or PLOT_DIR, name))
+
+
+def store_bytes(data: bytes, extension: str, plot_dir: str | None = None) -> str:
+    """Stores a file under the hash of its bytes and returns its name; an identical file is reused."""
+    plot_dir = plot_dir or PLOT_DIR
+    name = hashlib.sha256(data).hexdigest()[:32] + extension
+    path = os.path.join(plot_dir, name)
+    if os.path.exists(path):
+        os.utime(path)
+        with _lock:
+            _stats["deduplicated"] += 1
+        return name
+
+    os.makedirs(plot_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    with _lock:
+        _stats["stored"] += 1
+    _enforce_quota(plot_dir, keep=name)
+    return name
+
+
+def render_figure(fig, plot_format: str = "png", dpi: int = 100) -> bytes:
+    """Renders a matplotlib figure to PNG, SVG or a downscaled WebP."""
+    if plot_format not in PLOT_FORMATS:
+        raise ValueError(f"Unsupported plot format: {plot_format}")
+    buffer = io.BytesIO()
+    if plot_format == "svg":
+        import matplotlib
+        # Fixed element ids and no date, so identical figures produce identical bytes
+        with matplotlib.rc_context({"svg.hashsalt": "logos"}):
+            fig.savefig(buffer, format="svg", bbox_inches="tight", metadata={"Date": None})
+        return buffer.getvalue()
+
+    fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+    if plot_format == "png":
+        return buffer.getvalue()
+
+    from PIL import Image
+    image = Image.open(io.BytesIO(buffer.getvalue()))
+    if image.width > WEBP_MAX_WIDTH:
+        image = image.resize((WEBP_MAX_WIDTH, round(image.height * WEBP_MAX_WIDTH / image.width)), Image.LANCZOS)
+    webp = io.BytesIO()
+    image.save(webp, format="WEBP", quality=80, method=4)
+    return webp.getvalue()
+
+
+def save_figure(fig, plot_format: str = "png", plot_dir: str | None = None, dpi: int = 100) -> str:
+    """Renders and stores a figure, returning its file name."""
+    return store_bytes(render_figure(fig, plot_format, dpi), f".{plot_format}", plot_dir)
+
+
+def _forget(name: str):
+    with _lock:
+        entry = _memory.pop(name, None)
+        if entry is not None:
+            _stats["memory_bytes"] -= len(entry[0])
+
+
+def _enforce_quota(plot_dir: str, keep: str | None = None):
+    """Deletes files idle for longer than PLOT_STORE_TTL, then the least recently used beyond PLOT_STORE_MAX_BYTES."""
+    now = time.time()
+    files = []
+    for entry in os.scandir(plot_dir):
+        if not entry.is_file() or entry.name.endswith(".tmp"):
+            continue
+        stat = entry.stat()
+        if entry.name != keep and now - stat.st_mtime > PLOT_STORE_TTL:
+            _remove(entry.path, "expired")
+            continue
+        files.append((stat.st_mtime, entry.name, stat.st_size))
+
+    total = sum(size for _, _, size in files)
+    for _, name, size in sorted(files):
+        if total <= PLOT_STORE_MAX_BYTES:
+            break
+        if name == keep:
+            continue
+        _remove(os.path.join(plot_dir, name), "evicted")
+        total -= size
+
+
+def _remove(path: str, reason: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return
+    _forget(os.path.basename(path))
+    with _lock:
+        _stats[reason] += 1
+
+
+def read_plot(name: str) -> tuple[bytes, str, str] | None:
+    """Returns (bytes, ETag, media type) for a stored file, from memory when it was served recently."""
+    if not _is_valid_name(name):
+        return None
+    media_type = MEDIA_TYPES.get(os.path.splitext(name)[1].lower(), "application/octet-stream")
+    with _lock:
+        entry = _memory.get(name)
+        if entry is not None:
+            _memory.move_to_end(name)
+            _stats["memory_hits"] += 1
+            data, etag, touched = entry
+    path = os.path.join(PLOT_DIR, name)
+    if entry is not None:
+        # Another process may have evicted the file; the memory copy must not outlive it
+        if not os.path.exists(path):
+            _forget(name)
+            return None
+        if time.time() - touched > _TOUCH_INTERVAL:
+            _touch(name, data, etag)
+        return data, etag, media_type
+
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except (FileNotFoundError, IsADirectoryError):
+        return None
+    etag = f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+    _touch(name, data, etag)
+    with _lock:
+        _stats["disk_reads"] += 1
+        if len(data) <= PLOT_MEMORY_MAX_BYTES // 8:
+            if name not in _memory:
+                _stats["memory_bytes"] += len(data)
+            _memory[name] = (data, etag, time.time())
+            while _stats["memory_bytes"] > PLOT_MEMORY_MAX_BYTES:
+                _, (evicted, _, _) = _memory.popitem(last=False)
+                _stats["memory_bytes"] -= len(evicted)
+    return data, etag, media_type
+
+
+def _touch(name: str, data: bytes, etag: str):
+    try:
+        os.utime(os.path.join(PLOT_DIR, name))
+    except FileNotFoundError:
+        _forget(name)
+        return
+    with _lock:
+        if name in _memory:
+            _memory[name] = (data, etag, time.time())
+
+
+def get_plot_store_stats() -> dict:
+    """Returns store/dedup/eviction counters and the size of the plot directory and memory cache."""
+    with _lock:
+        stats = dict(_stats)
+        stats["memory_files"] = len(_memory)
+    files = [entry.stat().st_size for entry in os.scandir(PLOT_DIR) if entry.is_file()] if os.path.isdir(PLOT_DIR) else []
+    stats.update(files=len(files), bytes=sum(files), max_bytes=PLOT_STORE_MAX_BYTES)
+    return stats
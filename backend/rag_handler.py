@@ -1,18 +1,18 @@
 
 import os
+import asyncio
 import pandas as pd
 import io
-from PyPDF2 import PdfReader
-import docx
-import openpyxl
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
-from langchain_community.vectorstores import FAISS
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from utils import generate_forecast_plot
-
-def _extract_csv_from_text(text: str) -> str:
+from forecasting import forecast
+from retrieval import format_context, retrieve, uses_vectors
+from ingest import DATA_DIR, load_texts, sync_corpus
+from llm_client import ainvoke, embed_queries, get_llm, get_embeddings
+from events import emit
+from metrics import span
+
+async def _extract_csv_from_text(text: str) -> str:
     """Uses an LLM to find and format time-series data from raw text."""
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", google_api_key=os.getenv("GEMINI_API_KEY"))
+    llm = get_llm("extractor")
     prompt = f"""
     You are an expert data extraction and cleaning assistant. Your primary task is to find and format any time-series data within the provided text into a strict CSV format with two columns: 'ds' for dates and 'y' for a numeric value.
 
@@ -45,7 +45,7 @@ def _extract_csv_from_text(text: str) -> str:
     CSV Data:
     """
     try:
-        response = llm.invoke(prompt)
+        response = await ainvoke(llm, prompt)
         csv_data = response.content.strip()
         # The prompt explicitly asks not to include ```csv, but add a safeguard just in case
         if csv_data.startswith("```csv"):
@@ -63,55 +63,41 @@ def _extract_csv_from_text(text: str) -> str:
         print(f"--- Error during LLM data extraction: {e} ---")
         return ""
 
-def answer_from_rag(query: str, selected_files: list[str] = [], plotting_intent: bool = False) -> dict:
-    """Answers a question from documents, with an option to generate a forecast plot."""
-    data_dir = "/Users/dheeraj/Desktop/finalmp/data"
-    if not selected_files:
-        return {"error": "Please select at least one file to query."}
+async def answer_from_rag(query: str, selected_files: list[str] = [], plotting_intent: bool = False,
+                         plot_format: str = "png") -> dict:
+    """Answers a question from documents, with an option to generate a forecast plot.
 
-    raw_text = ''
-    for file_name in selected_files:
-        file_path = os.path.join(data_dir, file_name)
-        try:
-            if file_path.endswith('.pdf'):
-                with open(file_path, 'rb') as f:
-                    reader = PdfReader(f)
-                    for page in reader.pages:
-                        raw_text += page.extract_text() + '\n'
-            elif file_path.endswith('.docx'):
-                doc = docx.Document(file_path)
-                for para in doc.paragraphs:
-                    raw_text += para.text + '\n'
-            elif file_path.endswith('.xlsx'):
-                workbook = openpyxl.load_workbook(file_path)
-                for sheet_name in workbook.sheetnames:
-                    sheet = workbook[sheet_name]
-                    for row in sheet.iter_rows():
-                        for cell in row:
-                            if cell.value:
-                                raw_text += str(cell.value) + ' '
-                        raw_text += '\n'
-        except Exception as e:
-            return {"error": f"Error reading file {file_name}: {e}"}
-
-    if not raw_text:
-        return {"error": "No text could be extracted from the selected files."}
+    Without selected files, the question is answered from every ingested document.
+    """
+    data_dir = DATA_DIR
 
     # --- Forecasting Logic ---
     if plotting_intent:
+        if not selected_files:
+            return {"error": "Please select at least one file to query."}
         print("--- Plotting intent detected. Attempting to generate forecast... ---")
-        csv_data = _extract_csv_from_text(raw_text)
+        file_paths = [os.path.join(data_dir, file_name) for file_name in selected_files]
+        try:
+            raw_text = ''.join(await asyncio.to_thread(load_texts, file_paths))
+        except Exception as e:
+            return {"error": f"Error reading files {', '.join(selected_files)}: {e}"}
+
+        if not raw_text:
+            return {"error": "No text could be extracted from the selected files."}
+
+        csv_data = await _extract_csv_from_text(raw_text)
         if not csv_data:
             return {"error": "Could not find or parse time-series data from the document(s) for forecasting."}
         
         df = pd.read_csv(io.StringIO(csv_data))
-        forecast_result = generate_forecast_plot(df, selected_files[0])
+        emit("extracted", rows=len(df))
+        forecast_result = await forecast(df, selected_files[0], plot_format=plot_format)
         
         if "error" in forecast_result:
             return forecast_result # Pass the error up
 
         # Now, get a business analysis of the forecast
-        llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", google_api_key=os.getenv("GEMINI_API_KEY"))
+        llm = get_llm("analyst")
         analysis_prompt = f"""
         You are an expert business analyst. The following forecast has been generated from a document.
         Analyze the forecast summary and the original user query to provide a concise business analysis and interpretation.
@@ -121,25 +107,40 @@ def answer_from_rag(query: str, selected_files: list[str] = [], plotting_intent:
 
         Your concise analysis:
         """
-        analysis_response = llm.invoke(analysis_prompt)
+        analysis_response = await ainvoke(llm, analysis_prompt, stream=True)
         forecast_result['answer'] = analysis_response.content.strip()
         return forecast_result
 
     # --- Standard RAG Logic ---
     else:
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        texts = text_splitter.split_text(raw_text)
-        
         try:
-            embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=os.getenv("GEMINI_API_KEY"))
-            vectorstore = FAISS.from_texts(texts, embeddings)
-            retriever = vectorstore.as_retriever()
-            docs = retriever.get_relevant_documents(query)
+            embeddings = get_embeddings()
         except Exception as e:
             return {"error": f"Error creating vector store or retrieving documents: {e}"}
 
-        llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", google_api_key=os.getenv("GEMINI_API_KEY"))
-        context = ' '.join([doc.page_content for doc in docs])
+        # Documents are normally added to the corpus index at upload time; files that were never
+        # ingested are indexed now. The selection only filters the corpus search.
+        file_paths = [os.path.join(data_dir, file_name) for file_name in selected_files] or None
+        try:
+            corpus = await asyncio.to_thread(sync_corpus, file_paths, embeddings)
+        except Exception as e:
+            return {"error": f"Error indexing files {', '.join(selected_files) or 'in the data directory'}: {e}"}
+
+        files = [os.path.basename(file_path) for file_path in file_paths] if file_paths else None
+        try:
+            with span("retrieve"):
+                query_vector = (await asyncio.to_thread(embed_queries, [query]))[0] if uses_vectors() else None
+                passages, info = await asyncio.to_thread(retrieve, corpus, query, query_vector, files)
+        except Exception as e:
+            return {"error": f"Error creating vector store or retrieving documents: {e}"}
+
+        if not passages:
+            return {"error": "No text could be extracted from the selected files." if selected_files
+                    else "No documents have been ingested yet."}
+        emit("retrieved", chunks=info["candidates"], passages=len(passages), tokens=info["tokens"])
+
+        llm = get_llm("analyst")
+        context = format_context(passages)
         prompt = f"""
         You are an expert business analyst. Your task is to analyze the provided context from documents and answer the user's query. When appropriate, provide insights, suggestions, and forecasts based on the data. If the documents do not contain enough information to make a forecast or suggestion, explain what information is missing.
 
@@ -150,6 +151,6 @@ def answer_from_rag(query: str, selected_files: list[str] = [], plotting_intent:
 
         Based on the context, provide a concise and insightful answer to the query.
         """
-        response = llm.invoke(prompt)
+        response = await ainvoke(llm, prompt, stream=True)
         return {"answer": response.content.strip()}
 
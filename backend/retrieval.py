@@ -0,0 +1,192 @@
+import os
+import re
+import threading
+from corpus_index import CorpusIndex, tokenize
+from csv_analysis import estimate_tokens
+
+# --- Retrieval configuration ---
+# "hybrid" fuses the lexical (BM25) and vector rankings; "vector" or "lexical" use one of them
+RETRIEVAL_MODES = ("hybrid", "vector", "lexical")
+RAG_RETRIEVAL = os.getenv("LOGOS_RAG_RETRIEVAL", "hybrid")
+# Candidates taken from each ranking before they are fused, deduplicated and packed
+RAG_CANDIDATES = int(os.getenv("LOGOS_RAG_CANDIDATES", "20"))
+# Approximate prompt budget for retrieved passages, in tokens (estimated at 4 characters per token).
+# In benchmarks.bench_rag_context hybrid retrieval finds every expected figure from 1500 tokens up;
+# 2000 leaves some margin at about twice the old top-k prompt
+RAG_CONTEXT_TOKENS = int(os.getenv("LOGOS_RAG_CONTEXT_TOKENS", "2000"))
+# Reciprocal rank fusion constant: higher values flatten the advantage of the top ranks
+RRF_K = 60
+# Chunks of the same document that share at least this many characters at their edges are one span
+MIN_OVERLAP_CHARS = 40
+# A passage that does not fit is cut down to its best sentences if this much budget is left
+MIN_PASSAGE_TOKENS = 40
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+_WHITESPACE = re.compile(r"\s+")
+
+_stats_lock = threading.Lock()
+_stats = {"searches": 0, "candidates": 0, "passages": 0, "duplicates": 0, "merged": 0, "trimmed": 0,
+          "dropped": 0, "context_tokens": 0}
+
+
+def _key(doc) -> tuple:
+    return doc.metadata.get("source"), doc.page_content
+
+
+def fuse(*rankings: list) -> list:
+    """Merges ranked lists of Documents with reciprocal rank fusion; identical chunks are counted once."""
+    scores, docs = {}, {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = _key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+def compress(text: str) -> str:
+    """Collapses the runs of whitespace that PDF and spreadsheet extraction leave in chunks."""
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _overlap(head: str, tail: str) -> int:
+    """Returns the length of the longest end of `head` that `tail` starts with, if it is long enough to be a chunk overlap."""
+    probe = tail[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    start = head.find(probe)
+    while start != -1:
+        if tail.startswith(head[start:]):
+            return len(head) - start
+        start = head.find(probe, start + 1)
+    return 0
+
+
+def _join(span: str, text: str) -> str | None:
+    """Returns the union of two pieces of one document if they overlap or contain each other, else None."""
+    if text in span:
+        return span
+    if span in text:
+        return text
+    overlap = _overlap(span, text)
+    if overlap:
+        return span + text[overlap:]
+    overlap = _overlap(text, span)
+    if overlap:
+        return text + span[overlap:]
+    return None
+
+
+def _best_sentences(text: str, terms: set, budget: int) -> str:
+    """Keeps the sentences of a passage that share the most terms with the question, in their original order."""
+    sentences = _SENTENCE_END.split(text)
+    ranked = sorted(range(len(sentences)), key=lambda i: -len(terms.intersection(tokenize(sentences[i]))))
+    kept, used = set(), 0
+    for i in ranked:
+        # Rounded up, with its separator, so the joined sentences never exceed the budget
+        cost = -(-len(sentences[i] + " ... ") // 4)
+        if used + cost <= budget:
+            kept.add(i)
+            used += cost
+    return " ... ".join(sentences[i] for i in sorted(kept))
+
+
+def pack(query: str, docs: list, budget: int) -> tuple[list[dict], dict]:
+    """Packs ranked chunks into passages that fit in `budget` tokens.
+
+    Chunks are taken best first. A chunk already covered by a passage is dropped; one that overlaps a
+    passage of the same document extends it with only its new text, which also removes the splitter's
+    chunk overlap from the prompt. A chunk that does not fit is cut down to its sentences that best
+    match the question. Returns the passages as {"source", "text"} and what was done to the chunks.
+    """
+    terms = set(tokenize(query))
+    passages, used = [], 0
+    info = {"candidates": len(docs), "duplicates": 0, "merged": 0, "trimmed": 0, "dropped": 0}
+    for doc in docs:
+        remaining = budget - used
+        if remaining < MIN_PASSAGE_TOKENS:
+            info["dropped"] += 1
+            continue
+        source, text = doc.metadata.get("source"), compress(doc.page_content)
+        if not text:
+            continue
+        # Grow the first passage this chunk overlaps, then absorb the passages the grown span now bridges
+        joined, target = None, None
+        for passage in passages:
+            if passage["source"] == source:
+                joined = _join(passage["text"], text)
+                if joined is not None:
+                    target = passage
+                    break
+        if target is not None:
+            if joined == target["text"]:
+                info["duplicates"] += 1
+                continue
+            absorbed = []
+            for passage in passages:
+                if passage is not target and passage["source"] == source:
+                    bridged = _join(joined, passage["text"])
+                    if bridged is not None:
+                        joined = bridged
+                        absorbed.append(passage)
+            cost = estimate_tokens(joined) - estimate_tokens(target["text"]) - sum(
+                estimate_tokens(passage["text"]) for passage in absorbed)
+            if cost > remaining:
+                info["dropped"] += 1
+                continue
+            target["text"] = joined
+            passages = [passage for passage in passages if not any(passage is other for other in absorbed)]
+            info["merged"] += 1
+            used += cost
+            continue
+        if estimate_tokens(text) > remaining:
+            text = _best_sentences(text, terms, remaining)
+            if not text:
+                info["dropped"] += 1
+                continue
+            info["trimmed"] += 1
+        passages.append({"source": source, "text": text})
+        used += estimate_tokens(text)
+    info["tokens"] = used
+    return passages, info
+
+
+def format_context(passages: list[dict]) -> str:
+    """Lays out passages for the prompt, each labelled with its document."""
+    return "\n\n".join(f"[{passage['source']}] {passage['text']}" if passage["source"] else passage["text"]
+                       for passage in passages)
+
+
+def uses_vectors(mode: str | None = None) -> bool:
+    """Returns True if the retrieval mode needs the question's embedding."""
+    return (mode or RAG_RETRIEVAL) != "lexical"
+
+
+def retrieve(corpus: CorpusIndex, query: str, query_vector=None, files: list[str] | None = None,
+             budget: int | None = None, mode: str | None = None) -> tuple[list[dict], dict]:
+    """Searches the corpus lexically and/or by vector, fuses the rankings and packs the best chunks into the budget.
+
+    The budget and mode default to LOGOS_RAG_CONTEXT_TOKENS and LOGOS_RAG_RETRIEVAL.
+    """
+    budget = RAG_CONTEXT_TOKENS if budget is None else budget
+    mode = mode or RAG_RETRIEVAL
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode: {mode}; use one of {', '.join(RETRIEVAL_MODES)}.")
+    rankings = []
+    if mode != "lexical" and query_vector is not None:
+        rankings.append([doc for doc, _ in corpus.search(query_vector, RAG_CANDIDATES, files)])
+    if mode != "vector":
+        rankings.append([doc for doc, _ in corpus.lexical_search(query, RAG_CANDIDATES, files)])
+    passages, info = pack(query, fuse(*rankings), budget)
+    with _stats_lock:
+        _stats["searches"] += 1
+        _stats["passages"] += len(passages)
+        _stats["context_tokens"] += info["tokens"]
+        for name in ("candidates", "duplicates", "merged", "trimmed", "dropped"):
+            _stats[name] += info[name]
+    return passages, info
+
+
+def get_retrieval_stats() -> dict:
+    with _stats_lock:
+        return {**_stats, "mode": RAG_RETRIEVAL, "budget_tokens": RAG_CONTEXT_TOKENS}
@@ -1,11 +1,178 @@
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+import re
+import math
+import threading
+from collections import Counter, OrderedDict
+from llm_client import ainvoke, get_llm
 
-def route_query(query: str) -> str:
-    """Classifies the user's query and returns the data source type."""
+SOURCES = ("SQL", "RAG", "CSV")
+
+# Below this confidence the local tiers defer to the LLM router
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("LOGOS_ROUTER_CONFIDENCE", "0.6"))
+ROUTER_CACHE_SIZE = int(os.getenv("LOGOS_ROUTER_CACHE_SIZE", "4096"))
+
+DOCUMENT_EXTENSIONS = {".pdf", ".docx", ".xlsx"}
+
+# Labeled examples for the nearest-centroid classifier. Keep them distinct from the questions in
+# benchmarks/eval_questions.json, so the evaluation measures routing of unseen questions
+ROUTER_EXAMPLES = {
+    "SQL": [
+        "What are the total sales for the last quarter?",
+        "How many users are there?",
+        "Count the employees in each department.",
+        "Which region has the most orders in the database?",
+        "List customers who placed more than ten orders.",
+        "Which warehouse shipped the most packages?",
+        "What is the median invoice amount?",
+        "How many new accounts signed up each week?",
+        "Rank suppliers by number of shipments.",
+        "What was the monthly revenue in 2023?",
+        "Which store sold the most units?",
+        "What is the sum of refunds by month?",
+    ],
+    "RAG": [
+        "Summarize the key findings of the research paper.",
+        "What were the sales and marketing expenses last year?",
+        "Summarize the annual report.",
+        "What risks does the filing mention?",
+        "What does the document say about cloud revenue?",
+        "Explain the main points of this report.",
+        "What guidance did management give in the report?",
+        "What does the handbook say about parental leave?",
+        "Are contractors covered by the travel policy?",
+        "What equipment does the IT policy let employees expense?",
+        "Outline the onboarding steps described in the guide.",
+        "Which employees qualify for the bonus plan according to the memo?",
+    ],
+    "CSV": [
+        "List all products in the category Y.",
+        "Forecast sales from this CSV.",
+        "Plot the values in this CSV file.",
+        "Which row in the spreadsheet has the highest value?",
+        "Predict the next values of the column in this csv.",
+        "What columns are in this CSV?",
+        "Show the trend of y over time in the file.",
+        "How much does item Z cost in the price list?",
+        "Which items in the price list cost under $20?",
+        "What is the most expensive item in the Electronics category?",
+        "Find the row for order number 1042 in the file.",
+        "Sum the amount column in this file.",
+    ],
+}
+
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "of", "in", "on", "for", "to", "me", "and", "or",
+    "what", "which", "who", "how", "do", "does", "did", "this", "that", "with", "by", "from", "all",
+    "show", "list", "there", "be", "it", "its", "my", "our", "give", "can", "about",
+}
+
+_decisions = OrderedDict()
+_decisions_lock = threading.Lock()
+_stats = {"cache": 0, "rules": 0, "classifier": 0, "llm": 0}
+
+
+def _tokens(text: str) -> Counter:
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    # Crude plural folding is enough for short routing queries
+    return Counter(word[:-1] if len(word) > 3 and word.endswith("s") else word
+                   for word in words if word not in _STOPWORDS)
+
+
+def _normalize(vector: Counter) -> dict:
+    norm = math.sqrt(sum(count * count for count in vector.values()))
+    return {term: count / norm for term, count in vector.items()} if norm else {}
+
+
+def _build_centroids(examples: dict) -> dict:
+    centroids = {}
+    for source, queries in examples.items():
+        total = Counter()
+        for query in queries:
+            for term, weight in _normalize(_tokens(query)).items():
+                total[term] += weight
+        centroids[source] = _normalize(total)
+    return centroids
+
+
+_centroids = _build_centroids(ROUTER_EXAMPLES)
+
+
+def _file_kinds(selected_files: list[str]) -> set:
+    kinds = set()
+    for file_name in selected_files:
+        extension = os.path.splitext(file_name)[1].lower()
+        kinds.add("csv" if extension == ".csv" else "document" if extension in DOCUMENT_EXTENSIONS else "other")
+    return kinds
+
+
+def candidate_sources(selected_files: list[str]) -> tuple:
+    """Returns the sources that can answer with the selected files."""
+    kinds = _file_kinds(selected_files)
+    if not kinds:
+        # Without a selection the database or the whole document corpus can answer; CSV needs a file
+        return ("SQL", "RAG")
+    return tuple(source for source, kind in (("CSV", "csv"), ("RAG", "document")) if kind in kinds) or SOURCES
+
+
+def route_by_rules(selected_files: list[str]) -> tuple[str, float] | None:
+    """Routes on the selected file types alone, or returns None when they are not decisive."""
+    kinds = _file_kinds(selected_files)
+    if kinds == {"csv"}:
+        return "CSV", 0.95
+    if kinds == {"document"}:
+        return "RAG", 0.9
+    return None
 
-    print("--- Routing query... ---")
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", google_api_key=os.getenv("GEMINI_API_KEY"))
+
+def classify(query: str, candidates: tuple = SOURCES) -> tuple[str, float]:
+    """Nearest-centroid keyword classifier. Returns the best source and a confidence in [0, 1]."""
+    vector = _normalize(_tokens(query))
+    scores = {source: sum(weight * _centroids[source].get(term, 0.0) for term, weight in vector.items())
+              for source in candidates}
+    # Softmax over cosine similarities; a low temperature turns clear margins into high confidence
+    exps = {source: math.exp(score / 0.1) for source, score in scores.items()}
+    total = sum(exps.values())
+    best = max(scores, key=scores.get)
+    return best, exps[best] / total
+
+
+def route_locally(query: str, selected_files: list[str] | None = None) -> tuple[str, float, str]:
+    """Runs the local tiers. Returns (source, confidence, tier)."""
+    selected_files = selected_files or []
+    ruled = route_by_rules(selected_files)
+    if ruled:
+        return ruled[0], ruled[1], "rules"
+
+    # No or mixed selections: only sources that can use the selected files are candidates
+    candidates = candidate_sources(selected_files)
+    if len(candidates) == 1:
+        return candidates[0], 0.9, "rules"
+    source, confidence = classify(query, candidates)
+    return source, confidence, "classifier"
+
+
+def _decision_key(query: str, selected_files: list[str]) -> tuple:
+    normalized = " ".join(re.findall(r"[a-z0-9$]+", query.lower()))
+    return normalized, tuple(sorted(_file_kinds(selected_files)))
+
+
+def _remember(key: tuple, source: str):
+    with _decisions_lock:
+        _decisions[key] = source
+        _decisions.move_to_end(key)
+        while len(_decisions) > ROUTER_CACHE_SIZE:
+            _decisions.popitem(last=False)
+
+
+def get_router_stats() -> dict:
+    """Returns how many queries each routing tier decided."""
+    with _decisions_lock:
+        return {"decisions_by_tier": dict(_stats), "cached_decisions": len(_decisions)}
+
+
+async def _route_with_llm(query: str, selected_files: list[str]) -> str:
+    llm = get_llm("router")
+    candidates = candidate_sources(selected_files)
 
     prompt = f"""
     You are an expert query router. Your task is to classify the user's query and determine the most appropriate data source. You need to be smart about this. A query might sound like it's for a database, but it could be a question about a recently uploaded document.
@@ -21,16 +188,53 @@ def route_query(query: str) -> str:
     - Use CSV for queries on simple tabular data from a CSV file. **If a CSV file is selected and the query is about analyzing, forecasting, or extracting data from that file, prioritize CSV.**
       Examples: 'What is the price of product X?', 'List all products in the category Y.', 'Forecast sales from this CSV.'
 
+    Selected files: {", ".join(selected_files) or "none (RAG searches every uploaded document)"}
     Query: "{query}"
 
-    Based on the query, which data source should be used? Respond with only one word: SQL, RAG, or CSV.
+    Based on the query, which data source should be used? Respond with only one word: {", ".join(candidates[:-1])} or {candidates[-1]}.
     """
 
     print("--- Calling Gemini API for routing... ---")
     try:
-        response = llm.invoke(prompt)
+        response = await ainvoke(llm, prompt)
         print(f"--- Gemini API response: {response.content.strip()} ---")
         return response.content.strip()
     except Exception as e:
         print(f"--- Error calling Gemini API: {e} ---")
-        return "Unknown"
\ No newline at end of file
+        return "Unknown"
+
+
+async def route_query(query: str, selected_files: list[str] | None = None) -> str:
+    """Classifies the user's query and returns the data source type.
+
+    File-type rules and a local keyword classifier handle most queries in microseconds; the LLM
+    is only consulted when their confidence is below ROUTER_CONFIDENCE_THRESHOLD. Decisions are
+    memoized per normalized query and file types.
+    """
+    print("--- Routing query... ---")
+    selected_files = selected_files or []
+    key = _decision_key(query, selected_files)
+    with _decisions_lock:
+        if key in _decisions:
+            _decisions.move_to_end(key)
+            _stats["cache"] += 1
+            return _decisions[key]
+
+    source, confidence, tier = route_locally(query, selected_files)
+    if confidence < ROUTER_CONFIDENCE_THRESHOLD:
+        print(f"--- Local router unsure ({source}, {confidence:.2f}), asking the LLM ---")
+        answer = await _route_with_llm(query, selected_files)
+        if answer in SOURCES and answer not in candidate_sources(selected_files):
+            # e.g. CSV without a selected CSV file: keep the local choice
+            print(f"--- LLM chose {answer}, which cannot answer with these files; using {source} ---")
+        else:
+            source, tier = answer, "llm"
+        if source not in SOURCES:
+            # Do not memoize failures or unexpected answers
+            return source
+
+    with _decisions_lock:
+        _stats[tier] += 1
+    _remember(key, source)
+    print(f"--- Routed by {tier} tier ---")
+    return source
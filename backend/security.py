@@ -1,14 +1,39 @@
 
 import re
+import numbers
+import pandas as pd
+
+# Email addresses, and phone numbers in simple US-like patterns
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+PHONE_PATTERN = re.compile(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b')
 
 def mask_pii(text: str) -> str:
     """Masks common PII patterns in a string."""
 
     # Mask email addresses
-    text = re.sub(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', '[EMAIL_REDACTED]', text)
+    text = EMAIL_PATTERN.sub('[EMAIL_REDACTED]', text)
 
     # Mask phone numbers (simple US-like patterns)
-    text = re.sub(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b', '[PHONE_REDACTED]', text)
+    text = PHONE_PATTERN.sub('[PHONE_REDACTED]', text)
 
     return text
 
+def mask_pii_rows(columns: list[str], rows: list[tuple]) -> list[dict]:
+    """Masks PII in query results, one vectorized pass per column, and returns the rows as dicts.
+
+    Text values are masked in place. Numbers are checked as text too, since phone numbers are often
+    stored in integer columns; one that matches is replaced by the masked string, and the others
+    keep their types.
+    """
+    values = [list(column) for column in zip(*rows)] or [[] for _ in columns]
+    for i, column in enumerate(values):
+        series = pd.Series(column, dtype=object)
+        is_text = series.map(type) == str
+        is_number = series.map(lambda value: isinstance(value, numbers.Number) and not isinstance(value, bool))
+        if not (is_text.any() or is_number.any()):
+            continue
+        text = series.astype(str)
+        masked = (text.str.replace(EMAIL_PATTERN, '[EMAIL_REDACTED]', regex=True)
+                      .str.replace(PHONE_PATTERN, '[PHONE_REDACTED]', regex=True))
+        values[i] = masked.where(is_text | (is_number & (masked != text)), series).tolist()
+    return [dict(zip(columns, row)) for row in zip(*values)]
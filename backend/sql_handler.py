@@ -1,13 +1,114 @@
 
 import os
-from sqlalchemy import create_engine
-from langchain_community.utilities import SQLDatabase
-from security import mask_pii
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_community.agent_toolkits import create_sql_agent
+import re
+import ast
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import cache
+from security import mask_pii, mask_pii_rows
+from llm_client import LLM_TIMEOUT, ainvoke, get_llm, usage_callback
+from answer_cache import normalize_query
+from csv_analysis import estimate_tokens
+from events import emit, is_streaming
+from metrics import span
 
-def answer_from_sql(query: str) -> list:
-    """Answers a question from a SQL database."""
+# --- Connection pool and schema cache configuration ---
+SQL_POOL_SIZE = int(os.getenv("LOGOS_SQL_POOL_SIZE", "5"))
+SQL_MAX_OVERFLOW = int(os.getenv("LOGOS_SQL_MAX_OVERFLOW", "10"))
+# Recycle connections before servers or proxies drop idle ones
+SQL_POOL_RECYCLE = int(os.getenv("LOGOS_SQL_POOL_RECYCLE", "1800"))
+# How long reflected tables and their descriptions are reused before the schema is read again
+SQL_SCHEMA_REFRESH = float(os.getenv("LOGOS_SQL_SCHEMA_REFRESH", "600"))
+
+# --- Query generation and execution ---
+# "single" writes one SELECT from the schema and runs it, falling back to the agent when that fails;
+# "agent" always runs the multi-step ReAct agent
+SQL_MODE = os.getenv("LOGOS_SQL_MODE", "single")
+# Schemas described in more tokens than this are left for the agent to explore table by table
+SQL_SCHEMA_TOKEN_BUDGET = int(os.getenv("LOGOS_SQL_SCHEMA_TOKEN_BUDGET", "6000"))
+# Generated SQL that ran successfully, reused for the same question and schema
+SQL_PLAN_CACHE_SIZE = int(os.getenv("LOGOS_SQL_PLAN_CACHE_SIZE", "512"))
+SQL_ROW_LIMIT = int(os.getenv("LOGOS_SQL_ROW_LIMIT", "1000"))
+SQL_QUERY_TIMEOUT = float(os.getenv("LOGOS_SQL_QUERY_TIMEOUT", "30"))
+# Rows fetched from the cursor at a time (and streamed as one sql_rows event)
+SQL_FETCH_SIZE = 200
+
+SQL_PROMPT = """You are an expert business analyst writing {dialect} SQL.
+Write one read-only SELECT statement that answers the question from the tables below.
+Return only the SQL, with no explanation. If the tables cannot answer the question, return NONE.
+
+{schema}
+
+Question: {question}
+SQL:"""
+
+_WRITE_KEYWORDS = re.compile(r"\b(insert|update|delete|drop|alter|create|attach|detach|pragma|grant|revoke|truncate|"
+                             r"merge|copy|vacuum|exec|execute|call|into)\b", re.IGNORECASE)
+
+_engine = None
+_db = None
+_db_loaded_at = 0.0
+_agent = None
+_agent_key = None
+_plans = OrderedDict()
+_lock = threading.Lock()
+_stats = {"engines_created": 0, "schema_loads": 0, "table_info_hits": 0, "table_info_misses": 0,
+          "agents_built": 0, "agents_reused": 0, "plan_hits": 0, "plans_generated": 0, "plans_failed": 0,
+          "agent_answers": 0, "rows_returned": 0, "truncated_results": 0}
+
+
+@cache
+def _database_class():
+    # SQLAlchemy and the LangChain SQL toolkit are imported with the first database connection
+    from langchain_community.utilities import SQLDatabase
+
+    class CachedSQLDatabase(SQLDatabase):
+        """SQLDatabase that reflects tables on first use and memoizes each table's description.
+
+        The agent asks for table info (DDL plus sample rows, one query per table) on every question;
+        here that work is done once per table until the schema is refreshed.
+        """
+
+        def __init__(self, engine, **kwargs):
+            super().__init__(engine, lazy_table_reflection=True, **kwargs)
+            self._table_info = {}
+            self._table_info_lock = threading.Lock()
+            self._schema_version = None
+
+        def get_table_info(self, table_names=None) -> str:
+            names = sorted(table_names if table_names is not None else self.get_usable_table_names())
+            with self._table_info_lock:
+                missing = [name for name in names if name not in self._table_info]
+                for name in missing:
+                    self._table_info[name] = super().get_table_info([name])
+                with _lock:
+                    _stats["table_info_misses"] += len(missing)
+                    _stats["table_info_hits"] += len(names) - len(missing)
+                return "\n\n".join(sorted(self._table_info[name] for name in names))
+
+        def schema_version(self) -> str:
+            """Hashes the usable tables' column names and types; generated SQL is only reused while it holds."""
+            with self._table_info_lock:
+                if self._schema_version is None:
+                    from sqlalchemy import inspect
+                    inspector = inspect(self._engine)
+                    tables = [(name, [(column["name"], str(column["type"]))
+                                      for column in inspector.get_columns(name, schema=self._schema)])
+                              for name in sorted(self.get_usable_table_names())]
+                    self._schema_version = hashlib.sha256(repr(tables).encode("utf-8")).hexdigest()[:16]
+                return self._schema_version
+
+    return CachedSQLDatabase
+
+
+def _database_url() -> str:
+    # LOGOS_SQL_URL points the agent at any SQLAlchemy URL, e.g. sqlite:///sample.db for local runs
+    url = os.getenv("LOGOS_SQL_URL")
+    if url:
+        return url
 
     # --- DATABASE CONNECTION (PLACEHOLDERS) ---
     # Replace with your actual database credentials
@@ -17,44 +118,281 @@ def answer_from_sql(query: str) -> list:
     db_port = os.getenv("POSTGRES_PORT", "5432") # Default PostgreSQL port
     db_name = os.getenv("POSTGRES_DB")
 
-    connection_string = f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+    return f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
 
+def get_engine():
+    """Returns the process-wide SQLAlchemy engine, creating its connection pool on first use."""
+    global _engine
+    with _lock:
+        if _engine is None:
+            url = _database_url()
+            options = {"pool_pre_ping": True, "pool_recycle": SQL_POOL_RECYCLE}
+            if not url.startswith("sqlite"):
+                # SQLite's default pools do not take size settings
+                options.update(pool_size=SQL_POOL_SIZE, max_overflow=SQL_MAX_OVERFLOW)
+            from sqlalchemy import create_engine
+            _engine = create_engine(url, **options)
+            _stats["engines_created"] += 1
+        return _engine
+
+
+def get_database():
+    """Returns the shared SQLDatabase, reloading the schema once SQL_SCHEMA_REFRESH has passed."""
+    global _db, _db_loaded_at
+    with _lock:
+        if _db is not None and time.monotonic() - _db_loaded_at < SQL_SCHEMA_REFRESH:
+            return _db
+    db = _database_class()(get_engine())
+    with _lock:
+        _db, _db_loaded_at = db, time.monotonic()
+        _stats["schema_loads"] += 1
+    return db
+
+
+def invalidate_schema():
+    """Forgets the cached schema so the next question reads it again, e.g. after a migration."""
+    global _db
+    with _lock:
+        _db = None
+
+
+def get_database_version() -> tuple | None:
+    """Returns a version of the database for answer cache keys: its schema hash, or None if it cannot be read."""
     try:
-        engine = create_engine(connection_string)
-        db = SQLDatabase(engine)
+        return (("database", get_database().schema_version()),)
     except Exception as e:
-        return [{"error": f"Error connecting to the database: {e}"}]
+        print(f"--- Could not read the database schema version: {e} ---")
+        return None
 
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", google_api_key=os.getenv("GEMINI_API_KEY"))
 
-    try:
-        agent_executor = create_sql_agent(
-            llm, 
-            db=db, 
-            agent_type="zero-shot-react-description", 
-            verbose=True, 
-            handle_parsing_errors=True,
-            prefix="""You are an expert business analyst. You have access to a SQL database. 
+def get_agent(db, llm):
+    """Returns the SQL agent for this database and model, building it only when either changes."""
+    global _agent, _agent_key
+    key = (id(db), id(llm))
+    with _lock:
+        if _agent is not None and _agent_key == key:
+            _stats["agents_reused"] += 1
+            return _agent
+    from langchain_community.agent_toolkits import create_sql_agent
+    agent = create_sql_agent(
+        llm,
+        db=db,
+        agent_type="zero-shot-react-description",
+        verbose=True,
+        handle_parsing_errors=True,
+        prefix="""You are an expert business analyst. You have access to a SQL database. 
 Your task is to answer the user's query by generating and executing SQL queries. 
 When appropriate, provide insights and suggestions based on the query results."""
-        )
-        result = agent_executor.run(query)
-        result = mask_pii(str(result))
+    )
+    with _lock:
+        _agent, _agent_key = agent, key
+        _stats["agents_built"] += 1
+    return agent
+
+
+def dispose_engine():
+    """Closes pooled connections and drops the cached engine, schema and agent."""
+    global _engine, _db, _agent, _agent_key
+    with _lock:
+        engine, _engine, _db, _agent, _agent_key = _engine, None, None, None, None
+    if engine is not None:
+        engine.dispose()
+
+
+def get_sql_stats() -> dict:
+    """Returns schema cache and agent reuse counters plus the connection pool status."""
+    with _lock:
+        stats = dict(_stats)
+        engine = _engine
+        stats["schema_age"] = time.monotonic() - _db_loaded_at if _db is not None else None
+    stats["pool"] = engine.pool.status() if engine is not None else None
+    return stats
+
+
+def _clean_sql(text: str) -> str | None:
+    """Extracts the statement from a model reply, or None unless it is a single read-only SELECT."""
+    fenced = re.search(r"```(?:sql)?\s*(.*?)```", text, re.DOTALL | re.IGNORECASE)
+    sql = (fenced.group(1) if fenced else text).strip().rstrip(";").strip()
+    if not re.match(r"(select|with)\b", sql, re.IGNORECASE) or ";" in sql or _WRITE_KEYWORDS.search(sql):
+        return None
+    return sql
+
+
+def _lookup_plan(key: tuple) -> str | None:
+    with _lock:
+        sql = _plans.get(key)
+        if sql is not None:
+            _plans.move_to_end(key)
+            _stats["plan_hits"] += 1
+        return sql
+
+
+def _remember_plan(key: tuple, sql: str):
+    with _lock:
+        _plans[key] = sql
+        _plans.move_to_end(key)
+        while len(_plans) > SQL_PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+
+
+def _forget_plan(key: tuple):
+    with _lock:
+        _plans.pop(key, None)
+
+
+def clear_plans():
+    """Drops every cached SQL plan."""
+    with _lock:
+        _plans.clear()
+
+
+async def _generate_sql(query: str, db) -> str | None:
+    """Writes the SQL for a question in one LLM call, or returns None when the schema is too large to
+    include in the prompt or the model declines."""
+    schema = await asyncio.to_thread(db.get_table_info)
+    if estimate_tokens(schema) > SQL_SCHEMA_TOKEN_BUDGET:
+        return None
+    with span("sql_generate"):
+        reply = await ainvoke(get_llm("analyst"), SQL_PROMPT.format(dialect=db.dialect, schema=schema, question=query))
+    return _clean_sql(str(reply.content))
+
+
+def _open_result(sql: str, deadline: float):
+    """Runs a SELECT on a pooled connection with a server-side cursor where the driver has one.
+
+    The statement runs read-only on the database side too, so one that _clean_sql lets through but
+    writes (a data-modifying CTE, a function with side effects) fails instead.
+    """
+    connection = get_engine().connect().execution_options(stream_results=True, max_row_buffer=SQL_FETCH_SIZE)
+    try:
+        dialect = connection.dialect.name
+        if dialect == "postgresql":
+            # Must be the first statement of the transaction, which is rolled back when the connection closes
+            connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(SQL_QUERY_TIMEOUT * 1000)}")
+        elif dialect == "sqlite":
+            # Both are connection settings, so both are undone before the connection is reused
+            driver_connection = connection.connection.driver_connection
+            driver_connection.execute("PRAGMA query_only = ON")
+            # Interrupts the statement once the deadline has passed
+            driver_connection.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+        from sqlalchemy import text
+        return connection, connection.execute(text(sql))
+    except Exception:
+        _close_result(connection)
+        raise
+
+
+def _close_result(connection):
+    if connection.dialect.name == "sqlite":
+        driver_connection = connection.connection.driver_connection
+        driver_connection.set_progress_handler(None, 0)
+        driver_connection.execute("PRAGMA query_only = OFF")
+    connection.close()
+
+
+async def run_query(sql: str) -> tuple[list[str], list[dict], bool]:
+    """Runs a read-only query and returns (columns, typed rows with PII masked, whether rows were cut off).
+
+    At most SQL_ROW_LIMIT rows are fetched, in batches of SQL_FETCH_SIZE; when the request is streamed,
+    each batch is also sent as an sql_rows event as soon as it arrives.
+    """
+    deadline = time.monotonic() + SQL_QUERY_TIMEOUT
+    connection, result = await asyncio.to_thread(_open_result, sql, deadline)
+    try:
+        columns, rows, truncated = list(result.keys()), [], False
+        while True:
+            batch = await asyncio.to_thread(result.fetchmany, SQL_FETCH_SIZE)
+            if not batch:
+                break
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"The query took longer than {SQL_QUERY_TIMEOUT:.0f} seconds.")
+            if len(rows) + len(batch) > SQL_ROW_LIMIT:
+                batch, truncated = batch[:SQL_ROW_LIMIT - len(rows)], True
+            masked = mask_pii_rows(columns, [tuple(row) for row in batch])
+            rows.extend(masked)
+            if is_streaming():
+                emit("sql_rows", columns=columns, rows=masked)
+            if truncated:
+                break
+    finally:
+        await asyncio.to_thread(_close_result, connection)
+    with _lock:
+        _stats["rows_returned"] += len(rows)
+        _stats["truncated_results"] += truncated
+    return columns, rows, truncated
+
+
+async def answer_from_sql(query: str) -> list:
+    """Answers a question from a SQL database.
+
+    A question asked before against the same schema reruns its cached SQL. Otherwise, in "single"
+    mode, the SQL is written in one LLM call from the schema and run directly; the ReAct agent is
+    the fallback when the schema is too large for the prompt or the generated SQL fails.
+    """
+
+    try:
+        db = await asyncio.to_thread(get_database)
+        key = (normalize_query(query), await asyncio.to_thread(db.schema_version))
+    except Exception as e:
+        return [{"error": f"Error connecting to the database: {e}"}]
+
+    sql, cached = _lookup_plan(key), True
+    if sql is None and SQL_MODE == "single":
+        cached = False
+        try:
+            sql = await _generate_sql(query, db)
+        except Exception as e:
+            print(f"--- Could not generate SQL, using the agent: {e} ---")
+
+    if sql is not None:
+        try:
+            with span("sql_query"):
+                columns, rows, truncated = await run_query(sql)
+        except Exception as e:
+            print(f"--- Generated SQL failed ({e}), using the agent ---")
+            _forget_plan(key)
+            with _lock:
+                _stats["plans_failed"] += 1
+        else:
+            if not cached:
+                _remember_plan(key, sql)
+                with _lock:
+                    _stats["plans_generated"] += 1
+            print(f"--- Ran {'cached' if cached else 'generated'} SQL: {sql} ---")
+            emit("sql_executed", sql=sql, rows=len(rows), truncated=truncated, cached=cached)
+            # Two-column results keep the label/value shape the agent's answers have always had
+            if len(columns) == 2:
+                return [{"label": row[columns[0]], "value": row[columns[1]]} for row in rows]
+            return rows
+
+    return await _answer_with_agent(query, db)
+
+
+async def _answer_with_agent(query: str, db) -> list:
+    llm = get_llm("analyst")
+
+    try:
+        agent_executor = get_agent(db, llm)
+        # The agent makes several LLM calls, so it gets a multiple of the per-call timeout
+        with span("sql_agent"):
+            result = await asyncio.wait_for(
+                agent_executor.ainvoke({"input": query}, config={"callbacks": [usage_callback(llm)]}), LLM_TIMEOUT * 5)
+        result = mask_pii(str(result["output"]))
+        emit("sql_executed")
+        with _lock:
+            _stats["agent_answers"] += 1
     except StopIteration:
         return [{"error": "The SQL agent could not complete the query. This may be because the query is out of scope for the database."}]
     except Exception as e:
         return [{"error": f"Error executing SQL query: {e}"}]
 
-    # The result from the agent is a string. We need to parse it.
-    # This is a simple parsing logic and might need to be improved.
+    # The agent answers in text; a list of (label, value) pairs in it is returned as rows
     try:
-        # Assuming the result is a list of tuples in a string format
-        parsed_result = eval(result)
+        parsed_result = ast.literal_eval(result)
         if isinstance(parsed_result, list) and all(isinstance(item, tuple) and len(item) == 2 for item in parsed_result):
             return [{"label": item[0], "value": item[1]} for item in parsed_result]
-        else:
-            # If parsing fails, return the raw string result
-            return [{"label": "Result", "value": result}]
-    except:
-        return [{"label": "Result", "value": result}]
-
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        pass
+    return [{"label": "Result", "value": result}]
@@ -0,0 +1,76 @@
+
+import asyncio
+import pytest
+import answer_cache
+import llm_client
+
+FILES = (("sales.csv", "abc123"),)
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    answer_cache.clear_answers()
+    yield
+    answer_cache.clear_answers()
+
+def lookup(query, source="CSV", files=FILES):
+    return asyncio.run(answer_cache.lookup_answer(query, source, files))[0]
+
+def test_exact_hit_requires_same_source_and_file_versions():
+    answer_cache.store_answer("Total sales?", "CSV", FILES, {"answer": "42"})
+    assert lookup("total   sales") == {"answer": "42"}
+    assert lookup("Total sales?", source="RAG") is None
+    assert lookup("Total sales?", files=(("sales.csv", "changed"),)) is None
+
+def test_entries_expire(monkeypatch):
+    answer_cache.store_answer("Total sales?", "CSV", FILES, {"answer": "42"})
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_TTL", -1)
+    assert lookup("Total sales?") is None
+
+def test_sql_answers_expire_sooner_and_can_be_dropped(monkeypatch):
+    database = (("database", "v1"),)
+    answer_cache.store_answer("Total sales?", "SQL", database, {"answer": "42"})
+    answer_cache.store_answer("Total sales?", "CSV", FILES, {"answer": "42"})
+    answer_cache.invalidate_source("SQL")
+    assert lookup("Total sales?", source="SQL", files=database) is None
+    assert lookup("Total sales?") == {"answer": "42"}
+
+    answer_cache.store_answer("Total sales?", "SQL", database, {"answer": "42"})
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_SQL_TTL", -1)
+    assert lookup("Total sales?", source="SQL", files=database) is None
+    assert lookup("Total sales?") == {"answer": "42"}
+
+def test_size_bound_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_SIZE", 2)
+    answer_cache.store_answer("q1", "CSV", FILES, {"answer": "1"})
+    answer_cache.store_answer("q2", "CSV", FILES, {"answer": "2"})
+    lookup("q1")
+    answer_cache.store_answer("q3", "CSV", FILES, {"answer": "3"})
+    assert lookup("q2") is None
+    assert lookup("q1") == {"answer": "1"}
+
+def test_reupload_invalidates_answers_for_that_file():
+    answer_cache.store_answer("Total sales?", "CSV", FILES, {"answer": "42"})
+    answer_cache.store_answer("Policy?", "RAG", (("policy.pdf", "def"),), {"answer": "remote"})
+    answer_cache.invalidate_file("sales.csv")
+    assert lookup("Total sales?") is None
+    assert lookup("Policy?", source="RAG", files=(("policy.pdf", "def"),)) == {"answer": "remote"}
+
+class BagOfWordsEmbeddings:
+    VOCAB = ["total", "sales", "revenue", "quarter", "last", "policy"]
+
+    async def aembed_query(self, text):
+        words = text.replace("?", "").split()
+        return [float(words.count(term)) + (1.0 if term == "sales" and "revenue" in words else 0.0)
+                for term in self.VOCAB]
+
+def test_semantic_lookup_matches_near_duplicates(monkeypatch):
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_SEMANTIC", True)
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_SIMILARITY", 0.9)
+    llm_client.set_client("embeddings", BagOfWordsEmbeddings())
+    try:
+        response, embedding = asyncio.run(answer_cache.lookup_answer("total sales last quarter", "SQL", ()))
+        answer_cache.store_answer("total sales last quarter", "SQL", (), {"answer": "42"}, embedding)
+        assert lookup("last quarter total sales?", source="SQL", files=()) == {"answer": "42"}
+        assert lookup("policy", source="SQL", files=()) is None
+    finally:
+        llm_client.reset_clients()
@@ -0,0 +1,89 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from langchain_community.embeddings import DeterministicFakeEmbedding
+import answer_cache
+import llm_client
+import main
+from main import app
+
+client = TestClient(app)
+
+QUERIES = ["total sales by region", "what does the policy say", "average price in the csv", "top customers"]
+
+@pytest.fixture
+def handlers(monkeypatch):
+    calls = {"route": [], "csv": [], "rag": [], "sql": [], "load": 0}
+
+    async def mock_route_query(query, selected_files):
+        calls["route"].append(query)
+        return "RAG" if "policy" in query else "CSV" if "csv" in query else "SQL"
+
+    async def mock_answer_from_csv(query, selected_files, plotting_intent, plot_format="png"):
+        calls["csv"].append(query)
+        return {"answer": f"CSV: {query}"}
+
+    async def mock_answer_from_rag(query, selected_files, plotting_intent, plot_format="png"):
+        calls["rag"].append(query)
+        return {"answer": f"RAG: {query}"}
+
+    async def mock_answer_from_sql(query):
+        calls["sql"].append(query)
+        return [{"label": "answer", "value": query}]
+
+    def mock_load_dataframe(file_path):
+        calls["load"] += 1
+
+    monkeypatch.setattr(main, "route_query", mock_route_query)
+    monkeypatch.setattr(main, "answer_from_csv", mock_answer_from_csv)
+    monkeypatch.setattr(main, "answer_from_rag", mock_answer_from_rag)
+    monkeypatch.setattr(main, "answer_from_sql", mock_answer_from_sql)
+    monkeypatch.setattr(main, "load_dataframe", mock_load_dataframe)
+    monkeypatch.setattr(main, "sync_corpus", lambda file_paths, embeddings: None)
+    monkeypatch.setattr(main, "embed_queries", lambda queries: calls.setdefault("embedded", list(queries)))
+    monkeypatch.setattr(main, "get_embeddings", lambda: None)
+    monkeypatch.setattr(main, "get_database", lambda: None)
+    answer_cache.clear_answers()
+    return calls
+
+def test_batch_routes_once_prepares_once_and_keeps_order(handlers):
+    response = client.post("/api/ask/batch", json={"queries": QUERIES, "selected_files": ["prices.csv", "policy.pdf"]})
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["query"] for result in body["results"]] == QUERIES
+    assert [result["index"] for result in body["results"]] == [0, 1, 2, 3]
+    assert body["results"][1]["answer"] == "RAG: what does the policy say"
+    assert body["sources"] == {"SQL": 2, "RAG": 1, "CSV": 1}
+    assert handlers["route"] == QUERIES
+    assert handlers["load"] == 1
+    assert handlers["embedded"] == ["what does the policy say"]
+
+def test_batch_streams_one_json_line_per_answer(handlers):
+    response = client.post("/api/ask/batch", json={"queries": QUERIES, "stream": True})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == [0, 1, 2, 3]
+    assert all(line["seconds"] >= 0 for line in lines)
+
+def test_empty_and_oversized_batches_are_rejected(handlers, monkeypatch):
+    assert client.post("/api/ask/batch", json={"queries": []}).status_code == 400
+    monkeypatch.setattr(main, "BATCH_MAX_QUERIES", 2)
+    assert client.post("/api/ask/batch", json={"queries": QUERIES}).status_code == 400
+
+def test_query_embeddings_are_batched_and_reused():
+    class CountingEmbeddings(DeterministicFakeEmbedding):
+        def embed_documents(self, texts):
+            calls.append(list(texts))
+            return super().embed_documents(texts)
+
+    calls = []
+    embeddings = CountingEmbeddings(size=8)
+    llm_client.set_client("embeddings", embeddings)
+    try:
+        vectors = llm_client.embed_queries(["a", "b", "a"])
+        assert calls == [["a", "b"]]
+        assert vectors[0] == vectors[2] == embeddings.embed_query("a")
+        llm_client.embed_queries(["b", "a"])
+        assert len(calls) == 1
+    finally:
+        llm_client.reset_clients()
@@ -0,0 +1,81 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pytest
+import batch_forecast
+import forecasting
+
+def long_frame(skus=3, days=60):
+    dates = pd.date_range("2024-01-01", periods=days)
+    return pd.DataFrame([{"ds": d.strftime("%Y-%m-%d"), "sku": f"SKU-{s}", "y": 10 * (s + 1) + (d.dayofweek == 5) * 5}
+                         for s in range(skus) for d in dates])
+
+@pytest.fixture
+def thread_pool(tmp_path, monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(forecasting, "_get_pool", lambda: pool)
+    monkeypatch.setattr(batch_forecast, "PLOT_DIR", str(tmp_path))
+    monkeypatch.setattr(batch_forecast, "_results", batch_forecast.OrderedDict())
+    yield tmp_path
+    pool.shutdown()
+
+@pytest.mark.parametrize("frame, query, expected", [
+    (pd.DataFrame({"ds": ["2024-01-01"] * 2, "region": ["a", "b"], "sku": ["x", "y"], "y": [1, 2]}),
+     "forecast each sku", (True, "sku")),
+    (pd.DataFrame({"ds": ["2024-01-01", "2024-01-02"], "y": [1, 2]}), "forecast", (False, None)),
+    (pd.DataFrame({"ds": ["2024-01-01"], "north": [1], "south": [2]}), "forecast each region", (True, None)),
+    (pd.DataFrame({"ds": ["2024-01-01"], "north": [1], "south": [2]}), "forecast north and south", (True, None)),
+    (long_frame(), "forecast", (True, "sku")),
+    (pd.DataFrame({"date": ["2024-01-01"], "y": [1], "sku": ["x"]}), "forecast", (False, None)),
+])
+def test_find_batch_layout(frame, query, expected):
+    assert batch_forecast.find_batch_layout(frame, query) == expected
+
+def test_single_series_with_a_label_or_covariate_is_not_split():
+    dates = pd.date_range("2024-01-01", periods=28)
+    weekday = pd.DataFrame({"ds": dates, "y": range(28), "weekday": dates.day_name()})
+    promo = pd.DataFrame({"ds": dates, "y": range(28), "promo": ["yes", "no"] * 14})
+    covariate = pd.DataFrame({"ds": dates, "sales": range(28), "temperature": np.linspace(5, 20, 28)})
+    for frame in (weekday, promo, covariate):
+        assert batch_forecast.find_batch_layout(frame, "forecast sales for the next month") == (False, None)
+    # Named or asked for, the split is still available
+    assert batch_forecast.find_batch_layout(promo, "forecast sales by promo") == (True, "promo")
+    assert batch_forecast.find_batch_layout(weekday, "forecast each weekday separately") == (True, "weekday")
+
+def test_split_series_long_and_wide():
+    wide = batch_forecast.split_series(long_frame(), "sku")
+    assert list(wide.columns) == ["SKU-0", "SKU-1", "SKU-2"] and len(wide) == 60
+    frame = pd.DataFrame({"ds": ["2024-01-02", "2024-01-01"], " north": [1.0, 2.0], "south": [3.0, 4.0]})
+    wide = batch_forecast.split_series(frame)
+    assert list(wide.columns) == ["north", "south"]
+    assert wide["north"].tolist() == [2.0, 1.0]
+
+def test_baselines_follow_weekly_pattern():
+    t = np.arange(70)
+    Y = np.column_stack([100 + (t % 7 == 5) * 20.0, 50 + 0.5 * t])
+    naive = batch_forecast.seasonal_naive(Y, 14, 7)
+    assert naive[:, 0].tolist() == Y[-7:, 0].tolist() * 2
+    ets = batch_forecast.holt_winters(Y, 14, 7)
+    assert ets.shape == (14, 2)
+    # The weekly spike and the upward trend are carried into the forecast
+    assert ets[(70 + np.arange(14)) % 7 == 5, 0].min() > ets[(70 + np.arange(14)) % 7 != 5, 0].max()
+    assert ets[-1, 1] > Y[-1, 1]
+
+def test_batch_forecast_returns_combined_table_and_plot(thread_pool):
+    result = asyncio.run(batch_forecast.batch_forecast(long_frame(), "skus.csv", "sku", "ets", horizon=14))
+    assert result["series"] == 3 and "series/s" in result["answer"]
+    table = pd.read_csv(thread_pool / os.path.basename(result["table_path"]))
+    assert list(table.columns) == ["series", "ds", "yhat"]
+    assert len(table) == 3 * 14
+    assert os.path.exists(thread_pool / os.path.basename(result["image_path"]))
+
+    # Repeating the request is served from the cache
+    again = asyncio.run(batch_forecast.batch_forecast(long_frame(), "skus.csv", "sku", "ets", horizon=14))
+    assert again == result
+
+def test_unknown_model_and_bad_frames_are_errors(thread_pool):
+    assert "error" in asyncio.run(batch_forecast.batch_forecast(long_frame(), "skus.csv", "sku", "arima"))
+    one_day = pd.DataFrame({"ds": ["2024-01-01"], "north": [1.0], "south": [2.0]})
+    assert "error" in asyncio.run(batch_forecast.batch_forecast(one_day, "wide.csv", None, "naive", plot=False))
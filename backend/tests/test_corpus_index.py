@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_core.documents import Document
+import corpus_index
+import index_cache
+import ingest
+
+def document(name, n, d=16, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, d)).astype("float32")
+    return vectors, [Document(page_content=f"{name} chunk {i}", metadata={"source": name}) for i in range(n)]
+
+def sources(results):
+    return {doc.metadata["source"] for doc, _ in results}
+
+@pytest.mark.parametrize("index_type", corpus_index.INDEX_TYPES)
+def test_documents_are_added_replaced_removed_and_filtered(index_type):
+    corpus = corpus_index.CorpusIndex(index_type)
+    a, b = document("a.pdf", 50, seed=1), document("b.pdf", 50, seed=2)
+    assert corpus.add_document("a.pdf", "v1", *a)
+    assert corpus.add_document("b.pdf", "v1", *b)
+    assert not corpus.add_document("a.pdf", "v1", *a)
+
+    # The nearest chunk to one of b's vectors is that chunk, with or without a filter
+    results = corpus.search(b[0][7], k=3)
+    assert results[0][0].page_content == "b.pdf chunk 7"
+    assert sources(corpus.search(b[0][7], k=5, files=["a.pdf"])) == {"a.pdf"}
+    assert corpus.search(b[0][7], k=3, files=["missing.pdf"]) == []
+
+    new_a = document("a.pdf", 10, seed=3)
+    corpus.add_document("a.pdf", "v2", *new_a)
+    assert corpus.search(new_a[0][4], k=1)[0][0].page_content == "a.pdf chunk 4"
+    assert corpus.get_stats()["chunks"] == 60
+
+    corpus.remove_document("b.pdf")
+    assert sources(corpus.search(b[0][7], k=5)) == {"a.pdf"}
+    # Removing most of the index compacts it
+    assert corpus.index.ntotal == 10 and corpus.get_stats()["rebuilds"] >= 1
+
+def test_document_without_text_can_be_removed():
+    # e.g. a scanned PDF: no chunks, so no vector index has been built yet
+    corpus = corpus_index.CorpusIndex("flat")
+    assert corpus.add_document("scan.pdf", "v1", np.empty((0, 16), dtype="float32"), [])
+    assert corpus.index is None
+    assert corpus.remove_document("scan.pdf")
+    assert corpus.document_names() == [] and corpus.search(np.zeros(16), k=3) == []
+
+def test_ivf_is_trained_once_the_corpus_is_large_enough(monkeypatch):
+    monkeypatch.setattr(corpus_index, "CORPUS_IVF_MIN_TRAIN", 300)
+    corpus = corpus_index.CorpusIndex("ivf")
+    corpus.add_document("a.pdf", "v1", *document("a.pdf", 200, seed=1))
+    assert corpus.built_as == "flat"
+    b = document("b.pdf", 200, seed=2)
+    corpus.add_document("b.pdf", "v1", *b)
+    assert corpus.built_as == "ivf"
+    assert corpus.search(b[0][3], k=1)[0][0].page_content == "b.pdf chunk 3"
+    assert sources(corpus.search(b[0][3], k=4, files=["a.pdf"])) == {"a.pdf"}
+
+def test_corpus_survives_save_and_load(tmp_path):
+    corpus = corpus_index.CorpusIndex("hnsw")
+    a = document("a.pdf", 30)
+    corpus.add_document("a.pdf", "v1", *a)
+    corpus.save(str(tmp_path / "hnsw"))
+    corpus.save(str(tmp_path / "hnsw"))
+    loaded = corpus_index.CorpusIndex.load(str(tmp_path / "hnsw"))
+    assert loaded.version("a.pdf") == "v1" and not loaded.dirty
+    assert loaded.search(a[0][5], k=1)[0][0].page_content == "a.pdf chunk 5"
+
+def test_sync_adds_each_document_once_and_follows_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_cache, "INDEX_CACHE_DIR", str(tmp_path / "index_cache"))
+    monkeypatch.setattr(index_cache, "_loaded", index_cache.OrderedDict())
+    monkeypatch.setattr(corpus_index, "_corpus", corpus_index.CorpusIndex("flat"))
+    texts = {"a.txt": "Revenue grew 12 percent.", "b.txt": "Headcount stayed flat."}
+    for name, text in texts.items():
+        (tmp_path / name).write_text(text)
+    monkeypatch.setattr(ingest, "_iter_prepared_text", lambda path: [texts[path.rsplit("/", 1)[-1]]])
+    loads = []
+    monkeypatch.setattr(ingest, "_prepare_texts", lambda paths: loads.extend(paths))
+    embeddings = DeterministicFakeEmbedding(size=16)
+    paths = [str(tmp_path / name) for name in texts]
+
+    corpus = ingest.sync_corpus(paths, embeddings)
+    assert corpus.get_stats()["documents"] == 2 and len(loads) == 2
+    ingest.sync_corpus(paths, embeddings)
+    assert corpus.get_stats()["added"] == 2
+
+    texts["a.txt"] = "Revenue fell 3 percent."
+    (tmp_path / "a.txt").write_text(texts["a.txt"])
+    ingest.sync_corpus(paths, embeddings)
+    results = corpus.search(embeddings.embed_query("Revenue fell 3 percent."), k=1, files=["a.txt"])
+    assert results[0][0].page_content == "Revenue fell 3 percent."
+    assert corpus.get_stats()["replaced"] == 1
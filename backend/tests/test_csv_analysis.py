@@ -0,0 +1,94 @@
+import asyncio
+import pandas as pd
+import pytest
+from langchain_core.messages import AIMessage
+import csv_analysis
+import csv_handler
+import llm_client
+
+@pytest.fixture
+def sales():
+    return pd.DataFrame({
+        "region": ["north", "south", "north", "east", "south", "north"],
+        "product": ["a", "b", "a", "c", "a", "b"],
+        "units": [10, 5, 7, 3, 8, 2],
+        "price": [2.0, 4.0, 2.0, 9.5, 2.0, 4.0],
+    })
+
+def test_profile_describes_columns(sales):
+    profile = csv_analysis.profile_dataframe(sales)
+    assert profile["rows"] == 6
+    units = next(column for column in profile["columns"] if column["name"] == "units")
+    assert units["sum"] == 35 and units["max"] == 10
+    region = next(column for column in profile["columns"] if column["name"] == "region")
+    assert region["unique"] == 3 and region["top_values"]["north"] == 3
+
+def test_parse_plan_handles_fences_and_garbage():
+    reply = '```json\n{"operations": [{"type": "describe"}, "bogus"]}\n```'
+    assert csv_analysis.parse_plan(reply) == [{"type": "describe"}]
+    assert csv_analysis.parse_plan("I cannot help with that") == []
+
+def test_grouped_aggregate_with_filter(sales):
+    result = csv_analysis.run_operation(sales, {
+        "type": "aggregate", "group_by": ["region"], "metrics": {"units": ["sum", "count"]},
+        "filters": [{"column": "price", "op": "<", "value": 5}], "sort_by": "units_sum",
+    })
+    assert result.to_dict("records") == [
+        {"region": "north", "units_sum": 19, "units_count": 3},
+        {"region": "south", "units_sum": 13, "units_count": 2},
+    ]
+
+def test_single_aggregation_may_be_a_string(sales):
+    grouped = csv_analysis.run_operation(sales, {"type": "aggregate", "group_by": ["region"], "metrics": {"units": "sum"}})
+    assert list(grouped.columns) == ["region", "units_sum"]
+    total = csv_analysis.run_operation(sales, {"type": "aggregate", "metrics": {"units": "sum"}})
+    assert list(total.columns) == ["units_sum"]
+
+def test_invalid_operations_are_reported_not_raised(sales):
+    results = csv_analysis.run_operations(sales, [
+        {"type": "aggregate", "metrics": {"missing": ["sum"]}},
+        {"type": "aggregate", "metrics": {"units": ["__import__"]}},
+        {"type": "value_counts", "column": "product", "limit": 1},
+    ])
+    assert results[0][1].startswith("Error: Unknown column")
+    assert results[1][1].startswith("Error: Unsupported aggregation")
+    assert results[2][1].to_dict("records") == [{"product": "a", "count": 3}]
+
+def test_render_respects_budget():
+    table = pd.DataFrame({"value": range(10_000)})
+    text = csv_analysis.render_table(table, 200)
+    assert csv_analysis.estimate_tokens(text) <= 220
+    assert "more rows omitted" in text
+    assert csv_analysis.render_if_fits(table, 200) is None
+    assert csv_analysis.render_if_fits(table.head(5), 200) == table.head(5).to_csv(index=False)
+
+class ScriptedLLM:
+    model = "stub-analyst"
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.prompts = []
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        return AIMessage(content=self.replies.pop(0))
+
+def test_large_csv_is_answered_from_computed_results(monkeypatch):
+    rows = 50_000
+    df = pd.DataFrame({"region": ["north", "south"] * (rows // 2), "units": range(rows)})
+    monkeypatch.setattr(csv_handler, "load_dataframe", lambda file_path: df)
+    monkeypatch.setattr(csv_handler, "file_content_hash", lambda file_path: "big-v1")
+    monkeypatch.setattr(csv_handler, "CSV_TOKEN_BUDGET", 2000)
+
+    plan = '{"operations": [{"type": "aggregate", "group_by": ["region"], "metrics": {"units": ["sum"]}}]}'
+    llm = ScriptedLLM([plan, "North sold more."])
+    llm_client.set_client("analyst", llm)
+    try:
+        result = asyncio.run(csv_handler.answer_from_csv("Which region sold more?", ["big.csv"]))
+    finally:
+        llm_client.reset_clients()
+
+    assert result == {"answer": "North sold more."}
+    answer_prompt = llm.prompts[1]
+    assert "north,624975000" in answer_prompt
+    assert csv_analysis.estimate_tokens(answer_prompt) < 2000
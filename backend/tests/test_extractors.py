@@ -0,0 +1,33 @@
+
+import openpyxl
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+import extractors
+
+def test_iter_chunks_matches_full_split_coverage():
+    words = [f"word{i} " for i in range(20000)]
+    chunks = list(extractors.iter_chunks(words, chunk_size=200, chunk_overlap=40))
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    # Every word survives the windowed split, in order of first appearance
+    first_seen = list(dict.fromkeys(word for chunk in chunks for word in chunk.split()))
+    assert first_seen == [word.strip() for word in words]
+
+def test_small_input_is_split_like_the_plain_splitter():
+    text = "Revenue grew. " * 30
+    splitter = RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=20)
+    assert list(extractors.iter_chunks([text], 100, 20)) == splitter.split_text(text)
+
+def test_xlsx_rows_are_streamed(tmp_path):
+    path = tmp_path / "book.xlsx"
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Quarter", "Revenue"])
+    sheet.append(["Q1", 100])
+    sheet.append([None, None])
+    workbook.save(path)
+    assert list(extractors.iter_text(str(path))) == ["Quarter Revenue \n", "Q1 100 \n", "\n"]
+
+def test_unsupported_files_yield_nothing(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("hello")
+    assert list(extractors.iter_text(str(path))) == []
+    assert list(extractors.iter_files_text([str(path)])) == []
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+import pytest
+import forecasting
+
+@pytest.fixture
+def stub_pool(tmp_path, monkeypatch):
+    """Runs jobs on a thread with a stub model so the tests do not fit Prophet."""
+    calls = []
+    release = threading.Event()
+    release.set()
+
+    def task(df, file_name, horizon, plot_format):
+        calls.append((file_name, horizon))
+        release.wait(5)
+        if "ds" not in df.columns:
+            return {"error": "Failed to format data for forecasting: 'ds'"}
+        # Workers return the rendered image and the parent stores it
+        return {"answer": f"Forecast for {len(df)} rows", "plot": (f"{file_name}-{horizon}".encode(), f".{plot_format}")}
+
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(forecasting, "PLOT_DIR", str(tmp_path))
+    monkeypatch.setattr(forecasting, "_get_pool", lambda: pool)
+    monkeypatch.setattr(forecasting, "_forecast_task", task)
+    for name in ("_jobs", "_futures", "_inflight"):
+        monkeypatch.setattr(forecasting, name, {})
+    monkeypatch.setattr(forecasting, "_results", forecasting.OrderedDict())
+    yield calls, release
+    pool.shutdown()
+
+def series(values):
+    return pd.DataFrame({"ds": pd.date_range("2024-01-01", periods=len(values)), "y": values})
+
+def test_job_lifecycle_and_cache(stub_pool):
+    calls, _ = stub_pool
+    result = asyncio.run(forecasting.forecast(series([1, 2, 3]), "sales.csv"))
+    assert result["answer"] == "Forecast for 3 rows" and "plot" not in result
+    assert forecasting.has_plot(result["image_path"], forecasting.PLOT_DIR)
+
+    job_id = forecasting.submit_forecast(series([1, 2, 3]), "sales.csv")
+    job = forecasting.get_forecast_job(job_id)
+    assert job["status"] == "done" and job["cached"] and job["result"] == result
+    assert len(calls) == 1
+
+    # A different horizon or series is a different forecast
+    asyncio.run(forecasting.forecast(series([1, 2, 3]), "sales.csv", horizon=30))
+    asyncio.run(forecasting.forecast(series([1, 2, 4]), "sales.csv"))
+    assert len(calls) == 3
+
+def test_concurrent_submissions_share_one_fit(stub_pool):
+    calls, release = stub_pool
+    release.clear()
+    first = forecasting.submit_forecast(series([5, 6, 7]), "sales.csv")
+    second = forecasting.submit_forecast(series([5, 6, 7]), "sales.csv")
+    assert first == second
+    assert forecasting.get_forecast_job(first)["status"] in ("queued", "running")
+    release.set()
+    assert "answer" in asyncio.run(forecasting.wait_for_forecast(first))
+    assert len(calls) == 1
+
+def test_failed_forecasts_are_reported_and_not_cached(stub_pool):
+    calls, _ = stub_pool
+    bad = pd.DataFrame({"date": ["2024-01-01"], "y": [1]})
+    assert asyncio.run(forecasting.forecast(bad, "bad.csv"))["error"].startswith("Failed to format")
+    job_id = forecasting.submit_forecast(bad, "bad.csv")
+    asyncio.run(forecasting.wait_for_forecast(job_id))
+    assert forecasting.get_forecast_job(job_id)["status"] == "failed"
+    assert len(calls) == 2
+
+def test_cache_entry_is_dropped_when_plot_is_deleted(stub_pool, tmp_path):
+    calls, _ = stub_pool
+    result = asyncio.run(forecasting.forecast(series([1, 2]), "sales.csv"))
+    os.remove(tmp_path / os.path.basename(result["image_path"]))
+    asyncio.run(forecasting.forecast(series([1, 2]), "sales.csv"))
+    assert len(calls) == 2
+
+def test_broken_pool_is_shut_down_and_replaced(stub_pool, monkeypatch):
+    class BrokenPool:
+        def __init__(self):
+            self.shutdowns = []
+
+        def submit(self, fn, *args):
+            future = Future()
+            future.set_exception(BrokenProcessPool("A worker was killed"))
+            return future
+
+        def shutdown(self, **kwargs):
+            self.shutdowns.append(kwargs)
+
+    broken = BrokenPool()
+    monkeypatch.setattr(forecasting, "_pool", broken)
+    monkeypatch.setattr(forecasting, "_get_pool", lambda: broken)
+    job_id = forecasting.submit_forecast(series([1, 2]), "sales.csv")
+    assert forecasting.get_forecast_job(job_id)["error"].startswith("Forecast worker crashed")
+    assert forecasting._pool is None
+    assert broken.shutdowns == [{"wait": False, "cancel_futures": True}]
+
+    # A pool whose workers died while idle refuses the submission; the job runs on a fresh pool
+    class IdleBrokenPool(BrokenPool):
+        def submit(self, fn, *args):
+            raise BrokenProcessPool("A worker was killed")
+
+    idle, fresh = IdleBrokenPool(), ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(forecasting, "_pool", idle)
+    monkeypatch.setattr(forecasting, "_get_pool", lambda: forecasting._pool or fresh)
+    assert "answer" in asyncio.run(forecasting.forecast(series([1, 2]), "sales.csv"))
+    assert idle.shutdowns == [{"wait": False, "cancel_futures": True}]
+    fresh.shutdown()
@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+import frame_cache
+import ingest
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    frame_cache.clear_frames()
+    yield
+    frame_cache.clear_frames()
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "ARTIFACTS_DIR", str(tmp_path / "artifacts"))
+    monkeypatch.setattr(frame_cache, "ROW_GROUP_SIZE", 100)
+    path = tmp_path / "sales.csv"
+    rows = ["region,units,price"] + [f"{'north' if i % 2 else 'south'},{i},{i * 0.5}" for i in range(1000)]
+    path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+    return str(path)
+
+def test_second_load_is_a_memory_hit(csv_path, monkeypatch):
+    df = ingest.load_dataframe(csv_path)
+    assert len(df) == 1000
+
+    def fail(*args, **kwargs):
+        raise AssertionError("artifact was read again")
+    monkeypatch.setattr(ingest, "read_csv_file", fail)
+    monkeypatch.setattr(ingest, "read_columnar", fail)
+    assert ingest.load_dataframe(csv_path)["units"].sum() == df["units"].sum()
+    assert frame_cache.get_frame_cache_stats()["memory_hits"] == 1
+
+def test_callers_cannot_corrupt_the_cached_frame(csv_path):
+    df = ingest.load_dataframe(csv_path)
+    df["units"] = 0
+    df.columns = ["a", "b", "c"]
+    again = ingest.load_dataframe(csv_path)
+    assert list(again.columns) == ["region", "units", "price"]
+    assert again["units"].sum() == sum(range(1000))
+
+def test_warm_load_reads_the_columnar_artifact(csv_path, monkeypatch):
+    ingest.load_dataframe(csv_path)
+    frame_cache.clear_frames()
+    monkeypatch.setattr(ingest, "read_csv_file", lambda *args: pytest.fail("CSV was parsed again"))
+    df = ingest.load_dataframe(csv_path)
+    assert df.loc[999, "price"] == 499.5
+
+def test_projection_and_filters_are_pushed_down(csv_path):
+    df = ingest.load_dataframe(csv_path, columns=["units"], filters=[("units", ">=", 950), ("units", "<", 960)])
+    assert list(df.columns) == ["units"]
+    assert df["units"].tolist() == list(range(950, 960))
+    # Subsets are not cached as if they were the whole file
+    assert frame_cache.get_frame_cache_stats()["frames"] == 0
+
+def test_memory_budget_evicts_least_recently_used(monkeypatch):
+    frame = pd.DataFrame({"x": range(1000)})
+    monkeypatch.setattr(frame_cache, "FRAME_CACHE_MAX_BYTES", int(frame_cache.frame_nbytes(frame) * 2.5))
+    for key in ("a", "b", "c"):
+        frame_cache.remember_frame(key, frame)
+    stats = frame_cache.get_frame_cache_stats()
+    assert stats["frames"] == 2 and stats["evictions"] == 1
+    assert frame_cache.get_frame("a") is None
+    assert frame_cache.get_frame("c") is not None
@@ -0,0 +1,41 @@
+
+import pytest
+from langchain_community.embeddings import DeterministicFakeEmbedding
+import index_cache
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_cache, "INDEX_CACHE_DIR", str(tmp_path / "index_cache"))
+    monkeypatch.setattr(index_cache, "_loaded", index_cache.OrderedDict())
+    return tmp_path
+
+def test_index_is_built_once_and_reused(cache_dir):
+    doc = cache_dir / "report.txt"
+    doc.write_text("placeholder")
+    embeddings = DeterministicFakeEmbedding(size=16)
+    calls = []
+
+    def iter_segments(path):
+        calls.append(path)
+        return ["Revenue grew 12 percent. "] * 200
+
+    first = index_cache.get_file_index(str(doc), embeddings, iter_segments)
+    second = index_cache.get_file_index(str(doc), embeddings, iter_segments)
+    assert len(calls) == 1
+    assert second is first
+
+    # A fresh process only has the on-disk copy
+    index_cache._loaded.clear()
+    reloaded = index_cache.get_file_index(str(doc), embeddings, iter_segments)
+    assert len(calls) == 1
+    assert reloaded.index.ntotal == first.index.ntotal
+
+def test_changed_content_misses_the_cache(cache_dir):
+    doc = cache_dir / "report.txt"
+    doc.write_text("version one")
+    embeddings = DeterministicFakeEmbedding(size=16)
+    index_cache.get_file_index(str(doc), embeddings, lambda path: ["first version text"])
+    doc.write_text("version two, now longer")
+    misses = index_cache.get_index_cache_stats()["misses"]
+    index_cache.get_file_index(str(doc), embeddings, lambda path: ["second version text"])
+    assert index_cache.get_index_cache_stats()["misses"] == misses + 1
@@ -0,0 +1,62 @@
+
+import pytest
+import ingest
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    monkeypatch.setattr(ingest, "DATA_DIR", str(data_dir))
+    monkeypatch.setattr(ingest, "ARTIFACTS_DIR", str(tmp_path / "artifacts"))
+    return data_dir
+
+def test_ingest_csv_prepares_dataframe(dirs, monkeypatch):
+    (dirs / "sales.csv").write_text("ds,y\n2024-01-01,10\n2024-01-02,12\n", encoding="utf-8")
+    ingest.mark_queued("sales.csv")
+    assert ingest.get_ingestion_status("sales.csv")["status"] == "queued"
+
+    ingest.ingest_file("sales.csv")
+    status = ingest.get_ingestion_status("sales.csv")
+    assert status["status"] == "done"
+    assert status["progress"] == 1.0
+
+    # Questions read the prepared artifact instead of parsing the CSV again
+    def fail(*args, **kwargs):
+        raise AssertionError("CSV was parsed again")
+    monkeypatch.setattr(ingest, "read_csv_file", fail)
+    df = ingest.load_dataframe(str(dirs / "sales.csv"))
+    assert list(df.columns) == ["ds", "y"]
+    assert len(df) == 2
+
+def test_ingest_failure_is_reported(dirs):
+    ingest.ingest_file("missing.csv")
+    status = ingest.get_ingestion_status("missing.csv")
+    assert status["status"] == "failed"
+    assert status["error"]
+
+def test_unknown_file_has_no_status():
+    assert ingest.get_ingestion_status("never-uploaded.pdf") is None
+
+def test_failed_extraction_leaves_no_partial_artifacts(dirs, monkeypatch):
+    for name in ("a.pdf", "b.pdf"):
+        (dirs / name).write_bytes(b"%PDF")
+
+    def extract(file_paths, progress=None):
+        yield file_paths[0], "first page"
+        raise ValueError("corrupt page")
+    monkeypatch.setattr(ingest, "iter_files_text", extract)
+    with pytest.raises(ValueError):
+        ingest._prepare_texts([str(dirs / "a.pdf"), str(dirs / "b.pdf")])
+    assert not list((dirs.parent / "artifacts").iterdir())
+
+    # A writer that cannot be opened closes and removes the ones opened before it
+    opened = []
+    def open_second_fails(path, *args, **kwargs):
+        if opened:
+            raise OSError("no space left on device")
+        opened.append(open(path, *args, **kwargs))
+        return opened[-1]
+    monkeypatch.setattr(ingest, "open", open_second_fails, raising=False)
+    with pytest.raises(OSError):
+        ingest._prepare_texts([str(dirs / "a.pdf"), str(dirs / "b.pdf")])
+    assert opened[0].closed and not list((dirs.parent / "artifacts").iterdir())
@@ -0,0 +1,58 @@
+
+import asyncio
+import pytest
+from langchain_core.messages import AIMessage
+import llm_client
+
+class SlowModel:
+    model = "slow-model"
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+
+    async def ainvoke(self, prompt):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        return AIMessage(content=f" {prompt} ")
+
+def test_concurrency_is_bounded_per_model(monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_CONCURRENCY", 3)
+    llm = SlowModel(0.01)
+
+    async def run():
+        return await asyncio.gather(*(llm_client.ainvoke(llm, str(i)) for i in range(10)))
+
+    responses = asyncio.run(run())
+    assert [r.content.strip() for r in responses] == [str(i) for i in range(10)]
+    assert llm.peak == 3
+
+def test_slow_calls_time_out(monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_TIMEOUT", 0.01)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(llm_client.ainvoke(SlowModel(1), "hello"))
+
+def test_clients_are_created_once_per_role(monkeypatch):
+    created = []
+    monkeypatch.setattr(llm_client, "_create_client", lambda role: created.append(role) or SlowModel(0))
+    llm_client.reset_clients()
+    try:
+        first = llm_client.get_llm("router")
+        assert llm_client.get_llm("router") is first
+        assert llm_client.get_llm("analyst") is not first
+        assert created == ["router", "analyst"]
+        stats = llm_client.get_client_stats()
+        assert stats["by_role"]["router"]["reused"] >= 1
+    finally:
+        llm_client.reset_clients()
+
+def test_clients_can_be_replaced_with_stubs():
+    stub = SlowModel(0)
+    llm_client.set_client("extractor", stub)
+    try:
+        assert llm_client.get_llm("extractor") is stub
+    finally:
+        llm_client.reset_clients()
@@ -2,9 +2,16 @@
 import pytest
 from fastapi.testclient import TestClient
 from main import app
+import answer_cache
 
 client = TestClient(app)
 
+@pytest.fixture(autouse=True)
+def empty_answer_cache():
+    answer_cache.clear_answers()
+    yield
+    answer_cache.clear_answers()
+
 def test_read_root():
     response = client.get("/")
     assert response.status_code == 200
@@ -18,16 +25,16 @@ def test_read_root():
 ])
 def test_ask(monkeypatch, query, source, mock_answer):
     # Mock the router and handlers
-    def mock_route_query(query):
+    async def mock_route_query(query, selected_files):
         return source
 
-    def mock_answer_from_csv(query):
-        return mock_answer
+    async def mock_answer_from_csv(query, selected_files, plotting_intent, plot_format="png"):
+        return {"answer": mock_answer}
 
-    def mock_answer_from_rag(query):
-        return mock_answer
+    async def mock_answer_from_rag(query, selected_files, plotting_intent, plot_format="png"):
+        return {"answer": mock_answer}
 
-    def mock_answer_from_sql(query):
+    async def mock_answer_from_sql(query):
         return mock_answer
 
     monkeypatch.setattr("main.route_query", mock_route_query)
@@ -44,3 +51,35 @@ def test_ask(monkeypatch, query, source, mock_answer):
     else:
         assert json_response["query"] == query
 
+
+def test_repeated_question_is_served_from_cache(monkeypatch):
+    calls = []
+
+    async def mock_route_query(query, selected_files):
+        return "SQL"
+
+    async def mock_answer_from_sql(query):
+        calls.append(query)
+        return [{"label": "Total", "value": 42}]
+
+    version = [("database", "v1")]
+    monkeypatch.setattr("main.route_query", mock_route_query)
+    monkeypatch.setattr("main.answer_from_sql", mock_answer_from_sql)
+    monkeypatch.setattr("main.get_database_version", lambda: tuple(version))
+
+    hits = client.get("/api/cache/stats").json()["answers"]["hits"]
+    first = client.post("/api/ask", json={"query": "Total sales last quarter?"}).json()
+    second = client.post("/api/ask", json={"query": "  total sales LAST quarter "}).json()
+    assert calls == ["Total sales last quarter?"]
+    assert second["answer"] == first["answer"]
+    assert second["query"] == "  total sales LAST quarter "
+
+    assert client.get("/api/cache/stats").json()["answers"]["hits"] == hits + 1
+
+    # SQL answers follow the database schema, and refreshing it drops them
+    version[0] = ("database", "v2")
+    client.post("/api/ask", json={"query": "Total sales last quarter?"})
+    assert len(calls) == 2
+    client.post("/api/sql/schema/refresh")
+    client.post("/api/ask", json={"query": "Total sales last quarter?"})
+    assert len(calls) == 3
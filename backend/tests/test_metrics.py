@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_core.messages import AIMessage
+import answer_cache
+import llm_client
+import metrics
+from main import app
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset_metrics()
+    answer_cache.clear_answers()
+    yield
+    metrics.reset_metrics()
+
+class EchoModel:
+    model = "echo-model"
+
+    async def ainvoke(self, prompt):
+        return AIMessage(content="ok")
+
+def test_histogram_is_rendered_in_prometheus_format():
+    metrics.observe("logos_stage_seconds", 0.2, source="CSV", stage="compute")
+    metrics.observe("logos_stage_seconds", 3.0, source="CSV", stage="compute")
+    text = metrics.render_metrics({"answers": (3, 1)})
+    assert "# TYPE logos_stage_seconds histogram" in text
+    assert 'logos_stage_seconds_bucket{source="CSV",stage="compute",le="0.25"} 1' in text
+    assert 'logos_stage_seconds_bucket{source="CSV",stage="compute",le="+Inf"} 2' in text
+    assert 'logos_stage_seconds_count{source="CSV",stage="compute"} 2' in text
+    assert 'logos_cache_hit_ratio{cache="answers"} 0.75' in text
+
+def test_spans_take_the_current_source_and_llm_calls_are_counted():
+    async def run():
+        metrics.set_source("RAG")
+        with metrics.span("retrieve"):
+            await llm_client.ainvoke(EchoModel(), "x" * 400)
+
+    asyncio.run(run())
+    text = metrics.render_metrics()
+    assert 'logos_stage_seconds_count{source="RAG",stage="retrieve"} 1' in text
+    assert 'logos_llm_prompt_chars_total{kind="chat",model="echo-model"} 400' in text
+    assert 'logos_llm_prompt_tokens_total{kind="chat",model="echo-model"} 100' in text
+    assert 'logos_llm_calls_total{kind="chat",model="echo-model"} 1' in text
+
+def test_embedding_calls_are_counted(monkeypatch):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    monkeypatch.setattr(llm_client, "get_embeddings", lambda: embeddings)
+    monkeypatch.setattr(llm_client, "_query_vectors", llm_client.OrderedDict())
+    llm_client.embed_queries(["x" * 40, "y" * 40])
+    # Cached query vectors are not embedded again
+    llm_client.embed_queries(["x" * 40])
+    text = metrics.render_metrics()
+    assert 'logos_llm_calls_total{kind="embedding",model="DeterministicFakeEmbedding"} 1' in text
+    assert 'logos_llm_prompt_tokens_total{kind="embedding",model="DeterministicFakeEmbedding"} 20' in text
+
+def test_metrics_endpoint_reports_requests_by_source(monkeypatch):
+    async def mock_route_query(query, selected_files):
+        return "CSV"
+
+    async def mock_answer_from_csv(query, selected_files, plotting_intent, plot_format="png"):
+        return {"answer": "CSV answer"}
+
+    monkeypatch.setattr("main.route_query", mock_route_query)
+    monkeypatch.setattr("main.answer_from_csv", mock_answer_from_csv)
+    assert client.post("/api/ask", json={"query": "what are the sales"}).status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+    assert 'logos_request_seconds_count{source="CSV"} 1' in response.text
+    assert 'logos_stage_seconds_count{source="none",stage="route"} 1' in response.text
+    assert 'logos_requests_in_flight{endpoint="ask"} 0' in response.text
+    assert 'logos_cache_hit_ratio{cache="answers"}' in response.text
+
+def test_sampled_requests_are_profiled(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(metrics, "PROFILE_DIR", str(tmp_path))
+    with metrics.maybe_profile("ask"):
+        sum(range(1000))
+    assert len(list(tmp_path.glob("*-ask-*.prof"))) == 1
+    assert "logos_profiles_total 1" in metrics.render_metrics()
@@ -0,0 +1,76 @@
+import os
+import time
+import pytest
+from fastapi.testclient import TestClient
+import plot_store
+from main import app
+
+client = TestClient(app)
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(plot_store, "PLOT_DIR", str(tmp_path))
+    monkeypatch.setattr(plot_store, "_memory", plot_store.OrderedDict())
+    monkeypatch.setattr(plot_store, "_stats", dict.fromkeys(plot_store._stats, 0))
+    return tmp_path
+
+def test_identical_bytes_are_stored_once(store):
+    first = plot_store.store_bytes(b"chart", ".png")
+    second = plot_store.store_bytes(b"chart", ".png")
+    assert first == second and first.endswith(".png")
+    assert os.listdir(store) == [first]
+    assert plot_store.get_plot_store_stats()["deduplicated"] == 1
+    assert plot_store.has_plot(plot_store.plot_url(first))
+
+def test_quota_evicts_least_recently_used_and_ttl_expires(store, monkeypatch):
+    monkeypatch.setattr(plot_store, "PLOT_STORE_MAX_BYTES", 10)
+    old = plot_store.store_bytes(b"aaaaaa", ".png")
+    os.utime(store / old, (time.time() - 60, time.time() - 60))
+    new = plot_store.store_bytes(b"bbbbbb", ".png")
+    assert not plot_store.has_plot(old) and plot_store.has_plot(new)
+
+    monkeypatch.setattr(plot_store, "PLOT_STORE_MAX_BYTES", 1024)
+    monkeypatch.setattr(plot_store, "PLOT_STORE_TTL", 30)
+    os.utime(store / new, (time.time() - 60, time.time() - 60))
+    plot_store.store_bytes(b"cc", ".png")
+    assert not plot_store.has_plot(new)
+    stats = plot_store.get_plot_store_stats()
+    assert stats["evicted"] == 1 and stats["expired"] == 1
+
+def test_endpoint_serves_etag_and_not_modified(store):
+    name = plot_store.store_bytes(b"<svg/>", ".svg")
+    response = client.get(f"/api/plots/{name}")
+    assert response.status_code == 200 and response.content == b"<svg/>"
+    assert response.headers["content-type"].startswith("image/svg+xml")
+    assert "immutable" in response.headers["cache-control"]
+
+    again = client.get(f"/api/plots/{name}", headers={"If-None-Match": response.headers["etag"]})
+    assert again.status_code == 304
+    assert plot_store.get_plot_store_stats()["memory_hits"] == 1
+    assert client.get("/api/plots/missing.png").status_code == 404
+    assert client.get("/api/plots/..%2Fsecret.png").status_code == 404
+
+def test_memory_copy_is_not_served_after_the_file_is_deleted(store):
+    name = plot_store.store_bytes(b"chart", ".png")
+    assert plot_store.read_plot(name)[0] == b"chart"
+    os.remove(store / name)
+    assert plot_store.read_plot(name) is None
+    assert plot_store.get_plot_store_stats()["memory_files"] == 0
+
+def test_render_formats_are_deterministic_and_webp_is_downscaled(store):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from PIL import Image
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.plot(range(100), [i % 7 for i in range(100)])
+    try:
+        svg = plot_store.render_figure(fig, "svg")
+        assert svg == plot_store.render_figure(fig, "svg")
+        webp = plot_store.save_figure(fig, "webp")
+        assert Image.open(store / webp).width == plot_store.WEBP_MAX_WIDTH
+        with pytest.raises(ValueError):
+            plot_store.render_figure(fig, "gif")
+    finally:
+        plt.close(fig)
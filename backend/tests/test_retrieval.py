@@ -0,0 +1,68 @@
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+import corpus_index
+import retrieval
+
+FILING = " ".join(
+    f"Item {i}. Segment {i} reported revenue of {100 + i},{i:03d} thousand and operating expenses grew {i} percent."
+    for i in range(40))
+
+def chunk_document(name, text, chunk_size=300, chunk_overlap=80):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return [Document(page_content=chunk, metadata={"source": name}) for chunk in splitter.split_text(text)]
+
+def add(corpus, name, docs, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(len(docs), 8)).astype("float32")
+    corpus.add_document(name, "v1", vectors, docs)
+    return vectors
+
+def test_lexical_search_follows_document_changes_and_survives_reload(tmp_path):
+    corpus = corpus_index.CorpusIndex("flat")
+    add(corpus, "msft.pdf", [Document(page_content="MSFT revenue was 245,122 million.", metadata={"source": "msft.pdf"}),
+                             Document(page_content="Headcount grew to 228,000.", metadata={"source": "msft.pdf"})])
+    add(corpus, "aapl.pdf", [Document(page_content="AAPL revenue was 391,035 million.", metadata={"source": "aapl.pdf"})])
+
+    results = corpus.lexical_search("What was MSFT revenue?", k=3)
+    assert results[0][0].page_content.startswith("MSFT") and len(results) == 2
+    assert corpus.lexical_search("245,122", k=3)[0][0].page_content.startswith("MSFT")
+    assert {doc.metadata["source"] for doc, _ in corpus.lexical_search("revenue", k=3, files=["aapl.pdf"])} == {"aapl.pdf"}
+
+    corpus.remove_document("msft.pdf")
+    assert corpus.lexical_search("MSFT", k=3) == [] and "msft" not in corpus.postings
+    corpus.save(str(tmp_path / "flat"))
+    loaded = corpus_index.CorpusIndex.load(str(tmp_path / "flat"))
+    assert loaded.lexical_search("AAPL", k=1)[0][0].page_content.startswith("AAPL")
+
+def test_overlapping_chunks_are_packed_once():
+    docs = chunk_document("10k.pdf", FILING)
+    passages, info = retrieval.pack("segment revenue", docs[3:8], budget=10000)
+
+    # Five consecutive chunks become one span with the splitter's overlap removed
+    assert len(passages) == 1 and info["merged"] == 4
+    assert passages[0]["text"] in retrieval.compress(FILING)
+    assert info["tokens"] < sum(retrieval.estimate_tokens(doc.page_content) for doc in docs[3:8])
+    # A chunk already covered, and chunks that bridge two passages, do not add text twice
+    passages, info = retrieval.pack("segment revenue", [docs[3], docs[5], docs[4], docs[4]], budget=10000)
+    assert len(passages) == 1 and info["duplicates"] == 1
+
+def test_passages_fit_the_budget_and_the_last_one_is_trimmed_to_matching_sentences():
+    docs = chunk_document("10k.pdf", FILING, chunk_size=600, chunk_overlap=0)
+    passages, info = retrieval.pack("Segment 12 revenue", docs, budget=200)
+    assert info["tokens"] <= 200 and info["trimmed"] == 1 and info["dropped"] > 0
+    assert sum(retrieval.estimate_tokens(passage["text"]) for passage in passages) <= 200
+
+def test_hybrid_retrieval_finds_exact_terms_that_vectors_miss():
+    corpus = corpus_index.CorpusIndex("flat")
+    docs = [Document(page_content=f"Generic commentary number {i} on the quarter.", metadata={"source": "a.pdf"})
+            for i in range(30)]
+    docs[17] = Document(page_content="Ticker XQZ closed at 14.25 dollars.", metadata={"source": "a.pdf"})
+    vectors = add(corpus, "a.pdf", docs)
+    # The question's embedding is nearest to unrelated chunks
+    query_vector = vectors[0]
+
+    vector_only, _ = retrieval.retrieve(corpus, "Where did XQZ close?", query_vector, budget=60, mode="vector")
+    hybrid, info = retrieval.retrieve(corpus, "Where did XQZ close?", query_vector, budget=60, mode="hybrid")
+    assert "XQZ" not in retrieval.format_context(vector_only)
+    assert "[a.pdf] Ticker XQZ closed at 14.25 dollars." in retrieval.format_context(hybrid)
+    assert info["tokens"] <= 60
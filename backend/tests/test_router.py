@@ -0,0 +1,64 @@
+
+import asyncio
+import pytest
+from langchain_core.messages import AIMessage
+import llm_client
+import router
+
+class StubRouterLLM:
+    model = "stub-router"
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = 0
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        return AIMessage(content=self.answer)
+
+@pytest.fixture
+def router_llm(monkeypatch):
+    monkeypatch.setattr(router, "_decisions", router.OrderedDict())
+    stub = StubRouterLLM("RAG")
+    llm_client.set_client("router", stub)
+    yield stub
+    llm_client.reset_clients()
+
+@pytest.mark.parametrize("selected_files, expected", [
+    (["sales_data.csv"], "CSV"),
+    (["NASDAQ_MSFT_2024.pdf", "notes.docx"], "RAG"),
+])
+def test_file_types_decide_without_the_llm(router_llm, selected_files, expected):
+    assert asyncio.run(router.route_query("What were total sales?", selected_files)) == expected
+    assert router_llm.calls == 0
+
+def test_classifier_separates_mixed_selections(router_llm):
+    files = ["sales_data.csv", "NASDAQ_MSFT_2024.pdf"]
+    assert router.route_locally("Summarize the annual report", files)[0] == "RAG"
+    assert router.route_locally("What is the average price of all products in the csv?", files)[0] == "CSV"
+
+def test_low_confidence_falls_back_to_llm_once(router_llm, monkeypatch):
+    monkeypatch.setattr(router, "ROUTER_CONFIDENCE_THRESHOLD", 1.01)
+    files = ["sales_data.csv", "NASDAQ_MSFT_2024.pdf"]
+    assert asyncio.run(router.route_query("Tell me something", files)) == "RAG"
+    assert asyncio.run(router.route_query("  tell me SOMETHING ", files)) == "RAG"
+    assert router_llm.calls == 1
+
+def test_llm_failures_are_not_memoized(router_llm, monkeypatch):
+    monkeypatch.setattr(router, "ROUTER_CONFIDENCE_THRESHOLD", 1.01)
+    router_llm.answer = "I am not sure"
+    files = ["sales_data.csv", "NASDAQ_MSFT_2024.pdf"]
+    asyncio.run(router.route_query("Tell me something", files))
+    asyncio.run(router.route_query("Tell me something", files))
+    assert router_llm.calls == 2
+
+def test_without_files_questions_go_to_the_database_or_the_document_corpus(router_llm):
+    assert router.route_locally("How many orders were placed in the last month?", [])[0] == "SQL"
+    assert router.route_locally("Summarize the risk factors in the annual report", [])[0] == "RAG"
+    assert "CSV" not in router.candidate_sources([])
+
+def test_llm_choice_that_cannot_use_the_selection_is_ignored(router_llm, monkeypatch):
+    monkeypatch.setattr(router, "ROUTER_CONFIDENCE_THRESHOLD", 1.01)
+    router_llm.answer = "CSV"
+    local = router.route_locally("How many orders were placed?", [])[0]
+    assert asyncio.run(router.route_query("How many orders were placed?", [])) == local
@@ -0,0 +1,128 @@
+import asyncio
+import sqlite3
+import pytest
+from langchain_core.language_models import FakeListChatModel
+from langchain_community.utilities import SQLDatabase
+import llm_client
+import metrics
+import sql_handler
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    path = tmp_path / "sales.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE territories (name TEXT, total REAL)")
+        conn.executemany("INSERT INTO territories VALUES (?, ?)", [("North", 120.5), ("South", 80.0)])
+        conn.execute("CREATE TABLE customers (id INTEGER, email TEXT)")
+    monkeypatch.setenv("LOGOS_SQL_URL", f"sqlite:///{path}")
+    monkeypatch.setattr(sql_handler, "_stats", dict.fromkeys(sql_handler._stats, 0))
+    sql_handler.clear_plans()
+    sql_handler.dispose_engine()
+    yield path
+    sql_handler.dispose_engine()
+    llm_client.reset_clients()
+
+def test_engine_schema_and_agent_are_reused(database):
+    llm = FakeListChatModel(responses=["unused"])
+    db = sql_handler.get_database()
+    agent = sql_handler.get_agent(db, llm)
+
+    assert sql_handler.get_engine() is sql_handler.get_engine()
+    assert sql_handler.get_database() is db
+    assert sql_handler.get_agent(sql_handler.get_database(), llm) is agent
+    stats = sql_handler.get_sql_stats()
+    assert stats["engines_created"] == 1 and stats["schema_loads"] == 1 and stats["agents_built"] == 1
+
+def test_table_info_is_memoized(database, monkeypatch):
+    db = sql_handler.get_database()
+    first = db.get_table_info(["territories"])
+    assert "CREATE TABLE territories" in first and "North" in first
+
+    def fail(*args, **kwargs):
+        raise AssertionError("table info was rebuilt")
+    monkeypatch.setattr(SQLDatabase, "get_table_info", fail)
+    assert db.get_table_info(["territories"]) == first
+    assert sql_handler.get_sql_stats()["table_info_hits"] == 1
+
+def test_invalidate_and_refresh_interval_reload_schema(database, monkeypatch):
+    db = sql_handler.get_database()
+    with sqlite3.connect(database) as conn:
+        conn.execute("CREATE TABLE orders (id INTEGER)")
+    assert "orders" not in db.get_usable_table_names()
+
+    sql_handler.invalidate_schema()
+    refreshed = sql_handler.get_database()
+    assert refreshed is not db
+    assert "orders" in refreshed.get_usable_table_names()
+
+    monkeypatch.setattr(sql_handler, "SQL_SCHEMA_REFRESH", 0)
+    assert sql_handler.get_database() is not refreshed
+
+def test_answer_from_sql_runs_agent_on_cached_database(database, monkeypatch):
+    metrics.reset_metrics()
+    monkeypatch.setattr(sql_handler, "SQL_MODE", "agent")
+    llm = FakeListChatModel(responses=[
+        "Action: sql_db_query\nAction Input: SELECT name, total FROM territories ORDER BY total DESC",
+        "Final Answer: [('North', 120.5), ('South', 80.0)]",
+    ] * 2)
+    llm_client.set_client("analyst", llm)
+
+    for _ in range(2):
+        result = asyncio.run(sql_handler.answer_from_sql("Total sales by territory?"))
+        assert result == [{"label": "North", "value": 120.5}, {"label": "South", "value": 80.0}]
+    stats = sql_handler.get_sql_stats()
+    assert stats["agents_built"] == 1 and stats["agents_reused"] == 1
+    # The agent's own model calls are counted with the other LLM calls
+    assert 'logos_llm_calls_total{kind="agent",model="FakeListChatModel"} 4' in metrics.render_metrics()
+
+def test_generated_sql_runs_directly_and_is_reused(database):
+    llm = FakeListChatModel(responses=["```sql\nSELECT name, total FROM territories ORDER BY total DESC;\n```"])
+    llm_client.set_client("analyst", llm)
+
+    first = asyncio.run(sql_handler.answer_from_sql("Total sales by territory?"))
+    assert first == [{"label": "North", "value": 120.5}, {"label": "South", "value": 80.0}]
+    # The same question, phrased trivially differently, reuses the validated SQL without asking the model
+    llm_client.set_client("analyst", FakeListChatModel(responses=["not sql"]))
+    assert asyncio.run(sql_handler.answer_from_sql("total sales by territory")) == first
+    stats = sql_handler.get_sql_stats()
+    assert stats["plans_generated"] == 1 and stats["plan_hits"] == 1 and stats["agent_answers"] == 0
+
+def test_typed_rows_are_masked_and_limited(database, monkeypatch):
+    with sqlite3.connect(database) as conn:
+        conn.executemany("INSERT INTO customers VALUES (?, ?)", [(i, f"user{i}@example.com") for i in range(5)])
+    monkeypatch.setattr(sql_handler, "SQL_ROW_LIMIT", 3)
+    columns, rows, truncated = asyncio.run(sql_handler.run_query("SELECT id, email, 'x' AS tag FROM customers ORDER BY id"))
+    assert columns == ["id", "email", "tag"] and truncated
+    assert rows == [{"id": i, "email": "[EMAIL_REDACTED]", "tag": "x"} for i in range(3)]
+
+def test_phone_numbers_in_numeric_columns_are_masked(database):
+    with sqlite3.connect(database) as conn:
+        conn.execute("CREATE TABLE contacts (id INTEGER, phone INTEGER, balance REAL, active BOOLEAN)")
+        conn.execute("INSERT INTO contacts VALUES (7, 5551234567, 12.5, 1)")
+    _, rows, _ = asyncio.run(sql_handler.run_query("SELECT id, phone, balance, active FROM contacts"))
+    assert rows == [{"id": 7, "phone": "[PHONE_REDACTED]", "balance": 12.5, "active": 1}]
+
+def test_generated_sql_runs_read_only(database):
+    # A write that gets past _clean_sql is still refused by the database
+    with pytest.raises(Exception, match="readonly"):
+        asyncio.run(sql_handler.run_query("UPDATE territories SET total = 0"))
+    with sqlite3.connect(database) as conn:
+        assert conn.execute("SELECT SUM(total) FROM territories").fetchone()[0] == 200.5
+
+    # The pooled connection is writable again for other users of the engine
+    with sql_handler.get_engine().begin() as connection:
+        connection.exec_driver_sql("UPDATE territories SET total = 1")
+
+def test_unsafe_or_failing_sql_falls_back_to_the_agent(database):
+    assert sql_handler._clean_sql("DELETE FROM territories") is None
+    assert sql_handler._clean_sql("SELECT 1; DROP TABLE territories") is None
+    assert sql_handler._clean_sql("WITH t AS (SELECT 1) SELECT * FROM t") == "WITH t AS (SELECT 1) SELECT * FROM t"
+
+    llm_client.set_client("analyst", FakeListChatModel(responses=[
+        "SELECT missing_column FROM territories",
+        "Final Answer: There are two territories.",
+    ]))
+    result = asyncio.run(sql_handler.answer_from_sql("How many territories are there?"))
+    assert result == [{"label": "Result", "value": "There are two territories."}]
+    stats = sql_handler.get_sql_stats()
+    assert stats["plans_failed"] == 1 and stats["agent_answers"] == 1 and stats["plans_generated"] == 0
@@ -0,0 +1,51 @@
+import json
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+import answer_cache
+import csv_handler
+import llm_client
+from main import app
+
+client = TestClient(app)
+
+@pytest.fixture
+def fake_analyst(monkeypatch):
+    """A local chat model that streams its reply one character at a time."""
+    async def mock_route_query(query, selected_files):
+        return "CSV"
+
+    monkeypatch.setattr("main.route_query", mock_route_query)
+    monkeypatch.setattr(csv_handler, "load_dataframe",
+                        lambda file_path: pd.DataFrame({"region": ["north", "south"], "units": [5, 3]}))
+    llm_client.set_client("analyst", FakeListChatModel(responses=["North sold more."]))
+    answer_cache.clear_answers()
+    yield
+    llm_client.reset_clients()
+
+def read_events(response):
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_stream_emits_stages_then_tokens_then_answer(fake_analyst):
+    response = client.post("/api/ask/stream", json={"query": "Which region sold more?", "selected_files": ["sales.csv"]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = read_events(response)
+    names = [name for name, _ in events]
+    assert names[0] == "routed" and events[0][1]["source"] == "CSV"
+    assert names[-2:] == ["answer", "done"]
+    tokens = [data["text"] for name, data in events if name == "token"]
+    assert len(tokens) > 1 and "".join(tokens) == "North sold more."
+    assert events[-2][1] == {"source": "CSV", "answer": "North sold more.", "query": "Which region sold more?",
+                             "image_path": None, "table_path": None}
+
+def test_non_streaming_ask_is_unchanged(fake_analyst):
+    response = client.post("/api/ask", json={"query": "Which region sold more?", "selected_files": ["sales.csv"]})
+    assert response.status_code == 200
+    assert response.json()["answer"] == "North sold more."
@@ -0,0 +1,66 @@
+import hashlib
+import pytest
+from fastapi.testclient import TestClient
+import main
+import uploads
+import utils
+from main import app
+
+client = TestClient(app)
+
+@pytest.fixture
+def upload_env(tmp_path, monkeypatch):
+    ingested = []
+    monkeypatch.setattr(uploads, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "ingest_file", ingested.append)
+    return tmp_path, ingested
+
+def test_chunked_upload_resumes_hashes_and_completes(upload_env, monkeypatch):
+    data_dir, ingested = upload_env
+    content = b"ds,y\n" + b"2024-01-01,10\n" * 1000
+    digest = hashlib.sha256(content).hexdigest()
+    session = client.post("/api/uploads", json={"filename": "sales.csv", "size": len(content), "sha256": digest}).json()
+    upload_id = session["upload_id"]
+
+    assert client.put(f"/api/uploads/{upload_id}?offset=0", content=content[:4000]).json()["offset"] == 4000
+    # A chunk sent from the wrong offset is refused; the state says where to resume
+    assert client.put(f"/api/uploads/{upload_id}?offset=0", content=content[4000:]).status_code == 409
+    assert client.get(f"/api/uploads/{upload_id}").json()["offset"] == 4000
+    assert client.post(f"/api/uploads/{upload_id}/complete").status_code == 409
+    client.put(f"/api/uploads/{upload_id}?offset=4000", content=content[4000:])
+    assert client.get("/api/files").json()["files"] == []
+
+    monkeypatch.setattr(utils.hashlib, "sha256", lambda: pytest.fail("the upload was hashed again"))
+    body = client.post(f"/api/uploads/{upload_id}/complete").json()
+    assert body["content_hash"] == digest and body["size"] == len(content)
+    assert body["ingestion_status"] == "queued" and body["deduplicated"] is None
+    assert (data_dir / "sales.csv").read_bytes() == content
+    assert utils.file_content_hash(str(data_dir / "sales.csv")) == digest
+    assert ingested == ["sales.csv"]
+    assert client.get(f"/api/uploads/{upload_id}").status_code == 404
+
+def test_identical_uploads_are_deduplicated(upload_env):
+    data_dir, ingested = upload_env
+    content = b"%PDF policy text"
+    first = client.post("/api/upload", files={"file": ("policy.pdf", content)}).json()
+    again = client.post("/api/upload", files={"file": ("policy.pdf", content)}).json()
+    copy = client.post("/api/upload", files={"file": ("policy-copy.pdf", content)}).json()
+
+    assert first["content_hash"] == again["content_hash"] == copy["content_hash"]
+    assert again["deduplicated"] == "unchanged"
+    assert copy["deduplicated"] == "linked"
+    assert (data_dir / "policy.pdf").stat().st_ino == (data_dir / "policy-copy.pdf").stat().st_ino
+    assert ingested == ["policy.pdf", "policy-copy.pdf"]
+
+def test_size_limits_and_bad_hashes_are_rejected(upload_env, monkeypatch):
+    data_dir, ingested = upload_env
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_BYTES", 10)
+    assert client.post("/api/uploads", json={"filename": "big.csv", "size": 11}).status_code == 413
+    assert client.post("/api/upload", files={"file": ("big.csv", b"x" * 11)}).status_code == 413
+    assert client.post("/api/uploads", json={"filename": "../escape.csv"}).status_code == 400
+
+    upload_id = client.post("/api/uploads", json={"filename": "small.csv", "sha256": "0" * 64}).json()["upload_id"]
+    client.put(f"/api/uploads/{upload_id}?offset=0", content=b"abc")
+    assert client.post(f"/api/uploads/{upload_id}/complete").status_code == 400
+    assert sorted(p.name for p in data_dir.iterdir()) == []
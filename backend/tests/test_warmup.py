@@ -0,0 +1,42 @@
+import os
+import sys
+import subprocess
+from fastapi.testclient import TestClient
+import warmup
+from main import app
+
+client = TestClient(app)
+
+HEAVY_MODULES = ["prophet", "matplotlib", "faiss", "sqlalchemy", "google.generativeai", "langchain_google_genai",
+                 "PyPDF2", "docx", "openpyxl", "langchain_text_splitters"]
+
+def test_importing_the_app_does_not_load_handler_dependencies():
+    code = f"import sys, main; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=backend, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
+
+def test_warmup_setting_is_parsed():
+    assert warmup.warmup_subsystems("all") == list(warmup.WARMERS)
+    assert warmup.warmup_subsystems("forecast, clients,bogus") == ["clients", "forecast"]
+    assert warmup.warmup_subsystems("none") == []
+
+def test_failed_warmup_is_reported_and_does_not_stop_the_others(monkeypatch):
+    calls = []
+    def fail():
+        raise RuntimeError("no database")
+    monkeypatch.setattr(warmup, "WARMERS", {"sql": fail, "clients": lambda: calls.append("clients")})
+    monkeypatch.setattr(warmup, "_status", {})
+
+    status = warmup.run_warmup(["sql", "clients"])
+    assert status["ready"] and calls == ["clients"]
+    assert status["subsystems"]["sql"]["status"] == "failed"
+    assert status["subsystems"]["sql"]["error"] == "no database"
+    assert status["subsystems"]["clients"]["status"] == "done"
+
+def test_warmup_endpoint_is_unavailable_until_ready(monkeypatch):
+    monkeypatch.setattr(warmup, "_status", {"forecast": {"status": "running"}})
+    assert client.get("/api/warmup").status_code == 503
+    monkeypatch.setattr(warmup, "_status", {"forecast": {"status": "done", "seconds": 1.0}})
+    response = client.get("/api/warmup")
+    assert response.status_code == 200 and response.json()["ready"]
@@ -0,0 +1,243 @@
+import os
+import time
+import uuid
+import hashlib
+import asyncio
+import threading
+from typing import AsyncIterator
+from ingest import DATA_DIR
+from utils import file_content_hash, remember_content_hash
+
+# Largest file accepted, and the chunk size suggested to clients of the chunked upload API
+UPLOAD_MAX_BYTES = int(os.getenv("LOGOS_UPLOAD_MAX_BYTES", str(10 * 1024 ** 3)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("LOGOS_UPLOAD_CHUNK_BYTES", str(8 * 1024 ** 2)))
+# Unfinished uploads not written to for this long are dropped with their partial file
+UPLOAD_SESSION_TTL = float(os.getenv("LOGOS_UPLOAD_SESSION_TTL", str(24 * 3600)))
+# Received bytes are written and hashed in blocks of this size, off the event loop
+_WRITE_BLOCK = 1024 * 1024
+
+_sessions = {}
+_lock = threading.Lock()
+_stats = {"started": 0, "completed": 0, "aborted": 0, "expired": 0, "rejected": 0, "bytes_received": 0,
+          "unchanged": 0, "linked": 0}
+
+
+class UploadError(ValueError):
+    """A rejected upload request; status_code is the HTTP status to answer with."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _public(session: dict) -> dict:
+    return {key: value for key, value in session.items() if not key.startswith("_")}
+
+
+def _part_path(upload_id: str) -> str:
+    # Next to the final file, so completing an upload is a rename on the same filesystem
+    return os.path.join(DATA_DIR, f".{upload_id}.part")
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _expire_sessions(now: float):
+    with _lock:
+        expired = [s for s in _sessions.values() if not s["_busy"] and now - s["updated_at"] > UPLOAD_SESSION_TTL]
+        for session in expired:
+            del _sessions[session["upload_id"]]
+            _stats["expired"] += 1
+    for session in expired:
+        _remove(session["_part_path"])
+
+
+def create_upload(file_name: str, size: int | None = None, sha256: str | None = None) -> dict:
+    """Starts an upload session for a file of the data directory and returns it with its upload_id."""
+    if not file_name or os.path.basename(file_name) != file_name or file_name.startswith("."):
+        raise UploadError(400, f"Invalid file name: {file_name!r}.")
+    if size is not None and size > UPLOAD_MAX_BYTES:
+        with _lock:
+            _stats["rejected"] += 1
+        raise UploadError(413, f"{file_name} is {size} bytes; uploads are limited to {UPLOAD_MAX_BYTES} bytes.")
+
+    now = time.time()
+    _expire_sessions(now)
+    upload_id = uuid.uuid4().hex
+    session = {"upload_id": upload_id, "file_name": file_name, "size": size, "sha256": sha256, "offset": 0,
+               "chunk_size": UPLOAD_CHUNK_BYTES, "created_at": now, "updated_at": now,
+               "_part_path": _part_path(upload_id), "_digest": hashlib.sha256(), "_busy": False}
+    os.makedirs(DATA_DIR, exist_ok=True)
+    open(session["_part_path"], "wb").close()
+    with _lock:
+        _sessions[upload_id] = session
+        _stats["started"] += 1
+    return _public(session)
+
+
+def get_upload(upload_id: str) -> dict | None:
+    """Returns an unfinished upload's state; its offset is where the next chunk must start."""
+    with _lock:
+        session = _sessions.get(upload_id)
+        return _public(session) if session else None
+
+
+def _claim(upload_id: str) -> dict:
+    with _lock:
+        session = _sessions.get(upload_id)
+        if session is None:
+            raise UploadError(404, f"No upload found with id {upload_id}.")
+        if session["_busy"]:
+            raise UploadError(409, f"Upload {upload_id} is already receiving a chunk.")
+        session["_busy"] = True
+        return session
+
+
+def _release(session: dict):
+    with _lock:
+        session["_busy"] = False
+        session["updated_at"] = time.time()
+
+
+def _write_block(session: dict, f, block: bytes):
+    f.write(block)
+    session["_digest"].update(block)
+    with _lock:
+        session["offset"] += len(block)
+        _stats["bytes_received"] += len(block)
+
+
+async def append_chunk(upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> dict:
+    """Appends a request body to an upload, hashing it as it is written.
+
+    The offset must equal the bytes already received, so a client that lost a response asks for
+    the upload's state and resumes from there. A chunk that takes the upload over its size limit
+    aborts the upload.
+    """
+    session = _claim(upload_id)
+    try:
+        if offset != session["offset"]:
+            raise UploadError(409, f"Upload {upload_id} is at offset {session['offset']}, not {offset}.")
+        limit = UPLOAD_MAX_BYTES if session["size"] is None else min(session["size"], UPLOAD_MAX_BYTES)
+        received = offset
+        with open(session["_part_path"], "r+b") as f:
+            f.seek(offset)
+            f.truncate()
+            buffer = bytearray()
+            try:
+                async for chunk in chunks:
+                    received += len(chunk)
+                    if received > limit:
+                        _drop(session)
+                        with _lock:
+                            _stats["rejected"] += 1
+                        raise UploadError(413, f"Upload {upload_id} exceeds its limit of {limit} bytes.")
+                    buffer += chunk
+                    if len(buffer) >= _WRITE_BLOCK:
+                        await asyncio.to_thread(_write_block, session, f, bytes(buffer))
+                        buffer.clear()
+            finally:
+                # Keep what did arrive when the client goes away, so it can resume after it
+                if buffer and upload_id in _sessions:
+                    _write_block(session, f, bytes(buffer))
+        return _public(session)
+    finally:
+        _release(session)
+
+
+def _drop(session: dict):
+    with _lock:
+        _sessions.pop(session["upload_id"], None)
+    _remove(session["_part_path"])
+
+
+def abort_upload(upload_id: str) -> bool:
+    """Drops an unfinished upload and its partial file."""
+    session = _claim(upload_id)
+    _drop(session)
+    with _lock:
+        _stats["aborted"] += 1
+    return True
+
+
+def _find_duplicate(file_path: str, size: int, content_hash: str) -> str | None:
+    """Returns another data file with the same bytes, comparing hashes only for files of the same size."""
+    for entry in os.scandir(DATA_DIR):
+        if entry.name.startswith(".") or entry.path == file_path or not entry.is_file():
+            continue
+        try:
+            if entry.stat().st_size == size and file_content_hash(entry.path) == content_hash:
+                return entry.path
+        except OSError:
+            continue
+    return None
+
+
+def complete_upload(upload_id: str) -> dict:
+    """Moves a fully received upload to its final path and returns its content hash.
+
+    "deduplicated" is "unchanged" when the file already held these bytes (nothing needs
+    ingesting again), "linked" when another data file did and the new name was hard-linked to
+    it, and None otherwise.
+    """
+    session = _claim(upload_id)
+    try:
+        if session["size"] is not None and session["offset"] != session["size"]:
+            raise UploadError(409, f"Upload {upload_id} has {session['offset']} of {session['size']} bytes.")
+        content_hash = session["_digest"].hexdigest()
+        if session["sha256"] and session["sha256"].lower() != content_hash:
+            _drop(session)
+            raise UploadError(400, f"Upload {upload_id} does not match its sha256; it was discarded.")
+
+        file_path = os.path.join(DATA_DIR, session["file_name"])
+        part_path, deduplicated = session["_part_path"], None
+        if os.path.exists(file_path) and file_content_hash(file_path) == content_hash:
+            _remove(part_path)
+            deduplicated = "unchanged"
+        else:
+            duplicate = _find_duplicate(file_path, session["offset"], content_hash)
+            if duplicate is not None:
+                try:
+                    os.link(duplicate, f"{part_path}.link")
+                    os.replace(f"{part_path}.link", file_path)
+                    _remove(part_path)
+                    deduplicated = "linked"
+                except OSError:
+                    _remove(f"{part_path}.link")
+            if deduplicated is None:
+                os.replace(part_path, file_path)
+            remember_content_hash(file_path, content_hash)
+
+        with _lock:
+            _sessions.pop(upload_id, None)
+            _stats["completed"] += 1
+            if deduplicated:
+                _stats[deduplicated] += 1
+        print(f"--- Upload of {session['file_name']} complete ({session['offset']} bytes, {content_hash[:12]}) ---")
+        return {"filename": session["file_name"], "path": file_path, "size": session["offset"],
+                "content_hash": content_hash, "deduplicated": deduplicated}
+    finally:
+        _release(session)
+
+
+async def save_stream(file_name: str, chunks: AsyncIterator[bytes]) -> dict:
+    """Writes a whole file in one call, through the same checks, hashing and deduplication as a session."""
+    upload_id = create_upload(file_name)["upload_id"]
+    try:
+        await append_chunk(upload_id, 0, chunks)
+        return await asyncio.to_thread(complete_upload, upload_id)
+    finally:
+        with _lock:
+            session = _sessions.pop(upload_id, None)
+        if session is not None:
+            _remove(session["_part_path"])
+
+
+def get_upload_stats() -> dict:
+    with _lock:
+        return {**_stats, "active": len(_sessions)}
@@ -1,31 +1,73 @@
 import pandas as pd
-from prophet import Prophet
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 import os
-import uuid
+import time
+import hashlib
+import threading
+from plot_store import plot_url, render_figure, store_bytes
+
+_hash_memo = {}
+_hash_memo_lock = threading.Lock()
 
 def detect_plotting_intent(query: str) -> bool:
     """Detects if the user's query contains keywords related to plotting or forecasting."""
     plotting_keywords = ["forecast", "plot", "graph", "predict", "project", "trend"]
     return any(keyword in query.lower() for keyword in plotting_keywords)
 
-def generate_forecast_plot(df: pd.DataFrame, file_name: str) -> dict:
-    """Generates a forecast plot from a DataFrame and returns the image path and summary."""
+def file_content_hash(file_path: str) -> str:
+    """Returns the SHA-256 of a file's bytes, memoized on its size and mtime."""
+    stat = os.stat(file_path)
+    abs_path = os.path.abspath(file_path)
+    version = (stat.st_size, stat.st_mtime_ns)
+    with _hash_memo_lock:
+        memo = _hash_memo.get(abs_path)
+        if memo and memo[0] == version:
+            return memo[1]
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    content_hash = digest.hexdigest()
+
+    with _hash_memo_lock:
+        _hash_memo[abs_path] = (version, content_hash)
+    return content_hash
+
+def remember_content_hash(file_path: str, content_hash: str):
+    """Records a hash computed while the file was written, so file_content_hash does not read it again."""
+    stat = os.stat(file_path)
+    with _hash_memo_lock:
+        _hash_memo[os.path.abspath(file_path)] = ((stat.st_size, stat.st_mtime_ns), content_hash)
+
+def generate_forecast_plot(df: pd.DataFrame, file_name: str, horizon: int = 365, plot_format: str = "png",
+                           plot_dir: str | None = None, store: bool = True) -> dict:
+    """Generates a forecast plot from a DataFrame and returns the image path and summary.
+
+    With store=False the rendered image is returned as "plot": (bytes, extension) instead, for the
+    forecasting workers, whose parent process stores it so the plot store's counters and memory
+    cache stay in one process.
+    """
+    # Prophet and pyplot take about two seconds to import, so only forecasting pays for them
+    from prophet import Prophet
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
     try:
         df.columns = df.columns.str.strip()
         df['ds'] = pd.to_datetime(df['ds'])
     except Exception as e:
         return {"error": f"Failed to format data for forecasting: {e}"}
 
+    start = time.perf_counter()
     try:
         model = Prophet()
         model.fit(df)
-        future = model.make_future_dataframe(periods=365)
+        future = model.make_future_dataframe(periods=horizon)
         forecast = model.predict(future)
     except Exception as e:
         return {"error": f"Failed to generate forecast: {e}"}
+    fitted = time.perf_counter()
 
     try:
         # Create a new figure for the plot
@@ -36,28 +78,19 @@ def generate_forecast_plot(df: pd.DataFrame, file_name: str) -> dict:
         ax.set_ylabel("Value", fontsize=12)
         plt.tight_layout()
 
-        plot_filename = f"forecast_{uuid.uuid4()}.png"
-        # Save plots to a temporary directory outside the frontend
-        temp_plot_dir = os.path.join("/Users/dheeraj/Desktop/finalmp", "temp_plots")
-        plot_path_for_backend = os.path.join(temp_plot_dir, plot_filename)
-        
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(plot_path_for_backend), exist_ok=True)
-        
-        # Save the figure with high DPI
-        plt.savefig(plot_path_for_backend, dpi=100, bbox_inches='tight')
+        data = render_figure(fig, plot_format)
         plt.close(fig)
-        
-        # Verify the file was created
-        if not os.path.exists(plot_path_for_backend):
-            return {"error": "Failed to save plot image file."}
 
-        # The frontend will fetch this image from a new backend endpoint
-        plot_path_for_frontend = f"/api/plots/{plot_filename}"
+        summary = f"Forecast generated for the next {horizon} days. The model predicts a value of {forecast['yhat'].iloc[-1]:.2f} on {forecast['ds'].iloc[-1].strftime('%Y-%m-%d')}."
 
-        summary = f"Forecast generated for the next 365 days. The model predicts a value of {forecast['yhat'].iloc[-1]:.2f} on {forecast['ds'].iloc[-1].strftime('%Y-%m-%d')}."
-
-        return {"answer": summary, "image_path": plot_path_for_frontend}
+        # Stage timings are reported by the forecasting pool and removed from the result
+        timings = {"prophet": fitted - start, "plot": time.perf_counter() - fitted}
+        if not store:
+            return {"answer": summary, "plot": (data, f".{plot_format}"), "timings": timings}
+        # Plots are stored under the hash of their bytes, so an identical render is stored once.
+        # The frontend will fetch this image from a new backend endpoint
+        plot_path_for_frontend = plot_url(store_bytes(data, f".{plot_format}", plot_dir))
+        return {"answer": summary, "image_path": plot_path_for_frontend, "timings": timings}
     except Exception as e:
         # Make sure to close any open figures on error
         plt.close('all')
@@ -0,0 +1,106 @@
+import os
+import time
+import threading
+
+# Subsystems loaded when the app starts, so the first question does not pay for them.
+# A comma-separated list of WARMERS names, "all", or "none".
+WARMUP = os.getenv("LOGOS_WARMUP", "clients")
+# By default the app accepts requests while warming up; "1" finishes the warm-up first
+WARMUP_BLOCKING = os.getenv("LOGOS_WARMUP_BLOCKING", "0") == "1"
+
+_lock = threading.Lock()
+_status = {}
+
+
+def _warm_clients():
+    from llm_client import init_clients
+    init_clients()
+
+
+def _warm_documents():
+    # The parsers, the text splitter and the vector store are imported by the first upload or RAG question
+    import PyPDF2
+    import docx
+    import openpyxl
+    import faiss
+    import langchain_text_splitters
+    import langchain_community.vectorstores.faiss
+
+
+def _warm_corpus():
+    from corpus_index import get_corpus
+    get_corpus()
+
+
+def _warm_sql():
+    from llm_client import get_llm
+    from sql_handler import get_agent, get_database, get_engine
+    # Opens the first pooled connection and builds the agent the first SQL question would build
+    with get_engine().connect():
+        pass
+    get_agent(get_database(), get_llm("analyst"))
+
+
+def _warm_forecast():
+    from forecasting import warm_pool
+    warm_pool()
+
+
+WARMERS = {
+    "clients": _warm_clients,
+    "documents": _warm_documents,
+    "corpus": _warm_corpus,
+    "sql": _warm_sql,
+    "forecast": _warm_forecast,
+}
+
+
+def warmup_subsystems(setting: str = WARMUP) -> list[str]:
+    """Parses a LOGOS_WARMUP value into the subsystems to warm up, in WARMERS order."""
+    names = {name.strip() for name in setting.split(",") if name.strip()}
+    if "all" in names:
+        return list(WARMERS)
+    unknown = names - set(WARMERS) - {"none"}
+    if unknown:
+        print(f"--- Ignoring unknown warm-up subsystem(s): {', '.join(sorted(unknown))} ---")
+    return [name for name in WARMERS if name in names]
+
+
+def run_warmup(subsystems: list[str] | None = None) -> dict:
+    """Warms up each subsystem in turn; a failure is recorded and does not stop the others."""
+    subsystems = warmup_subsystems() if subsystems is None else subsystems
+    with _lock:
+        _status.update({name: {"status": "pending"} for name in subsystems})
+    for name in subsystems:
+        with _lock:
+            _status[name] = {"status": "running"}
+        start = time.perf_counter()
+        try:
+            WARMERS[name]()
+            result = {"status": "done"}
+        except Exception as e:
+            print(f"--- Warm-up of {name} failed: {e} ---")
+            result = {"status": "failed", "error": str(e)}
+        result["seconds"] = time.perf_counter() - start
+        with _lock:
+            _status[name] = result
+        print(f"--- Warmed up {name} in {result['seconds']:.2f}s ---")
+    return get_warmup_status()
+
+
+def start_warmup(subsystems: list[str] | None = None) -> threading.Thread:
+    """Runs the warm-up in a background thread."""
+    subsystems = warmup_subsystems() if subsystems is None else subsystems
+    with _lock:
+        _status.update({name: {"status": "pending"} for name in subsystems})
+    thread = threading.Thread(target=run_warmup, args=(subsystems,), name="logos-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_warmup_status() -> dict:
+    """Returns each subsystem's warm-up state; "ready" once none is pending or running."""
+    with _lock:
+        subsystems = {name: dict(state) for name, state in _status.items()}
+    ready = all(state["status"] in ("done", "failed") for state in subsystems.values())
+    return {"ready": ready, "subsystems": subsystems}